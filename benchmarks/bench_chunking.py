@@ -0,0 +1,197 @@
+# ============================================
+# BENCHMARK DE CHUNKING
+# Chunker por tokens (chunking.py) vs. implementação anterior por caracteres
+# vs. RecursiveCharacterTextSplitter da LangChain, em documentos grandes
+# ============================================
+
+# Uso (a partir da raiz do projeto; texto sintético, não usa a API):
+#   uv run benchmarks/bench_chunking.py --paginas 2000 --saida resultado.json
+#   uv run benchmarks/bench_chunking.py --paginas 200 --linhas-por-pagina 400   # páginas longas
+#
+# Além do tempo, cada variante informa o tamanho dos chunks em tokens e quantos
+# terminam no meio de uma frase ou cortam uma palavra ao meio.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exemplos", "nativo"))
+
+from agendador_embeddings import criar_contador_tokens
+from chunking import iterar_chunks
+from bench_ponta_a_ponta import FRASES
+
+VARIANTES = ("tokens", "legado", "langchain")
+
+# =========================
+# 1. CORPUS
+# =========================
+
+def gerar_paginas(paginas, linhas_por_pagina, semente=42):
+    # Frases das políticas de RH quebradas em linhas de ~90 caracteres, como o texto extraído de PDFs
+    rng = random.Random(semente)
+    categorias = list(FRASES)
+    documentos = []
+    for pagina in range(paginas):
+        paragrafos, atual = [], []
+        for _ in range(linhas_por_pagina):
+            atual.append(rng.choice(FRASES[rng.choice(categorias)]).format(n=rng.randint(2, 90)))
+            if rng.random() < 0.2:
+                paragrafos.append(atual)
+                atual = []
+        paragrafos.append(atual)
+
+        linhas = [f"Seção {pagina + 1}"]
+        for paragrafo in paragrafos:
+            texto, linha = " ".join(paragrafo), ""
+            for palavra in texto.split():
+                if len(linha) + len(palavra) > 90:
+                    linhas.append(linha.rstrip())
+                    linha = ""
+                linha += palavra + " "
+            linhas.append(linha.rstrip() + "\n")
+        documentos.append({
+            "page_content": "\n".join(linhas),
+            "metadata": {"documento": f"documentos/doc_{pagina // 50}.pdf", "pagina": pagina % 50 + 1}
+        })
+    return documentos
+
+# =========================
+# 2. VARIANTES
+# =========================
+
+def chunks_legado(documentos, chunk_size=800, chunk_overlap=150):
+    # Implementação anterior de main_cli2_nativo.py: parágrafos concatenados até chunk_size
+    # e, acima disso, fatias de chunk_size caracteres com chunk_overlap de sobreposição
+    def dividir_chunk(chunk):
+        if len(chunk["page_content"]) <= chunk_size:
+            yield chunk
+            return
+        texto = chunk["page_content"]
+        for i in range(0, len(texto), chunk_size - chunk_overlap):
+            chunk_texto = texto[i:i + chunk_size]
+            if chunk_texto.strip():
+                metadata = chunk["metadata"].copy()
+                metadata["inicio"] += i + len(chunk_texto) - len(chunk_texto.lstrip())
+                yield {"page_content": chunk_texto.strip(), "metadata": metadata}
+
+    for doc in documentos:
+        chunk_atual, inicio_atual, posicao = "", 0, 0
+        for paragrafo_bruto in doc["page_content"].split("\n\n"):
+            inicio_paragrafo = posicao + len(paragrafo_bruto) - len(paragrafo_bruto.lstrip())
+            posicao += len(paragrafo_bruto) + 2
+            paragrafo = paragrafo_bruto.strip()
+            if not paragrafo:
+                continue
+            if len(chunk_atual) + len(paragrafo) <= chunk_size:
+                if not chunk_atual:
+                    inicio_atual = inicio_paragrafo
+                chunk_atual += paragrafo + " "
+            else:
+                if chunk_atual.strip():
+                    yield from dividir_chunk({"page_content": chunk_atual.strip(), "metadata": {**doc["metadata"], "inicio": inicio_atual}})
+                chunk_atual = paragrafo + " "
+                inicio_atual = inicio_paragrafo
+        if chunk_atual.strip():
+            yield from dividir_chunk({"page_content": chunk_atual.strip(), "metadata": {**doc["metadata"], "inicio": inicio_atual}})
+
+def chunks_langchain(documentos, chunk_size=800, chunk_overlap=150):
+    # Mesmos parâmetros das CLIs LangChain (por caracteres)
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for doc in documentos:
+        for texto in splitter.split_text(doc["page_content"]):
+            yield {"page_content": texto, "metadata": doc["metadata"]}
+
+def criar_variante(nome, contar_tokens, args):
+    if nome == "tokens":
+        return lambda documentos: iterar_chunks(documentos, contar_tokens, args.max_tokens, args.sobreposicao_tokens)
+    if nome == "legado":
+        return lambda documentos: chunks_legado(documentos, args.chunk_size, args.chunk_overlap)
+    return lambda documentos: chunks_langchain(documentos, args.chunk_size, args.chunk_overlap)
+
+# =========================
+# 3. MEDIÇÃO
+# =========================
+
+def qualidade(chunks, palavras_corpus, contar_tokens):
+    # Fim de frase: último caractere é pontuação final. Palavra cortada: a primeira ou a
+    # última palavra do chunk não existe no corpus (o corte caiu no meio dela)
+    tokens = [contar_tokens(chunk["page_content"]) for chunk in chunks]
+    fim_de_frase = sum(1 for chunk in chunks if chunk["page_content"].rstrip()[-1:] in ".!?…")
+    palavra_cortada = 0
+    for chunk in chunks:
+        palavras = chunk["page_content"].split()
+        if palavras and (palavras[0] not in palavras_corpus or palavras[-1] not in palavras_corpus):
+            palavra_cortada += 1
+    return {
+        "chunks": len(chunks),
+        "tokens_medio": round(statistics.fmean(tokens), 1) if tokens else 0,
+        "tokens_max": max(tokens, default=0),
+        "fora_de_fim_de_frase": round(1 - fim_de_frase / len(chunks), 3) if chunks else 0,
+        "palavra_cortada": round(palavra_cortada / len(chunks), 3) if chunks else 0
+    }
+
+def medir(nome, documentos, contar_tokens, args, palavras_corpus):
+    funcao = criar_variante(nome, contar_tokens, args)
+    tempos = []
+    for _ in range(args.repeticoes):
+        inicio = time.perf_counter()
+        chunks = list(funcao(documentos))
+        tempos.append(time.perf_counter() - inicio)
+
+    caracteres = sum(len(doc["page_content"]) for doc in documentos)
+    melhor = min(tempos)
+    return {
+        "segundos": round(melhor, 4),
+        "paginas_por_segundo": round(len(documentos) / melhor, 1),
+        "mb_por_segundo": round(caracteres / melhor / 1e6, 2),
+        **qualidade(chunks, palavras_corpus, contar_tokens)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos chunkers")
+    parser.add_argument("--paginas", type=int, default=1000)
+    parser.add_argument("--linhas-por-pagina", type=int, default=40, help="frases por página")
+    parser.add_argument("--variantes", default=",".join(VARIANTES))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--sobreposicao-tokens", type=int, default=40)
+    parser.add_argument("--chunk-size", type=int, default=800, help="caracteres (legado e langchain)")
+    parser.add_argument("--chunk-overlap", type=int, default=150, help="caracteres (legado e langchain)")
+    parser.add_argument("--modelo", default="text-embedding-3-small", help="tokenizer usado na contagem")
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    documentos = gerar_paginas(args.paginas, args.linhas_por_pagina)
+    palavras_corpus = {palavra for doc in documentos for palavra in doc["page_content"].split()}
+    contar_tokens = criar_contador_tokens(args.modelo)
+
+    resultados = {}
+    for nome in args.variantes.split(","):
+        try:
+            resultados[nome] = medir(nome, documentos, contar_tokens, args, palavras_corpus)
+        except ImportError as e:
+            resultados[nome] = {"erro": f"dependência ausente: {e.name}"}
+        print(f"{nome}: {resultados[nome]}", file=sys.stderr)
+
+    relatorio = {
+        "parametros": vars(args),
+        "corpus": {"paginas": len(documentos), "caracteres": sum(len(doc["page_content"]) for doc in documentos)},
+        "resultados": resultados
+    }
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(saida)
+    print(saida)
+
+if __name__ == "__main__":
+    main()
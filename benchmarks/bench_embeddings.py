@@ -0,0 +1,95 @@
+# ============================================
+# BENCHMARK DO AGENDADOR DE EMBEDDINGS
+# Lotes sequenciais de 50 vs. agendador concorrente, contra o servidor fake
+# ============================================
+
+# Uso (a partir da raiz do projeto; não usa a API real):
+#   uv run benchmarks/bench_embeddings.py --textos 2000 --latencia 0.2 --max-concorrencia 4 --saida resultado.json
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exemplos", "nativo"))
+
+from openai import OpenAI
+
+from agendador_embeddings import AgendadorEmbeddings
+from servidor_fake_openai import ServidorFake
+
+MODELO = "text-embedding-3-small"
+
+def gerar_textos(quantidade, tamanho):
+    base = "Política de férias, home office e código de conduta da empresa. "
+    return [f"{i} {(base * (tamanho // len(base) + 1))[:tamanho]}" for i in range(quantidade)]
+
+def sequencial(client, textos, tamanho_lote=50):
+    # Comportamento anterior: um lote fixo por vez, esperando cada resposta
+    vetores = []
+    for inicio in range(0, len(textos), tamanho_lote):
+        resposta = client.embeddings.create(model=MODELO, input=textos[inicio:inicio + tamanho_lote])
+        vetores.extend(item.embedding for item in resposta.data)
+    return vetores, {}
+
+def agendado(client, textos, max_em_voo, max_tokens_lote):
+    agendador = AgendadorEmbeddings(client, MODELO, max_em_voo=max_em_voo, max_tokens_lote=max_tokens_lote)
+    vetores = agendador.embeddar(textos)
+    return vetores, agendador.estatisticas()
+
+def medir(nome, funcao, servidor, textos):
+    for chave in servidor.contadores:
+        servidor.contadores[chave] = 0
+
+    inicio = time.perf_counter()
+    vetores, estatisticas = funcao(textos)
+    duracao = time.perf_counter() - inicio
+
+    assert len(vetores) == len(textos), f"{nome}: {len(vetores)} vetores para {len(textos)} textos"
+    return {
+        "modo": nome,
+        "segundos": round(duracao, 3),
+        "textos_por_segundo": round(len(textos) / duracao, 1),
+        "servidor": dict(servidor.contadores),
+        "agendador": estatisticas
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do agendador de embeddings")
+    parser.add_argument("--textos", type=int, default=2000)
+    parser.add_argument("--tamanho", type=int, default=800, help="caracteres por texto (≈ um chunk)")
+    parser.add_argument("--latencia", type=float, default=0.2)
+    parser.add_argument("--latencia-por-item", type=float, default=0.001)
+    parser.add_argument("--max-concorrencia", type=int, default=4, help="requisições simultâneas aceitas pelo servidor")
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--max-em-voo", type=int, default=8)
+    parser.add_argument("--max-tokens-lote", type=int, default=16000)
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    servidor = ServidorFake(
+        latencia=args.latencia,
+        latencia_por_item=args.latencia_por_item,
+        max_concorrencia=args.max_concorrencia,
+        taxa_erro=args.taxa_erro,
+        dimensoes=256
+    ).iniciar()
+    client = OpenAI(api_key="fake", base_url=servidor.base_url)
+    textos = gerar_textos(args.textos, args.tamanho)
+
+    resultados = [
+        medir("sequencial", lambda t: sequencial(client, t), servidor, textos),
+        medir("agendador", lambda t: agendado(client, t, args.max_em_voo, args.max_tokens_lote), servidor, textos)
+    ]
+    servidor.shutdown()
+
+    relatorio = {"parametros": vars(args), "resultados": resultados}
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(saida)
+    print(saida)
+
+if __name__ == "__main__":
+    main()
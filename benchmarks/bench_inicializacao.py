@@ -0,0 +1,204 @@
+# ============================================
+# BENCHMARK DE INICIALIZAÇÃO
+# Tempo de importação (python -X importtime) e tempo até a primeira pergunta
+# das CLIs nativa e LangChain, com orçamento verificado
+# ============================================
+
+# Uso (a partir da raiz do projeto; não chama a API):
+#   uv run benchmarks/bench_inicializacao.py
+#   uv run benchmarks/bench_inicializacao.py --clis nativo --repeticoes 10 --orcamento-ms 400
+#   uv run benchmarks/bench_inicializacao.py --ate-pergunta --saida inicializacao.json
+#
+# Cada medição é um processo novo com `python -X importtime -c "import <módulo>"`: o
+# tempo cumulativo do módulo da CLI é o tempo de importação. Os módulos importados são
+# conferidos contra MODULOS_ADIADOS, que devem carregar só no primeiro uso (a coleção
+# abre em segundo plano enquanto a pergunta já está na tela). O código de saída é 1 se
+# a mediana de alguma CLI passar do orçamento ou se um módulo adiado for importado.
+# Com --ate-pergunta, também mede o tempo até o prompt "Você:" da CLI de verdade; com
+# o índice já criado, senão o tempo inclui a indexação.
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(RAIZ, "exemplos", "nativo"))
+
+from rerank import percentis
+
+# Nome: (diretório do script, módulo)
+CLIS = {
+    "nativo": ("exemplos/nativo", "main_cli2_nativo"),
+    "langchain": ("exemplos/langchain", "main_cli"),
+    "langchain_rich": ("exemplos/langchain", "main_cli2")
+}
+
+# Pesados e desnecessários até a primeira pergunta (ou até a abertura do índice)
+MODULOS_ADIADOS = (
+    "chromadb",
+    "httpx",
+    "openai",
+    "pypdf",
+    "sentence_transformers",
+    "langchain_core",
+    "langchain_community",
+    "langchain_chroma",
+    "langchain_openai",
+    "langchain_text_splitters",
+    "rich.markdown"
+)
+
+# Mediana da importação, por CLI (ms): medida entre 70 e 180 ms nas três, contra 2 a 3,5 s
+# quando chromadb, openai e LangChain eram importados no topo dos módulos
+ORCAMENTO_PADRAO_MS = 600
+
+# =========================
+# 1. MEDIÇÃO
+# =========================
+
+def ambiente_filho() -> dict:
+    # Passa pela verificação da chave; nada na importação nem até a pergunta chama a API
+    return dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY") or "sk-benchmark", PYTHONUNBUFFERED="1")
+
+def ler_importtime(saida: str):
+    """Linhas do -X importtime como (profundidade, módulo, cumulativo em µs), na ordem do relatório."""
+    entradas = []
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|", 2)
+        if not cumulativo.strip().isdigit():
+            continue  # cabeçalho
+        recuo = len(nome) - len(nome.lstrip(" "))
+        entradas.append(((recuo - 1) // 2, nome.strip(), int(cumulativo)))
+    return entradas
+
+def importacoes_diretas(entradas, modulo: str) -> dict:
+    """Módulos importados diretamente pela CLI (profundidade 1), com o cumulativo em ms."""
+    fim = max(i for i, (profundidade, nome, _) in enumerate(entradas) if nome == modulo and profundidade == 0)
+    diretas = {}
+    i = fim - 1
+    # Os filhos aparecem antes do pai, até a entrada anterior de profundidade 0
+    while i >= 0 and entradas[i][0] > 0:
+        if entradas[i][0] == 1:
+            diretas[entradas[i][1]] = round(entradas[i][2] / 1000, 1)
+        i -= 1
+    return diretas
+
+def medir_importacao(diretorio_script: str, modulo: str, diretorio: str):
+    codigo = f"import sys; sys.path.insert(0, {os.path.join(RAIZ, diretorio_script)!r}); import {modulo}"
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True, text=True, cwd=diretorio, env=ambiente_filho()
+    )
+    if saida.returncode != 0:
+        raise RuntimeError(f"falha ao importar {modulo}: {saida.stderr.strip().splitlines()[-1]}")
+
+    entradas = ler_importtime(saida.stderr)
+    total_ms = next(cumulativo for profundidade, nome, cumulativo in entradas if nome == modulo and profundidade == 0) / 1000
+    importados = {nome for _, nome, _ in entradas}
+    adiados = sorted(
+        adiado for adiado in MODULOS_ADIADOS
+        if any(nome == adiado or nome.startswith(adiado + ".") for nome in importados)
+    )
+    return total_ms, importacoes_diretas(entradas, modulo), adiados
+
+def medir_ate_pergunta(diretorio_script: str, modulo: str, diretorio: str, limite: float = 120.0) -> float:
+    """Segundos do início do processo até o prompt da primeira pergunta; depois responde 'sair'."""
+    script = os.path.join(RAIZ, diretorio_script, modulo + ".py")
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, script],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        cwd=diretorio, env=dict(ambiente_filho(), TERM="dumb")
+    )
+    lido = b""
+    try:
+        while "Você:".encode("utf-8") not in lido:
+            if time.perf_counter() - inicio > limite:
+                raise RuntimeError(f"{modulo}: prompt não apareceu em {limite:.0f}s")
+            bloco = os.read(processo.stdout.fileno(), 4096)
+            if not bloco:
+                raise RuntimeError(f"{modulo} encerrou antes do prompt: {lido.decode('utf-8', 'replace')[-300:]}")
+            lido += bloco
+        duracao = time.perf_counter() - inicio
+        processo.communicate(b"sair\n", timeout=limite)
+    finally:
+        if processo.poll() is None:
+            processo.kill()
+    return duracao
+
+def resumo_ms(segundos_ou_ms, escala: float = 1.0) -> dict:
+    valores = [valor * escala for valor in segundos_ou_ms]
+    return {
+        **{ponto: round(valor, 1) for ponto, valor in percentis(valores, (50, 95)).items()},
+        "min": round(min(valores), 1)
+    }
+
+# =========================
+# 2. EXECUÇÃO
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização das CLIs")
+    parser.add_argument("--clis", default=",".join(CLIS), help="CLIs medidas, separadas por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=5, help="processos por CLI (após um de aquecimento)")
+    parser.add_argument("--orcamento-ms", type=float, default=ORCAMENTO_PADRAO_MS, help="mediana máxima da importação")
+    parser.add_argument("--ate-pergunta", action="store_true", help="mede também o tempo até o prompt da CLI")
+    parser.add_argument("--diretorio", default=".", help="diretório de trabalho das CLIs (documentos/ e índices)")
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    resultados = {}
+    violacoes = []
+    for nome in args.clis.split(","):
+        diretorio_script, modulo = CLIS[nome]
+
+        # O primeiro processo compila os .pyc e aquece o cache de disco: fica fora da medição
+        medir_importacao(diretorio_script, modulo, args.diretorio)
+        tempos, diretas, adiados = [], {}, set()
+        for _ in range(args.repeticoes):
+            total_ms, diretas, importados = medir_importacao(diretorio_script, modulo, args.diretorio)
+            tempos.append(total_ms)
+            adiados.update(importados)
+
+        resultado = {
+            "modulo": modulo,
+            "importacao_ms": resumo_ms(tempos),
+            "maiores_importacoes_ms": dict(sorted(diretas.items(), key=lambda item: item[1], reverse=True)[:8]),
+            "modulos_adiados_importados": sorted(adiados)
+        }
+        if args.ate_pergunta:
+            resultado["ate_pergunta_ms"] = resumo_ms(
+                [medir_ate_pergunta(diretorio_script, modulo, args.diretorio) for _ in range(args.repeticoes)],
+                escala=1000
+            )
+
+        resultado["dentro_do_orcamento"] = resultado["importacao_ms"]["p50"] <= args.orcamento_ms and not adiados
+        if resultado["importacao_ms"]["p50"] > args.orcamento_ms:
+            violacoes.append(f"{nome}: importação em {resultado['importacao_ms']['p50']:.0f} ms (orçamento {args.orcamento_ms:.0f} ms)")
+        if adiados:
+            violacoes.append(f"{nome}: importa na inicialização {', '.join(sorted(adiados))}")
+        resultados[nome] = resultado
+        print(json.dumps({nome: resultado}, ensure_ascii=False), file=sys.stderr)
+
+    relatorio = {
+        "parametros": vars(args),
+        "python": sys.version.split()[0],
+        "resultados": resultados,
+        "violacoes": violacoes
+    }
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(saida)
+    print(saida)
+
+    if violacoes:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
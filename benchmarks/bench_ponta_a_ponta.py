@@ -0,0 +1,334 @@
+# ============================================
+# BENCHMARK PONTA A PONTA
+# Leitura, chunking, indexação, reranking e resposta das versões nativa e LangChain
+# contra o servidor fake da API OpenAI, com corpus sintético
+# ============================================
+
+# Uso (a partir da raiz do projeto; não usa a API real):
+#   uv run benchmarks/bench_ponta_a_ponta.py --paginas 20 --perguntas 20 --saida base.json
+#   uv run benchmarks/bench_ponta_a_ponta.py --variantes nativo --comparar base.json --tolerancia 0.2
+#
+# Cada variante roda em um processo filho, dentro de um diretório temporário com os
+# PDFs sintéticos: as configurações lidas na importação valem para o filho e o pico
+# de RSS medido é só dela. Com --comparar, etapas cujo p50 piorou mais que a
+# tolerância em relação ao relatório anterior são listadas e o código de saída é 1.
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(RAIZ, "exemplos", "nativo"))
+
+from rerank import percentis
+from servidor_fake_openai import ServidorFake
+
+# nativo_sobreposto: a versão nativa com PIPELINE_SOBREPOSTO=1
+VARIANTES = ("nativo", "nativo_sobreposto", "langchain")
+
+# Mesmos nomes que as CLIs esperam em documentos/
+DOCUMENTOS = {
+    "documentos/politica_ferias.pdf": "ferias",
+    "documentos/politica_home_office.pdf": "home_office",
+    "documentos/codigo_conduta.pdf": "conduta"
+}
+
+FRASES = {
+    "ferias": [
+        "O colaborador tem direito a 30 dias de férias após cada período aquisitivo de 12 meses.",
+        "As férias podem ser divididas em até três períodos, sendo um deles de no mínimo 14 dias.",
+        "A solicitação de férias deve ser registrada no portal com antecedência mínima de {n} dias.",
+        "O abono pecuniário permite converter até um terço das férias em remuneração.",
+        "O pagamento das férias é feito até {n} dias antes do início do descanso."
+    ],
+    "home_office": [
+        "O regime de home office é permitido por até {n} dias por semana, conforme acordo com o gestor.",
+        "A empresa fornece notebook e reembolsa até R$ {n},00 mensais de internet no trabalho remoto.",
+        "O colaborador em teletrabalho deve cumprir o horário de disponibilidade da equipe.",
+        "Reuniões presenciais podem ser convocadas com {n} dias de antecedência.",
+        "O trabalho remoto exige ambiente adequado e conexão estável."
+    ],
+    "conduta": [
+        "O código de conduta proíbe qualquer forma de assédio moral ou sexual.",
+        "Conflitos de interesse devem ser comunicados ao comitê de ética em até {n} dias.",
+        "Brindes acima de R$ {n},00 não podem ser aceitos de fornecedores.",
+        "Violações de ética podem ser relatadas de forma anônima pelo canal de denúncias.",
+        "Informações confidenciais não podem ser compartilhadas fora da empresa."
+    ]
+}
+
+PERGUNTAS = [
+    "Quantos dias de férias tenho direito por ano?",
+    "Posso dividir minhas férias em períodos?",
+    "Quantos dias por semana posso trabalhar em home office?",
+    "A empresa ajuda com custos de internet no trabalho remoto?",
+    "O que o código de conduta diz sobre conflito de interesses?",
+    "Como devo reportar uma violação de ética?"
+]
+
+# =========================
+# 1. CORPUS SINTÉTICO
+# =========================
+
+def escrever_pdf(caminho, paginas):
+    """PDF mínimo (Helvetica, WinAnsi) com uma página por item de paginas (lista de linhas)."""
+    def escapar(linha):
+        return linha.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objetos = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+    ]
+    ids_paginas = []
+    for linhas in paginas:
+        texto = "BT /F1 10 Tf 12 TL 50 800 Td " + " ".join(f"({escapar(linha)}) Tj T*" for linha in linhas) + " ET"
+        conteudo = texto.encode("latin-1")
+        objetos.append(f"<< /Length {len(conteudo)} >>\nstream\n{texto}\nendstream")
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objetos)} 0 R >>"
+        )
+        ids_paginas.append(len(objetos))
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in ids_paginas)}] /Count {len(ids_paginas)} >>"
+
+    dados = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posicoes.append(len(dados))
+        dados += f"{numero} 0 obj\n{objeto}\nendobj\n".encode("latin-1")
+    inicio_xref = len(dados)
+    dados += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for posicao in posicoes:
+        dados += f"{posicao:010d} 00000 n \n".encode("latin-1")
+    dados += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode("latin-1")
+
+    with open(caminho, "wb") as f:
+        f.write(dados)
+
+def gerar_corpus(diretorio, paginas, linhas_por_pagina, semente=42):
+    rng = random.Random(semente)
+    os.makedirs(os.path.join(diretorio, "documentos"), exist_ok=True)
+    for caminho, categoria in DOCUMENTOS.items():
+        conteudo = []
+        for pagina in range(paginas):
+            linhas = [f"Seção {pagina + 1}"]
+            for _ in range(linhas_por_pagina):
+                frase = rng.choice(FRASES[categoria]).format(n=rng.randint(2, 90))
+                linhas.append(frase)
+                # Parágrafos curtos, como nas políticas reais
+                if rng.random() < 0.3:
+                    linhas.append("")
+            conteudo.append(linhas)
+        escrever_pdf(os.path.join(diretorio, caminho), conteudo)
+
+# =========================
+# 2. MEDIÇÃO (PROCESSO FILHO)
+# =========================
+
+def pico_rss_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+class Medidor:
+    """Acumula as durações de cada etapa e a quantidade de itens processados."""
+
+    def __init__(self):
+        self.etapas = {}
+
+    def medir(self, etapa, funcao, *args, itens=1):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        duracao = time.perf_counter() - inicio
+        registro = self.etapas.setdefault(etapa, {"duracoes": [], "itens": 0, "pico_rss_mb": 0})
+        registro["duracoes"].append(duracao)
+        registro["itens"] += itens(resultado) if callable(itens) else itens
+        registro["pico_rss_mb"] = round(pico_rss_mb(), 1)
+        return resultado
+
+    def relatorio(self):
+        saida = {}
+        for etapa, registro in self.etapas.items():
+            total = sum(registro["duracoes"])
+            saida[etapa] = {
+                "amostras": len(registro["duracoes"]),
+                **{f"{ponto}_ms": round(valor * 1000, 2) for ponto, valor in percentis(registro["duracoes"], (50, 95, 99)).items()},
+                "itens_por_segundo": round(registro["itens"] / total, 2) if total else None,
+                "pico_rss_mb": registro["pico_rss_mb"]
+            }
+        return saida
+
+def perguntas_unicas(quantidade):
+    # Texto inédito a cada pergunta: nenhum acerto nos caches de embeddings ou de respostas
+    return [f"{PERGUNTAS[i % len(PERGUNTAS)]} (caso {i})" for i in range(quantidade)]
+
+def rodar_nativo(args, medidor):
+    import main_cli2_nativo as rag
+
+    rag.console.quiet = True
+    # Sem cache de embeddings: toda construção e toda pergunta vão ao servidor
+    rag.agendador_embeddings.cache = None
+    caminhos = list(DOCUMENTOS)
+
+    for _ in range(args.repeticoes):
+        documentos = medidor.medir("carregar_documentos", rag.carregar_documentos, caminhos, itens=len)
+        chunks = medidor.medir("gerar_chunks", lambda d: rag.enriquecer_chunks(rag.gerar_chunks(d)), documentos, itens=len)
+
+    collection = None
+    for i in range(args.repeticoes):
+        # Diretório novo a cada construção: sempre indexação completa
+        rag.PERSIST_DIRECTORY = f"./chroma_{args.variante}_{i}"
+        collection = medidor.medir("construir_indice", rag.inicializar_vectorstore, caminhos, itens=len(chunks))
+
+    for pergunta in perguntas_unicas(args.perguntas):
+        embedding = rag.gerar_embedding_unico(pergunta)
+        documentos = rag.combinar_candidatos(rag.busca_vetorial(pergunta, embedding, collection), [], collection)
+        medidor.medir("rerank_documentos", rag.rerank_documentos, pergunta, documentos, rag.provedores.cliente("rerank"), itens=len(documentos))
+
+    for pergunta in perguntas_unicas(args.perguntas):
+        medidor.medir("responder_pergunta", rag.responder_pergunta, pergunta, collection)
+
+def rodar_langchain(args, medidor):
+    sys.path.insert(0, os.path.join(RAIZ, "exemplos", "langchain"))
+    import main_cli2 as lc
+
+    lc.console.quiet = True
+
+    for _ in range(args.repeticoes):
+        documentos = medidor.medir("carregar_documentos", lc.carregar_documentos, itens=len)
+        chunks = medidor.medir("gerar_chunks", lambda d: lc.enriquecer_chunks(lc.gerar_chunks(d)), documentos, itens=len)
+
+    vectorstore = None
+    for i in range(args.repeticoes):
+        # Diretório novo a cada repetição: com um índice existente, a CLI só o reabriria
+        os.environ["INDICE_CLI_DIRECTORY"] = f"./chroma_langchain_{i}"
+        lc.diretorio_indice.cache_clear()
+        vectorstore = medidor.medir("construir_indice", lc.inicializar_vectorstore, itens=len(chunks))
+
+    _, llm = lc.obter_llms()
+    for pergunta in perguntas_unicas(args.perguntas):
+        documentos = vectorstore.similarity_search(pergunta, k=8)
+        medidor.medir("rerank_documentos", lc.rerank_documentos, pergunta, documentos, llm, itens=len(documentos))
+
+    for pergunta in perguntas_unicas(args.perguntas):
+        medidor.medir("responder_pergunta", lc.responder_pergunta, pergunta, vectorstore)
+
+def rodar_variante(args):
+    os.chdir(args.diretorio)
+    medidor = Medidor()
+    inicio = time.perf_counter()
+    (rodar_langchain if args.variante == "langchain" else rodar_nativo)(args, medidor)
+    return {
+        "segundos": round(time.perf_counter() - inicio, 2),
+        "pico_rss_mb": round(pico_rss_mb(), 1),
+        "etapas": medidor.relatorio()
+    }
+
+# =========================
+# 3. ORQUESTRAÇÃO
+# =========================
+
+def rodar_filho(variante, diretorio, base_url, args):
+    comando = [
+        sys.executable, os.path.abspath(__file__), "--variante", variante, "--diretorio", diretorio,
+        "--repeticoes", str(args.repeticoes), "--perguntas", str(args.perguntas)
+    ]
+    ambiente = dict(
+        os.environ,
+        OPENAI_BASE_URL=base_url,
+        OPENAI_API_KEY="fake",
+        EMBEDDING_CACHE_PATH=os.path.join(diretorio, f"cache_{variante}", "embeddings.sqlite"),
+        PIPELINE_SOBREPOSTO="1" if variante == "nativo_sobreposto" else "0"
+    )
+    saida = subprocess.run(comando, capture_output=True, text=True, env=ambiente)
+    if saida.returncode != 0:
+        return {"erro": saida.stderr.strip().splitlines()[-1] if saida.stderr.strip() else f"código {saida.returncode}"}
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+def comparar(relatorio, anterior, tolerancia):
+    """Etapas cujo p50 piorou mais que a tolerância (fração) em relação ao relatório anterior."""
+    regressoes = []
+    for variante, medicao in relatorio["variantes"].items():
+        etapas_anteriores = anterior.get("variantes", {}).get(variante, {}).get("etapas", {})
+        for etapa, valores in medicao.get("etapas", {}).items():
+            base = etapas_anteriores.get(etapa, {}).get("p50_ms")
+            if base and valores["p50_ms"] > base * (1 + tolerancia):
+                regressoes.append({"variante": variante, "etapa": etapa, "p50_ms": valores["p50_ms"], "anterior_ms": base})
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta das versões nativa e LangChain")
+    parser.add_argument("--variantes", default=",".join(VARIANTES))
+    parser.add_argument("--paginas", type=int, default=20, help="páginas por documento do corpus sintético")
+    parser.add_argument("--linhas-por-pagina", type=int, default=40)
+    parser.add_argument("--repeticoes", type=int, default=3, help="repetições de leitura, chunking e indexação")
+    parser.add_argument("--perguntas", type=int, default=20)
+    parser.add_argument("--latencia", type=float, default=0.05, help="latência do endpoint de embeddings")
+    parser.add_argument("--latencia-chat", type=float, default=0.2)
+    parser.add_argument("--latencia-token", type=float, default=0.005)
+    parser.add_argument("--variacao-chat", type=float, default=0.0, help="cauda (lognormal) da latência do chat")
+    parser.add_argument("--latencia-conexao", type=float, default=0.0, help="custo de cada conexão nova com o servidor")
+    parser.add_argument("--max-concorrencia", type=int, default=64)
+    parser.add_argument("--dimensoes", type=int, default=256)
+    parser.add_argument("--comparar", help="relatório JSON anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    parser.add_argument("--saida")
+    # Uso interno (processos filhos)
+    parser.add_argument("--variante", choices=VARIANTES)
+    parser.add_argument("--diretorio")
+    args = parser.parse_args()
+
+    if args.variante:
+        print(json.dumps(rodar_variante(args)))
+        return
+
+    servidor = ServidorFake(
+        latencia=args.latencia,
+        max_concorrencia=args.max_concorrencia,
+        dimensoes=args.dimensoes,
+        latencia_chat=args.latencia_chat,
+        latencia_token=args.latencia_token,
+        variacao_chat=args.variacao_chat,
+        latencia_conexao=args.latencia_conexao
+    ).iniciar()
+
+    diretorio = tempfile.mkdtemp(prefix="bench_ponta_a_ponta_")
+    try:
+        gerar_corpus(diretorio, args.paginas, args.linhas_por_pagina)
+        variantes = {}
+        for variante in args.variantes.split(","):
+            for chave in servidor.contadores:
+                servidor.contadores[chave] = 0
+            medicao = rodar_filho(variante, diretorio, servidor.base_url, args)
+            medicao["servidor"] = dict(servidor.contadores)
+            print(json.dumps({variante: medicao}, ensure_ascii=False), file=sys.stderr)
+            variantes[variante] = medicao
+    finally:
+        servidor.shutdown()
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    parametros = {k: v for k, v in vars(args).items() if k not in ("variante", "diretorio")}
+    relatorio = {"parametros": parametros, "variantes": variantes}
+
+    regressoes = []
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = comparar(relatorio, json.load(f), args.tolerancia)
+        relatorio["regressoes"] = regressoes
+
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(saida)
+    print(saida)
+    sys.exit(1 if regressoes else 0)
+
+if __name__ == "__main__":
+    main()
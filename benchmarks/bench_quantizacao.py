@@ -0,0 +1,174 @@
+# ============================================
+# BENCHMARK DE QUANTIZAÇÃO
+# Recall x memória x latência da ColecaoQuantizada (int8, PQ, truncamento
+# Matryoshka) contra a busca exata, com as perguntas e o índice do projeto
+# ============================================
+
+# Uso (a partir da raiz do projeto, com o índice já criado pela CLI nativa):
+#   uv run benchmarks/bench_quantizacao.py --perguntas faq.jsonl --saida resultado.json
+#   uv run benchmarks/bench_quantizacao.py --configuracoes int8,int8@512,pq@256 --fatores 1,4,10
+#   uv run benchmarks/bench_quantizacao.py --sintetico 200000   # sem API: vetores agrupados aleatórios
+#
+# Configuração = modo[@dimensões]: "int8", "pq", "float32@256" (só truncamento)...
+# O índice (de qualquer VECTOR_STORE) é copiado para uma coleção numpy temporária;
+# a referência é o top-k da busca exata em float32. Os embeddings das perguntas
+# passam pelo cache da CLI: repetir o benchmark não chama a API de novo.
+# Vetores sintéticos não têm a estrutura Matryoshka: o truncamento só deve ser
+# avaliado com os embeddings reais.
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exemplos", "nativo"))
+
+from rerank import percentis
+from vectorstore import ColecaoNumpy, ColecaoQuantizada
+
+CONFIGURACOES_PADRAO = "int8,pq,int8@512,int8@256,pq@256,float32@256"
+LOTE = 1000
+
+# =========================
+# 1. DADOS
+# =========================
+
+def copiar_indice(destino):
+    # Importado só aqui: o modo sintético não precisa da chave da API nem do ChromaDB
+    import main_cli2_nativo as rag
+    from bench_rerank import carregar_perguntas
+
+    rag.QUANTIZACAO, rag.QUANTIZACAO_DIMENSOES = "", 0
+    origem = rag.abrir_colecao()
+    total = origem.count()
+    if not total:
+        rag.console.print("[bold red]ERRO:[/bold red] Índice vazio. Execute a CLI nativa para criá-lo.")
+        sys.exit(1)
+
+    copia = ColecaoNumpy(destino)
+    for inicio in range(0, total, LOTE):
+        lote = origem.get(limit=LOTE, offset=inicio, include=["embeddings"])
+        copia.upsert(ids=lote["ids"], embeddings=lote["embeddings"])
+    copia.salvar()
+    return rag, carregar_perguntas
+
+def consultas_reais(rag, carregar_perguntas, caminho):
+    perguntas = carregar_perguntas(caminho)
+    embeddings = rag.gerar_embeddings(perguntas)
+    return np.asarray([e for e in embeddings if e is not None], dtype=np.float32)
+
+def gerar_sintetico(destino, chunks, dimensoes, consultas):
+    # Vetores em torno de alguns centros (como trechos de poucos temas), não uniformes na esfera
+    rng = np.random.default_rng(42)
+    centros = rng.standard_normal((max(1, chunks // 100), dimensoes)).astype(np.float32)
+    colecao = ColecaoNumpy(destino)
+    for inicio in range(0, chunks, LOTE):
+        quantidade = min(LOTE, chunks - inicio)
+        vetores = centros[rng.integers(0, len(centros), quantidade)] + 0.7 * rng.standard_normal((quantidade, dimensoes)).astype(np.float32)
+        colecao.upsert(ids=[f"chunk_{i:08d}" for i in range(inicio, inicio + quantidade)], embeddings=vetores)
+    colecao.salvar()
+
+    base = colecao.vetores[rng.choice(chunks, consultas)]
+    return base + 0.05 * rng.standard_normal(base.shape).astype(np.float32)
+
+# =========================
+# 2. MEDIÇÃO
+# =========================
+
+def buscar_ids(colecao, consultas, k):
+    latencias, ids = [], []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        resultado = colecao.query(query_embeddings=[consulta], n_results=k, include=["distances"])
+        latencias.append(time.perf_counter() - inicio)
+        ids.append(resultado["ids"][0])
+    return ids, latencias
+
+def recall(ids, referencia):
+    return float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(ids, referencia) if b]))
+
+def medir(diretorio, modo, dimensoes, fatores, consultas, k, referencia):
+    # Cada configuração treina os códigos, grava, e mede a partir de uma coleção reaberta do disco
+    inicio = time.perf_counter()
+    ColecaoQuantizada(diretorio, modo, dimensoes).salvar()
+    treino = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    colecao = ColecaoQuantizada(diretorio, modo, dimensoes)
+    abertura = time.perf_counter() - inicio
+
+    medicoes = []
+    for fator in fatores:
+        colecao.fator_rescore = fator
+        ids, latencias = buscar_ids(colecao, consultas, k)
+        medicoes.append({
+            "configuracao": f"{modo}@{dimensoes}" if dimensoes else modo,
+            "fator_rescore": fator,
+            f"recall@{k}": round(recall(ids, referencia), 4),
+            "bytes_por_vetor": colecao.quantizador.bytes_por_vetor(colecao.vetores.shape[1]),
+            "memoria_busca_mb": round(colecao.memoria_busca() / 1e6, 2),
+            "treino_s": round(treino, 2),
+            "abertura_s": round(abertura, 3),
+            "consulta_ms": {ponto: round(valor * 1000, 2) for ponto, valor in percentis(latencias, (50, 95)).items()}
+        })
+        print(json.dumps(medicoes[-1], ensure_ascii=False), file=sys.stderr)
+    os.remove(os.path.join(diretorio, "quantizado.npz"))
+    return medicoes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de quantização do índice vetorial")
+    parser.add_argument("--perguntas", help="perguntas (texto ou JSONL com 'pergunta'); padrão: as do bench_rerank")
+    parser.add_argument("--configuracoes", default=CONFIGURACOES_PADRAO, help="modo[@dimensões], separados por vírgula")
+    parser.add_argument("--fatores", default="1,4,10", help="fatores de re-score (candidatos = k x fator)")
+    parser.add_argument("--k", type=int, default=12, help="resultados por busca (a CLI usa 2 x RERANK_CANDIDATOS)")
+    parser.add_argument("--sintetico", type=int, default=0, help="usa N vetores sintéticos em vez do índice da CLI")
+    parser.add_argument("--dimensoes", type=int, default=1536, help="dimensões dos vetores sintéticos")
+    parser.add_argument("--consultas", type=int, default=200, help="consultas sintéticas")
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix="bench_quantizacao_")
+    try:
+        if args.sintetico:
+            consultas = gerar_sintetico(diretorio, args.sintetico, args.dimensoes, args.consultas)
+        else:
+            rag, carregar_perguntas = copiar_indice(diretorio)
+            consultas = consultas_reais(rag, carregar_perguntas, args.perguntas)
+
+        exata = ColecaoNumpy(diretorio)
+        referencia, latencias = buscar_ids(exata, consultas, args.k)
+        resultados = [{
+            "configuracao": "exata",
+            f"recall@{args.k}": 1.0,
+            "bytes_por_vetor": 4 * exata.vetores.shape[1],
+            "memoria_busca_mb": round(exata.vetores.nbytes / 1e6, 2),
+            "consulta_ms": {ponto: round(valor * 1000, 2) for ponto, valor in percentis(latencias, (50, 95)).items()}
+        }]
+        print(json.dumps(resultados[0], ensure_ascii=False), file=sys.stderr)
+        corpus = {"chunks": exata.count(), "dimensoes": exata.vetores.shape[1], "consultas": len(consultas)}
+
+        fatores = [int(f) for f in args.fatores.split(",")]
+        for configuracao in args.configuracoes.split(","):
+            modo, _, dimensoes = configuracao.partition("@")
+            resultados.extend(medir(diretorio, modo, int(dimensoes or 0), fatores, consultas, args.k, referencia))
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    relatorio = {
+        "parametros": vars(args),
+        "corpus": corpus,
+        "resultados": resultados
+    }
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(saida)
+    print(saida)
+
+if __name__ == "__main__":
+    main()
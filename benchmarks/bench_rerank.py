@@ -0,0 +1,125 @@
+# ============================================
+# BENCHMARK DE RERANKING
+# Compara qualidade e latência dos backends de reranking
+# ============================================
+
+# Uso (a partir da raiz do projeto, com o índice já criado pela CLI nativa):
+#   uv run benchmarks/bench_rerank.py --perguntas perguntas.txt --saida resultado.json
+#
+# A qualidade é medida contra as notas do reranker LLM concorrente, tomadas como
+# referência: nDCG@k e sobreposição do top-k de cada backend com o top-k de referência.
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exemplos", "nativo"))
+
+import main_cli2_nativo as rag
+from rerank import MODOS_RERANK, pontuar, ordenar_por_score, percentis
+
+PERGUNTAS_PADRAO = [
+    "Quais são as regras para concessão de férias aos colaboradores?",
+    "Quem pode trabalhar em regime de home office e quais são as condições?",
+    "Quais comportamentos são considerados inadequados segundo o código de conduta da empresa?",
+    "Quantos dias de férias eu tenho direito?",
+    "A empresa fornece equipamentos para o teletrabalho?",
+    "Posso vender parte das minhas férias (abono pecuniário)?"
+]
+
+REFERENCIA = "concorrente"
+
+def carregar_perguntas(caminho):
+    if not caminho:
+        return PERGUNTAS_PADRAO
+    perguntas = []
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha:
+                continue
+            perguntas.append(json.loads(linha)["pergunta"] if linha.startswith("{") else linha)
+    return perguntas
+
+def recuperar_candidatos(collection, pergunta, n_results):
+    resultados = collection.query(
+        query_embeddings=[rag.gerar_embedding_unico(pergunta)],
+        n_results=n_results,
+        include=["documents", "metadatas"]
+    )
+    return [
+        {"page_content": texto, "metadata": metadata}
+        for texto, metadata in zip(resultados["documents"][0], resultados["metadatas"][0])
+        if texto and texto.strip()
+    ]
+
+def ndcg(ordem, relevancia, k):
+    dcg = sum(relevancia[i] / math.log2(pos + 2) for pos, i in enumerate(ordem[:k]))
+    ideal = sorted(relevancia, reverse=True)
+    idcg = sum(r / math.log2(pos + 2) for pos, r in enumerate(ideal[:k]))
+    return dcg / idcg if idcg else 1.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara backends de reranking (qualidade e latência)")
+    parser.add_argument("--perguntas", help="Arquivo com uma pergunta por linha (texto ou JSONL com 'pergunta')")
+    parser.add_argument("--modos", default=",".join(MODOS_RERANK), help="Backends a comparar, separados por vírgula")
+    parser.add_argument("--n-results", type=int, default=8)
+    parser.add_argument("--k", type=int, default=4, help="Tamanho do contexto final avaliado")
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    modos = args.modos.split(",")
+    collection = rag.abrir_colecao(rag.chromadb.PersistentClient(path=rag.PERSIST_DIRECTORY))
+    if not collection.count():
+        rag.console.print("[bold red]ERRO:[/bold red] Índice vazio. Execute a CLI nativa para criá-lo.")
+        sys.exit(1)
+
+    latencias = {modo: [] for modo in modos}
+    qualidade = {modo: {"ndcg": [], "sobreposicao": []} for modo in modos}
+
+    for pergunta in carregar_perguntas(args.perguntas):
+        candidatos = recuperar_candidatos(collection, pergunta, args.n_results)
+        if not candidatos:
+            continue
+
+        referencia = pontuar(REFERENCIA, pergunta, candidatos, rag.provedores.cliente("geracao"), rag.provedores.modelo("geracao"))
+        top_referencia = {id(doc) for doc in ordenar_por_score(candidatos, referencia)[:args.k]}
+
+        for modo in modos:
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                scores = pontuar(modo, pergunta, candidatos, rag.provedores.cliente("geracao"), rag.provedores.modelo("geracao"))
+                latencias[modo].append(time.perf_counter() - inicio)
+
+            ordem = sorted(range(len(candidatos)), key=lambda i: scores[i], reverse=True)
+            top_modo = {id(candidatos[i]) for i in ordem[:args.k]}
+            qualidade[modo]["ndcg"].append(ndcg(ordem, referencia, args.k))
+            qualidade[modo]["sobreposicao"].append(len(top_modo & top_referencia) / args.k)
+
+    relatorio = {
+        "referencia": REFERENCIA,
+        "k": args.k,
+        "modos": {
+            modo: {
+                "latencia_s": percentis(latencias[modo], pontos=(50, 95)),
+                "ndcg": sum(qualidade[modo]["ndcg"]) / max(1, len(qualidade[modo]["ndcg"])),
+                "sobreposicao_top_k": sum(qualidade[modo]["sobreposicao"]) / max(1, len(qualidade[modo]["sobreposicao"])),
+                "amostras": len(latencias[modo])
+            }
+            for modo in modos
+        }
+    }
+
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(saida)
+    else:
+        print(saida)
+
+if __name__ == "__main__":
+    main()
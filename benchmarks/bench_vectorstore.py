@@ -0,0 +1,171 @@
+# ============================================
+# BENCHMARK DE VECTOR STORES
+# ChromaDB vs. NumPy (mmap) vs. FAISS: construção, latência de consulta e RSS
+# ============================================
+
+# Uso (a partir da raiz do projeto; dados sintéticos, não usa a API):
+#   uv run benchmarks/bench_vectorstore.py --tamanhos 10000,100000 --saida resultado.json
+#   uv run benchmarks/bench_vectorstore.py --tamanhos 1000000 --backends numpy,faiss --dimensoes 1536
+#
+# Cada combinação (backend, tamanho) roda em dois processos separados: um constrói e
+# grava a coleção, outro a abre do disco e mede as consultas. Assim o RSS medido é o
+# de um processo que só consulta, como a CLI depois da primeira indexação.
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exemplos", "nativo"))
+
+from rerank import percentis
+from vectorstore import abrir_colecao_local
+
+CATEGORIAS = ["ferias", "home_office", "conduta", "geral"]
+LOTE = 1000
+
+def rss_mb():
+    # RSS atual (Linux); em outros sistemas, o pico informado por getrusage
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+def gerar_lote(inicio, quantidade, dimensoes, tamanho_texto):
+    rng = np.random.default_rng(inicio)
+    vetores = rng.standard_normal((quantidade, dimensoes)).astype(np.float32)
+    vetores /= np.linalg.norm(vetores, axis=1, keepdims=True)
+    ids = [f"chunk_{i:08d}" for i in range(inicio, inicio + quantidade)]
+    textos = [(f"Trecho {i} da política de RH. " * (tamanho_texto // 30 + 1))[:tamanho_texto] for i in range(inicio, inicio + quantidade)]
+    metadados = [
+        {"documento": f"documentos/doc_{i % 50}.pdf", "pagina": i % 40 + 1, "categoria": CATEGORIAS[i % 4], "inicio": (i % 8) * 650}
+        for i in range(inicio, inicio + quantidade)
+    ]
+    return ids, vetores, textos, metadados
+
+def abrir(backend, diretorio, recriar=False):
+    if backend == "chroma":
+        import chromadb
+        cliente = chromadb.PersistentClient(path=diretorio)
+        if recriar:
+            try:
+                cliente.delete_collection("bench")
+            except Exception:
+                pass
+        return cliente.get_or_create_collection("bench", metadata={"hnsw:space": "cosine"})
+    return abrir_colecao_local(backend, diretorio, recriar=recriar)
+
+# =========================
+# PROCESSOS FILHOS
+# =========================
+
+def construir(args):
+    colecao = abrir(args.backend, args.diretorio, recriar=True)
+    inicio = time.perf_counter()
+    for posicao in range(0, args.tamanho, LOTE):
+        ids, vetores, textos, metadados = gerar_lote(posicao, min(LOTE, args.tamanho - posicao), args.dimensoes, args.tamanho_texto)
+        colecao.upsert(ids=ids, embeddings=vetores, documents=textos, metadatas=metadados)
+    if hasattr(colecao, "salvar"):
+        colecao.salvar()
+    return {"construcao_s": round(time.perf_counter() - inicio, 2), "rss_construcao_mb": round(rss_mb(), 1)}
+
+def consultar(args):
+    rss_inicial = rss_mb()
+    inicio = time.perf_counter()
+    colecao = abrir(args.backend, args.diretorio)
+    abertura = time.perf_counter() - inicio
+
+    rng = np.random.default_rng(12345)
+    consultas = rng.standard_normal((args.consultas, args.dimensoes)).astype(np.float32)
+    filtros = [None, {"categoria": "ferias"}] if args.com_filtro else [None]
+
+    resultado = {"abertura_s": round(abertura, 3), "count": colecao.count()}
+    for filtro in filtros:
+        latencias = []
+        for consulta in consultas:
+            t0 = time.perf_counter()
+            colecao.query(query_embeddings=[consulta.tolist()], n_results=8, where=filtro, include=["documents", "metadatas", "distances"])
+            latencias.append(time.perf_counter() - t0)
+        sufixo = "" if filtro is None else "_filtrada"
+        resultado[f"consulta{sufixo}_ms"] = {
+            ponto: round(valor * 1000, 2) for ponto, valor in percentis(latencias, (50, 95, 99)).items()
+        }
+
+    resultado["rss_base_mb"] = round(rss_inicial, 1)
+    resultado["rss_consulta_mb"] = round(rss_mb(), 1)
+    return resultado
+
+# =========================
+# ORQUESTRAÇÃO
+# =========================
+
+def rodar_filho(etapa, backend, tamanho, diretorio, args):
+    comando = [
+        sys.executable, os.path.abspath(__file__), "--etapa", etapa,
+        "--backend", backend, "--tamanho", str(tamanho), "--diretorio", diretorio,
+        "--dimensoes", str(args.dimensoes), "--tamanho-texto", str(args.tamanho_texto),
+        "--consultas", str(args.consultas)
+    ]
+    if args.com_filtro:
+        comando.append("--com-filtro")
+    saida = subprocess.run(comando, capture_output=True, text=True)
+    if saida.returncode != 0:
+        return {"erro": saida.stderr.strip().splitlines()[-1] if saida.stderr.strip() else f"código {saida.returncode}"}
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de vector stores")
+    parser.add_argument("--tamanhos", default="10000,100000", help="quantidades de chunks, separadas por vírgula")
+    parser.add_argument("--backends", default="chroma,numpy,faiss")
+    parser.add_argument("--dimensoes", type=int, default=1536)
+    parser.add_argument("--tamanho-texto", type=int, default=400)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--com-filtro", action="store_true", help="mede também consultas com where por categoria")
+    parser.add_argument("--saida")
+    # Uso interno (processos filhos)
+    parser.add_argument("--etapa", choices=["construir", "consultar"])
+    parser.add_argument("--backend")
+    parser.add_argument("--tamanho", type=int)
+    parser.add_argument("--diretorio")
+    args = parser.parse_args()
+
+    if args.etapa:
+        etapa = construir if args.etapa == "construir" else consultar
+        print(json.dumps(etapa(args)))
+        return
+
+    resultados = []
+    for tamanho in [int(t) for t in args.tamanhos.split(",")]:
+        for backend in args.backends.split(","):
+            diretorio = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+            try:
+                medicao = {"backend": backend, "chunks": tamanho}
+                medicao.update(rodar_filho("construir", backend, tamanho, diretorio, args))
+                if "erro" not in medicao:
+                    medicao.update(rodar_filho("consultar", backend, tamanho, diretorio, args))
+                print(json.dumps(medicao, ensure_ascii=False), file=sys.stderr)
+                resultados.append(medicao)
+            finally:
+                shutil.rmtree(diretorio, ignore_errors=True)
+
+    relatorio = {"parametros": {k: v for k, v in vars(args).items() if k not in ("etapa", "backend", "tamanho", "diretorio")}, "resultados": resultados}
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(saida)
+    print(saida)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# ============================================
+# TESTE DE CARGA DO SERVIÇO HTTP
+# Requisições concorrentes ao /perguntar: latência p50/p95/p99 e vazão
+# ============================================
+
+# Uso (serviço apontado para o servidor fake, sem custo de API):
+#   uv run benchmarks/servidor_fake_openai.py --porta 8089 --max-concorrencia 64 &
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake uv run exemplos/nativo/servico_http.py &
+#   uv run benchmarks/carga_servico.py --requisicoes 500 --concorrencia 50 --saida resultado.json
+#   uv run benchmarks/carga_servico.py --stream   # mede também o tempo até o primeiro token
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exemplos", "nativo"))
+
+from rerank import percentis
+
+PERGUNTAS = [
+    "Quantos dias de férias tenho direito por ano?",
+    "Posso dividir minhas férias em períodos?",
+    "Quantos dias por semana posso trabalhar em home office?",
+    "A empresa ajuda com custos de internet no trabalho remoto?",
+    "O que o código de conduta diz sobre conflito de interesses?",
+    "Como devo reportar uma violação de ética?",
+    "Preciso de aprovação do gestor para trabalhar remoto?",
+    "Com quanta antecedência devo pedir férias?"
+]
+
+def pergunta_da_vez(i: int, variar: bool) -> str:
+    # Com --variar, cada requisição tem uma pergunta inédita e o cache de respostas não ajuda
+    pergunta = PERGUNTAS[i % len(PERGUNTAS)]
+    return f"{pergunta} (caso {i})" if variar else pergunta
+
+async def enviar(cliente: httpx.AsyncClient, url: str, pergunta: str, stream: bool) -> dict:
+    inicio = time.perf_counter()
+    corpo = {"pergunta": pergunta, "stream": stream}
+
+    if not stream:
+        resposta = await cliente.post(url, json=corpo)
+        return {"status": resposta.status_code, "total": time.perf_counter() - inicio}
+
+    primeiro_token = None
+    async with cliente.stream("POST", url, json=corpo) as resposta:
+        async for linha in resposta.aiter_lines():
+            if primeiro_token is None and linha.startswith("event: token"):
+                primeiro_token = time.perf_counter() - inicio
+            if linha.startswith("event: erro"):
+                return {"status": 599, "total": time.perf_counter() - inicio}
+        return {"status": resposta.status_code, "total": time.perf_counter() - inicio, "primeiro_token": primeiro_token}
+
+async def rodar(args) -> dict:
+    url = args.url.rstrip("/") + "/perguntar"
+    vagas = asyncio.Semaphore(args.concorrencia)
+    limites = httpx.Limits(max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)
+
+    async with httpx.AsyncClient(limits=limites, timeout=args.timeout) as cliente:
+        async def uma(i):
+            async with vagas:
+                try:
+                    return await enviar(cliente, url, pergunta_da_vez(i, args.variar), args.stream)
+                except httpx.HTTPError as e:
+                    return {"status": 0, "erro": type(e).__name__}
+
+        inicio = time.perf_counter()
+        medicoes = await asyncio.gather(*(uma(i) for i in range(args.requisicoes)))
+        duracao = time.perf_counter() - inicio
+
+    sucesso = [m for m in medicoes if m["status"] == 200]
+    resultado = {
+        "requisicoes": args.requisicoes,
+        "sucesso": len(sucesso),
+        "status": {str(s): sum(1 for m in medicoes if m["status"] == s) for s in sorted({m["status"] for m in medicoes})},
+        "segundos": round(duracao, 3),
+        "requisicoes_por_segundo": round(len(sucesso) / duracao, 1)
+    }
+    if sucesso:
+        resultado["latencia_ms"] = {
+            ponto: round(valor * 1000, 1) for ponto, valor in percentis([m["total"] for m in sucesso], (50, 95, 99)).items()
+        }
+        primeiros = [m["primeiro_token"] for m in sucesso if m.get("primeiro_token") is not None]
+        if primeiros:
+            resultado["primeiro_token_ms"] = {
+                ponto: round(valor * 1000, 1) for ponto, valor in percentis(primeiros, (50, 95, 99)).items()
+            }
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do serviço HTTP do agente de RH")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=20)
+    parser.add_argument("--stream", action="store_true", help="usa respostas SSE")
+    parser.add_argument("--variar", action="store_true", help="perguntas sempre diferentes (sem acerto no cache de respostas)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--saida")
+    args = parser.parse_args()
+
+    relatorio = {"parametros": vars(args), "resultado": asyncio.run(rodar(args))}
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(saida)
+    print(saida)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+# ============================================
+# SERVIDOR FAKE DA API OPENAI
+# Endpoints de embeddings e chat locais para testes e benchmarks,
+# com latência, rate limit (429) e falhas 5xx simuladas
+# ============================================
+
+# Uso isolado (para apontar as CLIs para ele):
+#   uv run benchmarks/servidor_fake_openai.py --porta 8089 --latencia 0.2 --max-concorrencia 4
+#   OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake uv run exemplos/nativo/main_cli2_nativo.py
+
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+DIMENSOES_PADRAO = 1536
+
+def vetor_deterministico(texto: str, dimensoes: int) -> list:
+    # Mesmo texto -> mesmo vetor, normalizado como os da API
+    semente = int.from_bytes(hashlib.sha256(texto.encode("utf-8")).digest()[:8], "little")
+    vetor = np.random.default_rng(semente).standard_normal(dimensoes).astype(np.float32)
+    return (vetor / np.linalg.norm(vetor)).tolist()
+
+def nota_deterministica(texto: str) -> int:
+    return int(hashlib.sha256(texto.encode("utf-8")).hexdigest(), 16) % 11
+
+def contar_tokens(texto: str) -> int:
+    # Aproximação (uma palavra = um token), suficiente para exercitar a contabilidade de uso
+    return len(texto.split())
+
+def responder_chat(prompt: str) -> str:
+    """
+    Modelo roteirizado: reconhece os prompts de reranking do projeto e devolve
+    notas determinísticas; qualquer outro prompt recebe uma resposta fixa.
+    """
+    if "Responda apenas com um número de 0 a 10" in prompt:
+        return str(nota_deterministica(prompt))
+
+    quantidade = re.search(r"exatamente (\d+) notas", prompt)
+    if quantidade:
+        trechos = re.split(r"\n\[\d+\]\n", prompt)[1:]
+        notas = [nota_deterministica(trecho) for trecho in trechos][:int(quantidade.group(1))]
+        return json.dumps(notas + [0] * (int(quantidade.group(1)) - len(notas)))
+
+    return (
+        "De acordo com as políticas internas, a solicitação deve ser feita ao RH "
+        "com antecedência mínima de 30 dias e aprovada pelo gestor imediato."
+    )
+
+class ServidorFake(ThreadingHTTPServer):
+    """
+    Servidor HTTP/1.1 (conexões persistentes, como a API) com POST /v1/embeddings,
+    POST /v1/chat/completions (inclusive stream=True, em SSE) e GET /v1/models,
+    compatíveis com o SDK.
+    - latencia: segundos por requisição de embeddings (mais latencia_por_item por texto).
+    - latencia_chat: segundos até o primeiro token do chat; latencia_token: entre tokens.
+    - variacao_chat: desvio (lognormal) da latência do chat; > 0 cria a cauda de
+      chamadas lentas que a API real tem.
+    - latencia_conexao: custo de cada conexão nova (handshake TCP/TLS simulado).
+    - max_concorrencia: acima desse número de requisições simultâneas, responde 429
+      com Retry-After; toda resposta informa x-ratelimit-remaining-requests.
+    - taxa_erro: fração das requisições que falham com 500.
+    - max_caracteres: textos maiores que isso fazem a requisição falhar com 400,
+      como um texto acima do limite de tokens do modelo (0 = sem limite).
+    """
+
+    daemon_threads = True
+    # Fila de conexões pendentes grande o bastante para os testes de carga
+    request_queue_size = 1024
+
+    def __init__(
+        self,
+        endereco=("127.0.0.1", 0),
+        latencia: float = 0.1,
+        latencia_por_item: float = 0.0,
+        max_concorrencia: int = 4,
+        taxa_erro: float = 0.0,
+        dimensoes: int = DIMENSOES_PADRAO,
+        retry_after_ms: int = 200,
+        max_caracteres: int = 0,
+        latencia_chat: float = 0.3,
+        latencia_token: float = 0.01,
+        variacao_chat: float = 0.0,
+        latencia_conexao: float = 0.0
+    ):
+        super().__init__(endereco, ManipuladorFake)
+        self.latencia = latencia
+        self.latencia_por_item = latencia_por_item
+        self.max_concorrencia = max_concorrencia
+        self.taxa_erro = taxa_erro
+        self.dimensoes = dimensoes
+        self.retry_after_ms = retry_after_ms
+        self.max_caracteres = max_caracteres
+        self.latencia_chat = latencia_chat
+        self.latencia_token = latencia_token
+        self.variacao_chat = variacao_chat
+        self.latencia_conexao = latencia_conexao
+        self.em_andamento = 0
+        self.contadores = {"requisicoes": 0, "limitadas": 0, "erros": 0, "textos": 0, "chats": 0, "conexoes": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, porta = self.server_address[:2]
+        return f"http://{host}:{porta}/v1"
+
+    def iniciar(self) -> "ServidorFake":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+class ManipuladorFake(BaseHTTPRequestHandler):
+    server: ServidorFake
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        # Uma vez por conexão: requisições seguintes na mesma conexão não pagam esse custo
+        super().setup()
+        with self.server._lock:
+            self.server.contadores["conexoes"] += 1
+        if self.server.latencia_conexao:
+            time.sleep(self.server.latencia_conexao)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/v1/models":
+            self._responder(404, {"error": {"message": f"Rota não suportada: {self.path}"}})
+            return
+        self._responder(200, {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "created": 0, "owned_by": "fake"}]})
+
+    def _responder(self, status: int, corpo: dict, cabecalhos: dict = None) -> None:
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, str(valor))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_POST(self):
+        servidor = self.server
+        corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        rotas = {
+            "/v1/embeddings": self._embeddings,
+            "/v1/chat/completions": self._chat
+        }
+        rota = rotas.get(self.path.rstrip("/"))
+        if rota is None:
+            self._responder(404, {"error": {"message": f"Rota não suportada: {self.path}"}})
+            return
+
+        with servidor._lock:
+            servidor.contadores["requisicoes"] += 1
+            if servidor.em_andamento >= servidor.max_concorrencia:
+                servidor.contadores["limitadas"] += 1
+                limitada = True
+            else:
+                servidor.em_andamento += 1
+                limitada = False
+            restantes = max(0, servidor.max_concorrencia - servidor.em_andamento)
+
+        if limitada:
+            self._responder(
+                429,
+                {"error": {"message": "Rate limit simulado", "type": "requests", "code": "rate_limit_exceeded"}},
+                {"retry-after-ms": servidor.retry_after_ms, "x-ratelimit-remaining-requests": 0}
+            )
+            return
+
+        try:
+            if random.random() < servidor.taxa_erro:
+                with servidor._lock:
+                    servidor.contadores["erros"] += 1
+                self._responder(500, {"error": {"message": "Falha simulada", "type": "server_error"}})
+                return
+            rota(corpo, {"x-ratelimit-remaining-requests": restantes})
+        finally:
+            with servidor._lock:
+                servidor.em_andamento -= 1
+
+    def _embeddings(self, corpo: dict, cabecalhos: dict) -> None:
+        servidor = self.server
+        entradas = corpo.get("input", [])
+        if isinstance(entradas, str):
+            entradas = [entradas]
+
+        if servidor.max_caracteres and any(len(texto) > servidor.max_caracteres for texto in entradas):
+            self._responder(400, {"error": {"message": "Texto acima do limite do modelo", "type": "invalid_request_error"}})
+            return
+
+        time.sleep(servidor.latencia + servidor.latencia_por_item * len(entradas))
+
+        with servidor._lock:
+            servidor.contadores["textos"] += len(entradas)
+
+        self._responder(
+            200,
+            {
+                "object": "list",
+                "model": corpo.get("model", "fake"),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": vetor_deterministico(texto, servidor.dimensoes)}
+                    for i, texto in enumerate(entradas)
+                ],
+                "usage": {
+                    "prompt_tokens": sum(contar_tokens(texto) for texto in entradas),
+                    "total_tokens": sum(contar_tokens(texto) for texto in entradas)
+                }
+            },
+            cabecalhos
+        )
+
+    def _chat(self, corpo: dict, cabecalhos: dict) -> None:
+        servidor = self.server
+        mensagens = corpo.get("messages", [])
+        prompt = mensagens[-1].get("content", "") if mensagens else ""
+        resposta = responder_chat(prompt)
+        modelo = corpo.get("model", "fake")
+        uso = {
+            "prompt_tokens": contar_tokens(prompt),
+            "completion_tokens": contar_tokens(resposta),
+            "total_tokens": contar_tokens(prompt) + contar_tokens(resposta)
+        }
+
+        with servidor._lock:
+            servidor.contadores["chats"] += 1
+
+        time.sleep(servidor.latencia_chat * (random.lognormvariate(0, servidor.variacao_chat) if servidor.variacao_chat else 1))
+
+        if not corpo.get("stream"):
+            time.sleep(servidor.latencia_token * len(resposta.split()))
+            self._responder(
+                200,
+                {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": modelo,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": resposta}, "finish_reason": "stop"}],
+                    "usage": uso
+                },
+                cabecalhos
+            )
+            return
+
+        # Streaming em SSE, uma palavra por evento; a conexão fecha ao final
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, str(valor))
+        self.end_headers()
+        self.close_connection = True
+
+        palavras = re.findall(r"\S+\s*", resposta)
+        for i, palavra in enumerate(palavras):
+            evento = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": modelo,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": palavra} if i == 0 else {"content": palavra},
+                    "finish_reason": "stop" if i == len(palavras) - 1 else None
+                }]
+            }
+            self.wfile.write(f"data: {json.dumps(evento)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(servidor.latencia_token)
+        if corpo.get("stream_options", {}).get("include_usage"):
+            # Como na API: um último evento sem choices, só com o uso
+            evento = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": modelo, "choices": [], "usage": uso}
+            self.wfile.write(f"data: {json.dumps(evento)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor fake da API OpenAI (embeddings e chat)")
+    parser.add_argument("--porta", type=int, default=8089)
+    parser.add_argument("--latencia", type=float, default=0.1)
+    parser.add_argument("--latencia-por-item", type=float, default=0.0)
+    parser.add_argument("--max-concorrencia", type=int, default=4)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--dimensoes", type=int, default=DIMENSOES_PADRAO)
+    parser.add_argument("--max-caracteres", type=int, default=0)
+    parser.add_argument("--latencia-chat", type=float, default=0.3)
+    parser.add_argument("--latencia-token", type=float, default=0.01)
+    parser.add_argument("--variacao-chat", type=float, default=0.0)
+    parser.add_argument("--latencia-conexao", type=float, default=0.0)
+    args = parser.parse_args()
+
+    servidor = ServidorFake(
+        ("127.0.0.1", args.porta),
+        latencia=args.latencia,
+        latencia_por_item=args.latencia_por_item,
+        max_concorrencia=args.max_concorrencia,
+        taxa_erro=args.taxa_erro,
+        dimensoes=args.dimensoes,
+        max_caracteres=args.max_caracteres,
+        latencia_chat=args.latencia_chat,
+        latencia_token=args.latencia_token,
+        variacao_chat=args.variacao_chat,
+        latencia_conexao=args.latencia_conexao
+    )
+    print(f"Servidor fake em {servidor.base_url}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -11,14 +11,19 @@
 
 import os
 import sys
+import time
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import Chroma
-from langchain_core.prompts import PromptTemplate
+
+# Os módulos do LangChain (carregador de PDF, splitter, Chroma e, via provedores,
+# langchain_openai) são importados no primeiro uso: somados, levam alguns segundos
+# e a pergunta aparece antes deles
+
+# Provedores de modelos, pool de conexões, timeouts, retentativas e disjuntor compartilhados com a versão nativa
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "nativo"))
+import provedores
 from rich.console import Console
-from rich.markdown import Markdown
 
 # Cria uma instância do console para saída formatada
 console = Console()
@@ -26,20 +31,42 @@ console = Console()
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
-# Injeta a chave como variável de ambiente
-if not os.getenv("OPENAI_API_KEY"):
+# A chave só é exigida se alguma etapa usa a OpenAI
+if provedores.chave_necessaria() and not os.getenv("OPENAI_API_KEY"):
     print("ERRO: OPENAI_API_KEY não encontrada no arquivo .env")
     sys.exit(1)
 
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+for aviso in provedores.avisos:
+    print(f"AVISO: {aviso}")
+for erro in provedores.erros:
+    print(f"ERRO: {erro}")
+if provedores.erros:
+    sys.exit(1)
 
 # =========================
 # 2. CONFIGURAÇÕES GERAIS
 # =========================
 
-PERSIST_DIRECTORY = "./chroma_rh"
-EMBEDDING_MODEL = "text-embedding-3-small"
-LLM_MODEL = "gpt-4o-mini"
+# Reranking: "concorrente" (uma chamada por trecho, em paralelo) ou "listwise" (um prompt para todos)
+RERANK_MODE = os.getenv("RERANK_MODE", "concorrente")
+RERANK_MAX_CONCORRENCIA = int(os.getenv("RERANK_MAX_CONCORRENCIA", "8"))
+
+# Outro modelo de embeddings ganha outro diretório (vetores de dimensões diferentes); num
+# servidor compatível sem modelo definido, o nome vem de /models, consultado só aqui
+@functools.lru_cache(maxsize=None)
+def diretorio_indice() -> str:
+    return os.getenv("INDICE_CLI_DIRECTORY", "./chroma_rh") + provedores.sufixo_indice()
+
+# Criados uma vez por processo, no primeiro uso, sobre o mesmo pool de conexões (não a cada pergunta)
+# Provedor de cada etapa (PROVEDOR_EMBEDDINGS, PROVEDOR_LLM, PROVEDOR_RERANK e modelos no .env)
+@functools.lru_cache(maxsize=None)
+def obter_embeddings():
+    return provedores.embeddings_langchain()
+
+@functools.lru_cache(maxsize=None)
+def obter_llms():
+    """LLMs de geração e de reranking, nessa ordem."""
+    return provedores.llm_langchain("geracao"), provedores.llm_langchain("rerank")
 
 # =========================
 # 3. LEITURA DOS DOCUMENTOS
@@ -49,6 +76,8 @@ def carregar_documentos():
     """
     Carrega os PDFs de políticas internas de RH
     """
+    from langchain_community.document_loaders import PyPDFLoader
+
     caminhos = [
         "documentos/politica_ferias.pdf",
         "documentos/politica_home_office.pdf",
@@ -81,6 +110,8 @@ def gerar_chunks(documentos):
     """
     Divide os documentos em chunks semânticos
     """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=800,
         chunk_overlap=150
@@ -113,20 +144,34 @@ def enriquecer_chunks(chunks):
 # 6. VECTOR STORE
 # =========================
 
+def indice_existe():
+    """
+    Verifica se já existe um banco persistido
+    """
+    return os.path.exists(diretorio_indice()) and bool(os.listdir(diretorio_indice()))
+
+def abrir_vectorstore():
+    """
+    Carrega o banco persistido, sem mensagens no terminal
+    (pode rodar em segundo plano)
+    """
+    from langchain_community.vectorstores import Chroma
+
+    return Chroma(
+        persist_directory=diretorio_indice(),
+        embedding_function=obter_embeddings()
+    )
+
 def inicializar_vectorstore():
     """
     Cria ou carrega o banco vetorial.
     Verifica persistência para evitar reprocessamento desnecessário.
     """
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+    from langchain_community.vectorstores import Chroma
 
-    # Verifica se já existe um banco persistido
-    if os.path.exists(PERSIST_DIRECTORY) and os.listdir(PERSIST_DIRECTORY):
+    if indice_existe():
         console.print(">> Banco vetorial existente detectado. Carregando...", end=" ")
-        vectorstore = Chroma(
-            persist_directory=PERSIST_DIRECTORY,
-            embedding_function=embeddings
-        )
+        vectorstore = abrir_vectorstore()
         console.print("OK")
     else:
         console.print(">> Banco vetorial não encontrado. Processando documentos...")
@@ -141,8 +186,8 @@ def inicializar_vectorstore():
         console.print(">> Criando embeddings e salvando banco...", end=" ")
         vectorstore = Chroma.from_documents(
             documents=chunks,
-            embedding=embeddings,
-            persist_directory=PERSIST_DIRECTORY
+            embedding=obter_embeddings(),
+            persist_directory=diretorio_indice()
         )
         console.print("OK")
 
@@ -155,11 +200,15 @@ def inicializar_vectorstore():
 def rerank_documentos(pergunta, documentos, llm):
     """
     Reordena os documentos recuperados com base na relevância
-    usando o próprio LLM (reranking semântico)
+    usando o próprio LLM (reranking semântico).
+    Modo "concorrente": uma chamada por trecho, disparadas em paralelo.
+    Modo "listwise": um único prompt avalia todos os trechos.
     """
-    prompt_rerank = PromptTemplate(
-        input_variables=["pergunta", "texto"],
-        template="""
+    # Prompt listwise e leitura das notas da versão nativa (importados aqui: o
+    # rerank traz o numpy, que não precisa atrasar a primeira pergunta)
+    import rerank
+
+    prompt_rerank = """
 Você é um especialista em políticas internas de RH.
 
 Pergunta do usuário:
@@ -171,36 +220,49 @@ Trecho do documento:
 Avalie a relevância desse trecho para responder a pergunta.
 Responda apenas com um número de 0 a 10.
 """
-    )
 
-    documentos_com_score = []
+    modo = "listwise" if RERANK_MODE == "listwise" else "concorrente"
 
     # Barra de progresso simples no terminal
-    console.print(">> Realizando Reranking...", end=" ")
-    
-    for doc in documentos:
-        score = llm.invoke(
-            prompt_rerank.format(
-                pergunta=pergunta,
-                texto=doc.page_content
-            )
-        ).content
+    console.print(f">> Realizando Reranking ({modo})...", end=" ")
+    inicio = time.perf_counter()
 
+    if modo == "listwise":
         try:
-            score = float(score)
-        except:
-            score = 0
+            resposta = llm.invoke(
+                rerank.montar_prompt_listwise(pergunta, [doc.page_content for doc in documentos])
+            ).content
+            scores = rerank.extrair_scores_listwise(resposta, len(documentos))
+        except Exception as e:
+            # Como na versão nativa: sem notas, vale a ordem da busca
+            console.print(f"[yellow]⚠️[/yellow] Erro no reranking: {e}", end=" ")
+            scores = [0] * len(documentos)
+    else:
+        # Chamadas em paralelo, limitadas por max_concurrency
+        respostas = llm.batch(
+            [prompt_rerank.format(pergunta=pergunta, texto=doc.page_content) for doc in documentos],
+            config={"max_concurrency": RERANK_MAX_CONCORRENCIA},
+            return_exceptions=True
+        )
 
-        documentos_com_score.append((score, doc))
+        scores = []
+        for resposta in respostas:
+            try:
+                scores.append(float(resposta.content))
+            except (AttributeError, TypeError, ValueError):
+                # Exceções devolvidas pelo batch não têm .content: valem 0
+                scores.append(0)
 
-    # Ordena do mais relevante para o menos relevante
+    # Ordena do mais relevante para o menos relevante (empates mantêm a ordem da busca)
     documentos_ordenados = sorted(
-        documentos_com_score,
+        zip(scores, documentos),
         key=lambda x: x[0],
         reverse=True
     )
 
-    console.print("OK")
+    duracao = rerank.registrar_latencia(modo, inicio)
+    latencias = rerank.percentis(rerank.LATENCIAS[modo])
+    console.print(f"OK ({duracao:.2f}s | p50 {latencias['p50']:.2f}s · p95 {latencias['p95']:.2f}s)")
     # Retorna apenas os documentos
     return [doc for _, doc in documentos_ordenados]
 
@@ -215,10 +277,7 @@ def responder_pergunta(pergunta, vectorstore):
     - Reranking
     - Geração de resposta
     """
-    llm = ChatOpenAI(
-        model=LLM_MODEL,
-        temperature=0
-    )
+    llm, llm_rerank = obter_llms()
 
     # Recuperação inicial (top-k mais alto)
     documentos_recuperados = vectorstore.similarity_search(
@@ -233,7 +292,7 @@ def responder_pergunta(pergunta, vectorstore):
     documentos_rerankeados = rerank_documentos(
         pergunta,
         documentos_recuperados,
-        llm
+        llm_rerank
     )
 
     # Seleciona os melhores
@@ -283,13 +342,28 @@ def imprimir_fontes(fontes):
         console.print(f"  Conteúdo  : {doc.page_content[:150]}...") # Mostra apenas início para não poluir
     console.print("-" * 40)
 
+def preparar_em_segundo_plano():
+    """
+    Carrega o banco vetorial e cria os LLMs
+    enquanto a CLI já espera a primeira pergunta
+    """
+    vectorstore = abrir_vectorstore()
+    obter_llms()
+    return vectorstore
+
 def main():
     limpar_tela()
     imprimir_cabecalho()
 
-    # Inicializa o Vector Store (Carrega ou Cria)
+    # Inicializa o Vector Store: um banco existente carrega em segundo plano
+    # (a pergunta aparece na hora); sem banco, os documentos são processados antes
+    vectorstore, abertura = None, None
     try:
-        vectorstore = inicializar_vectorstore()
+        if indice_existe():
+            console.print(">> Banco vetorial existente detectado. Carregando em segundo plano...")
+            abertura = ThreadPoolExecutor(max_workers=1, thread_name_prefix="abertura").submit(preparar_em_segundo_plano)
+        else:
+            vectorstore = inicializar_vectorstore()
     except Exception as e:
         console.print(f"\nERRO CRÍTICO ao inicializar banco de dados: {e}")
         sys.exit(1)
@@ -307,12 +381,20 @@ def main():
             if not pergunta:
                 continue
 
+            if vectorstore is None:
+                try:
+                    vectorstore = abertura.result()
+                except Exception as e:
+                    console.print(f"\nERRO CRÍTICO ao inicializar banco de dados: {e}")
+                    sys.exit(1)
+
             console.print("\n⏳ Consultando políticas internas...")
             
             try:
                 resposta, fontes = responder_pergunta(pergunta, vectorstore)
                 
                 console.print("\n🤖 Agente:")
+                from rich.markdown import Markdown
                 markdown_text = resposta
                 markdown = Markdown(markdown_text, code_theme="monokai")
                 console.print(markdown)
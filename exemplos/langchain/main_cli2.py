@@ -9,43 +9,76 @@
 
 import os
 import sys
+import time
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_chroma import Chroma
-from langchain_core.prompts import PromptTemplate
 
-# Rich imports
+# Os módulos do LangChain (carregador de PDF, splitter, Chroma e, via provedores,
+# langchain_openai) são importados no primeiro uso: somados, levam alguns segundos
+# e a pergunta aparece antes deles
+
+# Provedores de modelos, pool de conexões, timeouts, retentativas e disjuntor compartilhados com a versão nativa
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "nativo"))
+import provedores
+# Painel da resposta e exibição em streaming, os mesmos da versão nativa
+from terminal import painel_resposta, exibir_resposta_stream
+
+# Rich imports (Progress e Syntax no primeiro uso; Live e Markdown em terminal.py)
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
-from rich.syntax import Syntax
 
 console = Console()
 
 load_dotenv()
 
-if not os.getenv("OPENAI_API_KEY"):
+# A chave só é exigida se alguma etapa usa a OpenAI
+if provedores.chave_necessaria() and not os.getenv("OPENAI_API_KEY"):
     console.print("[bold red]ERRO:[/bold red] OPENAI_API_KEY não encontrada no arquivo .env")
     sys.exit(1)
 
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+for aviso in provedores.avisos:
+    console.print(f"[yellow]AVISO:[/yellow] {aviso}")
+for erro in provedores.erros:
+    console.print(f"[bold red]ERRO:[/bold red] {erro}")
+if provedores.erros:
+    sys.exit(1)
 
 # =========================
 # 2. CONFIGURAÇÕES GERAIS
 # =========================
 
-PERSIST_DIRECTORY = "./chroma_rh"
-EMBEDDING_MODEL = "text-embedding-3-small"
-LLM_MODEL = "gpt-4o-mini"
+# Reranking: "concorrente" (uma chamada por trecho, em paralelo) ou "listwise" (um prompt para todos)
+RERANK_MODE = os.getenv("RERANK_MODE", "concorrente")
+RERANK_MAX_CONCORRENCIA = int(os.getenv("RERANK_MAX_CONCORRENCIA", "8"))
+
+# Exibe a resposta token a token (STREAMING=0 volta a esperar a resposta completa)
+STREAMING = os.getenv("STREAMING", "1") == "1"
+
+# Outro modelo de embeddings ganha outro diretório (vetores de dimensões diferentes); num
+# servidor compatível sem modelo definido, o nome vem de /models, consultado só aqui
+@functools.lru_cache(maxsize=None)
+def diretorio_indice() -> str:
+    return os.getenv("INDICE_CLI_DIRECTORY", "./chroma_rh") + provedores.sufixo_indice()
+
+# Criados uma vez por processo, no primeiro uso, sobre o mesmo pool de conexões (não a cada pergunta)
+# Provedor de cada etapa (PROVEDOR_EMBEDDINGS, PROVEDOR_LLM, PROVEDOR_RERANK e modelos no .env)
+@functools.lru_cache(maxsize=None)
+def obter_embeddings():
+    return provedores.embeddings_langchain()
+
+@functools.lru_cache(maxsize=None)
+def obter_llms():
+    """LLMs de geração e de reranking, nessa ordem."""
+    return provedores.llm_langchain("geracao"), provedores.llm_langchain("rerank")
 
 # =========================
 # 3. LEITURA DOS DOCUMENTOS
 # =========================
 
 def carregar_documentos():
+    from langchain_community.document_loaders import PyPDFLoader
+
     caminhos = [
         "documentos/politica_ferias.pdf",
         "documentos/politica_home_office.pdf",
@@ -75,6 +108,8 @@ def carregar_documentos():
 # =========================
 
 def gerar_chunks(documentos):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=800,
         chunk_overlap=150
@@ -104,15 +139,24 @@ def enriquecer_chunks(chunks):
 # 6. VECTOR STORE
 # =========================
 
+def indice_existe():
+    return os.path.exists(diretorio_indice()) and bool(os.listdir(diretorio_indice()))
+
+def abrir_vectorstore():
+    # Banco já persistido, sem mensagens no terminal: pode abrir em segundo plano
+    from langchain_chroma import Chroma
+
+    return Chroma(
+        persist_directory=diretorio_indice(),
+        embedding_function=obter_embeddings()
+    )
+
 def inicializar_vectorstore():
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+    from langchain_chroma import Chroma
 
-    if os.path.exists(PERSIST_DIRECTORY) and os.listdir(PERSIST_DIRECTORY):
+    if indice_existe():
         with console.status("[bold green]Carregando banco vetorial existente..."):
-            vectorstore = Chroma(
-                persist_directory=PERSIST_DIRECTORY,
-                embedding_function=embeddings
-            )
+            vectorstore = abrir_vectorstore()
         console.print("[green]✓[/green] OK")
     else:
         console.print("[yellow]![/yellow] Banco vetorial não encontrado. Processando documentos...")
@@ -127,8 +171,8 @@ def inicializar_vectorstore():
         with console.status("[bold green]Criando embeddings e salvando banco..."):
             vectorstore = Chroma.from_documents(
                 documents=chunks,
-                embedding=embeddings,
-                persist_directory=PERSIST_DIRECTORY
+                embedding=obter_embeddings(),
+                persist_directory=diretorio_indice()
             )
         console.print("[green]✓[/green] OK")
 
@@ -138,10 +182,8 @@ def inicializar_vectorstore():
 # 7. RERANKING COM BARRA DE PROGRESSO
 # =========================
 
-def rerank_documentos(pergunta, documentos, llm):
-    prompt_rerank = PromptTemplate(
-        input_variables=["pergunta", "texto"],
-        template="""
+# Preenchido com str.format (sem PromptTemplate, que carregaria o langchain_core na importação)
+PROMPT_RERANK = """
 Você é um especialista em políticas internas de RH.
 
 Pergunta do usuário:
@@ -153,62 +195,89 @@ Trecho do documento:
 Avalie a relevância desse trecho para responder a pergunta.
 Responda apenas com um número de 0 a 10.
 """
-    )
 
-    documentos_com_score = []
+def rerank_documentos(pergunta, documentos, llm):
+    # Prompt listwise, leitura das notas e janela de latências da versão nativa (importados
+    # aqui: o rerank traz o numpy, que não precisa atrasar a primeira pergunta)
+    import rerank
 
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-        console=console
-    ) as progress:
-        task = progress.add_task("[cyan]Realizando Reranking...", total=len(documentos))
-        
-        for doc in documentos:
-            score = llm.invoke(
-                prompt_rerank.format(
-                    pergunta=pergunta,
-                    texto=doc.page_content
-                )
-            ).content
+    modo = "listwise" if RERANK_MODE == "listwise" else "concorrente"
+    inicio = time.perf_counter()
 
+    if modo == "listwise":
+        with console.status("[cyan]Realizando Reranking (listwise)..."):
             try:
-                score = float(score)
-            except:
-                score = 0
-
-            documentos_com_score.append((score, doc))
-            progress.update(task, advance=1)
-
-    # ✅ CORREÇÃO: Ordenar os documentos pelo score
+                resposta = llm.invoke(
+                    rerank.montar_prompt_listwise(pergunta, [doc.page_content for doc in documentos])
+                ).content
+                scores = rerank.extrair_scores_listwise(resposta, len(documentos))
+            except Exception as e:
+                # Como na versão nativa: sem notas, vale a ordem da busca
+                console.print(f"[yellow]⚠️[/yellow] Erro no reranking: {e}")
+                scores = [0] * len(documentos)
+    else:
+        prompts = [
+            PROMPT_RERANK.format(pergunta=pergunta, texto=doc.page_content)
+            for doc in documentos
+        ]
+        scores = [0] * len(documentos)
+
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+            console=console
+        ) as progress:
+            task = progress.add_task("[cyan]Realizando Reranking...", total=len(documentos))
+
+            # As chamadas saem em paralelo, limitadas por max_concurrency
+            for i, resultado in llm.batch_as_completed(
+                prompts,
+                config={"max_concurrency": RERANK_MAX_CONCORRENCIA},
+                return_exceptions=True
+            ):
+                if isinstance(resultado, Exception):
+                    console.print(f"[yellow]⚠️[/yellow] Erro no reranking: {resultado}")
+                else:
+                    try:
+                        scores[i] = float(resultado.content)
+                    except (AttributeError, TypeError, ValueError):
+                        scores[i] = 0
+                progress.update(task, advance=1)
+
+    duracao = rerank.registrar_latencia(modo, inicio)
+    latencias = rerank.percentis(rerank.LATENCIAS[modo])
+
+    # ✅ CORREÇÃO: Ordenar os documentos pelo score (sorted é estável: empates mantêm a ordem da busca)
     documentos_ordenados = sorted(
-        documentos_com_score,
+        zip(scores, documentos),
         key=lambda x: x[0],
         reverse=True
     )
 
-    console.print("[green]✓[/green] Reranking concluído")
+    console.print(
+        f"[green]✓[/green] Reranking concluído [dim]({modo}: {duracao:.2f}s | "
+        f"p50 {latencias['p50']:.2f}s · p95 {latencias['p95']:.2f}s)[/dim]"
+    )
     return [doc for _, doc in documentos_ordenados]
 
 # =========================
 # 8. PIPELINE RAG COMPLETO
 # =========================
 
-def responder_pergunta(pergunta, vectorstore):
-    llm = ChatOpenAI(
-        model=LLM_MODEL,
-        temperature=0
-    )
+RESPOSTA_SEM_CONTEXTO = "Não encontrei informações relevantes nos documentos."
 
+def recuperar_contexto(pergunta, vectorstore, llm):
     documentos_recuperados = vectorstore.similarity_search(
         pergunta,
         k=8
     )
 
     if not documentos_recuperados:
-        return "Não encontrei informações relevantes nos documentos.", []
+        return []
 
     documentos_rerankeados = rerank_documentos(
         pergunta,
@@ -216,13 +285,14 @@ def responder_pergunta(pergunta, vectorstore):
         llm
     )
 
-    contexto_final = documentos_rerankeados[:4]
+    return documentos_rerankeados[:4]
 
+def montar_prompt_final(pergunta, contexto_final):
     contexto_texto = "\n\n".join(
         [doc.page_content for doc in contexto_final]
     )
 
-    prompt_final = f"""
+    return f"""
 Você é um agente de RH corporativo.
 Responda APENAS com base nas políticas internas abaixo.
 
@@ -233,10 +303,34 @@ Pergunta:
 {pergunta}
 """
 
-    resposta = llm.invoke(prompt_final)
+def responder_pergunta(pergunta, vectorstore):
+    llm, llm_rerank = obter_llms()
+    contexto_final = recuperar_contexto(pergunta, vectorstore, llm_rerank)
+    if not contexto_final:
+        return RESPOSTA_SEM_CONTEXTO, []
+
+    resposta = llm.invoke(montar_prompt_final(pergunta, contexto_final))
 
     return resposta.content, contexto_final
 
+def responder_pergunta_stream(pergunta, vectorstore):
+    """
+    Gera eventos ("token", texto) à medida que o LLM responde
+    e, ao final, ("fontes", contexto_final).
+    """
+    llm, llm_rerank = obter_llms()
+    contexto_final = recuperar_contexto(pergunta, vectorstore, llm_rerank)
+    if not contexto_final:
+        yield "token", RESPOSTA_SEM_CONTEXTO
+        yield "fontes", []
+        return
+
+    for chunk in llm.stream(montar_prompt_final(pergunta, contexto_final)):
+        if chunk.content:
+            yield "token", chunk.content
+
+    yield "fontes", contexto_final
+
 # =========================
 # 9. INTERFACE DE TERMINAL
 # =========================
@@ -254,6 +348,8 @@ def imprimir_cabecalho():
     console.print("\nDigite sua pergunta ou '[bold]sair[/bold]' para encerrar.\n")
 
 def imprimir_fontes(fontes):
+    from rich.syntax import Syntax
+
     console.print(Panel(
         "[bold]📚 FONTES UTILIZADAS[/bold]",
         border_style="yellow",
@@ -274,12 +370,31 @@ def imprimir_fontes(fontes):
         )
         console.print(syntax)
 
+def preparar_em_segundo_plano():
+    """Abre o banco vetorial e cria os LLMs enquanto a CLI já espera a primeira pergunta."""
+    vectorstore = abrir_vectorstore()
+    obter_llms()
+    painel_resposta("")
+    return vectorstore
+
+def aguardar_vectorstore(abertura):
+    if not abertura.done():
+        with console.status("[bold green]Carregando banco vetorial existente...", spinner="dots"):
+            abertura.exception()
+    return abertura.result()
+
 def main():
     limpar_tela()
     imprimir_cabecalho()
 
+    # Banco existente: abre em segundo plano e a pergunta aparece na hora;
+    # sem banco, os documentos são indexados antes da primeira pergunta
+    vectorstore, abertura = None, None
     try:
-        vectorstore = inicializar_vectorstore()
+        if indice_existe():
+            abertura = ThreadPoolExecutor(max_workers=1, thread_name_prefix="abertura").submit(preparar_em_segundo_plano)
+        else:
+            vectorstore = inicializar_vectorstore()
     except Exception as e:
         console.print(Panel(f"[bold red]ERRO CRÍTICO:[/bold red] {e}", border_style="red"))
         sys.exit(1)
@@ -297,20 +412,24 @@ def main():
             if not pergunta:
                 continue
 
-            with console.status("[bold green]Consultando políticas internas...", spinner="dots"):
+            if vectorstore is None:
                 try:
-                    resposta, fontes = responder_pergunta(pergunta, vectorstore)
+                    vectorstore = aguardar_vectorstore(abertura)
                 except Exception as e:
-                    console.print(f"\n[bold red]❌ Erro ao processar a pergunta:[/bold red] {e}")
-                    continue
-
-            console.print()
-            console.print(Panel(
-                Markdown(resposta, code_theme="monokai"),
-                title="[bold blue]🤖 Agente[/bold blue]",
-                border_style="blue",
-                padding=(1, 2)
-            ))
+                    console.print(Panel(f"[bold red]ERRO CRÍTICO:[/bold red] {e}", border_style="red"))
+                    sys.exit(1)
+
+            try:
+                if STREAMING:
+                    fontes = exibir_resposta_stream(console, responder_pergunta_stream(pergunta, vectorstore))
+                else:
+                    with console.status("[bold green]Consultando políticas internas...", spinner="dots"):
+                        resposta, fontes = responder_pergunta(pergunta, vectorstore)
+                    console.print()
+                    console.print(painel_resposta(resposta))
+            except Exception as e:
+                console.print(f"\n[bold red]❌ Erro ao processar a pergunta:[/bold red] {e}")
+                continue
             
             if fontes:
                 imprimir_fontes(fontes)
@@ -8,51 +8,77 @@
 # =========================
 
 import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import itertools
+import threading
 import streamlit as st
 from dotenv import load_dotenv
 from langchain_community.document_loaders import PyPDFLoader # Loaders e chunking
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI # Embeddings e LLM
 from langchain_community.vectorstores import Chroma # Vector Store
 from langchain_core.prompts import PromptTemplate # Prompt
 
+# Provedores de modelos, pool de conexões, timeouts, retentativas e disjuntor compartilhados com a versão nativa;
+# prompt e leitura das notas do reranking listwise também são os da versão nativa
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "nativo"))
+import provedores
+import rerank
+
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
-# Injeta a chave como variável de ambiente
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
-
 # =========================
 # 2. CONFIGURAÇÕES GERAIS
 # =========================
 
-# Diretório do banco vetorial
-PERSIST_DIRECTORY = "./chroma_rh"
+# Diretório dos índices versionados: cada construção fica em PERSIST_DIRECTORY/<versão>_<data>
+# e o arquivo ATUAL aponta para a construção em uso (separado do ./chroma_rh das CLIs)
+PERSIST_DIRECTORY = os.getenv("INDICE_WEB_DIRECTORY", "./chroma_rh_web")
+ARQUIVO_VERSAO_ATIVA = "ATUAL"
+COLLECTION_NAME = "rh_documentos"
+
+# Intervalo, em segundos, entre as verificações de alteração nos PDFs
+INDICE_VERIFICACAO_SEGUNDOS = float(os.getenv("INDICE_VERIFICACAO_SEGUNDOS", "60"))
+
+# Tempo que uma versão substituída é mantida no disco: outros processos do servidor
+# (que trocam de versão na própria verificação) podem ainda estar respondendo com ela
+INDICE_RETENCAO_SEGUNDOS = float(os.getenv("INDICE_RETENCAO_SEGUNDOS", "3600"))
 
-# Modelo de embeddings
-EMBEDDING_MODEL = "text-embedding-3-small"
+# Marcador de construção em andamento (PERSIST_DIRECTORY/<construção>.construindo);
+# mais antigo que isso, é sobra de um processo interrompido
+CONSTRUCAO_ABANDONADA_SEGUNDOS = 24 * 3600
 
-# Modelo de linguagem
-LLM_MODEL = "gpt-4o-mini"
+CAMINHOS_DOCUMENTOS = [
+    "documentos/politica_ferias.pdf",
+    "documentos/politica_home_office.pdf",
+    "documentos/codigo_conduta.pdf"
+]
+
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
+
+# Reranking: "concorrente" (uma chamada por trecho, em paralelo) ou "listwise" (um prompt para todos)
+RERANK_MODE = "listwise" if os.getenv("RERANK_MODE", "concorrente") == "listwise" else "concorrente"
+RERANK_MAX_CONCORRENCIA = int(os.getenv("RERANK_MAX_CONCORRENCIA", "8"))
 
 # =========================
 # 3. LEITURA DOS DOCUMENTOS
 # =========================
 
-@st.cache_data
 def carregar_documentos():
     """
     Carrega os PDFs de políticas internas de RH
+    (só na construção de uma versão do índice, nunca por pergunta)
     """
-    caminhos = [
-        "documentos/politica_ferias.pdf",
-        "documentos/politica_home_office.pdf",
-        "documentos/codigo_conduta.pdf"
-    ]
-
     documentos = []
 
-    for caminho in caminhos:
+    for caminho in CAMINHOS_DOCUMENTOS:
+        if not os.path.exists(caminho):
+            continue
         loader = PyPDFLoader(caminho)
         docs = loader.load()
 
@@ -72,8 +98,8 @@ def gerar_chunks(documentos):
     Divide os documentos em chunks semânticos
     """
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=150
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
     )
 
     return splitter.split_documents(documentos)
@@ -104,21 +130,189 @@ def enriquecer_chunks(chunks):
 # 6. VECTOR STORE
 # =========================
 
-@st.cache_resource
-def criar_vectorstore(_chunks):
+def versao_corpus():
     """
-    Cria ou carrega o banco vetorial.
-    O parâmetro _chunks não entra no hash do cache.
+    Identifica o corpus pelos PDFs (caminho, tamanho, data de modificação) e pelos
+    parâmetros que mudam os vetores. Barato o bastante para ser verificado periodicamente.
     """
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
-
-    vectorstore = Chroma.from_documents(
-        documents=_chunks,
-        embedding=embeddings,
-        persist_directory=PERSIST_DIRECTORY
+    arquivos = []
+    for caminho in CAMINHOS_DOCUMENTOS:
+        try:
+            info = os.stat(caminho)
+            arquivos.append([caminho, info.st_size, info.st_mtime_ns])
+        except OSError:
+            arquivos.append([caminho, None, None])
+
+    assinatura = {
+        "arquivos": arquivos,
+        # Trocar de provedor ou de modelo de embeddings gera uma nova versão do índice
+        "embedding_model": provedores.identificador_embeddings(),
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP
+    }
+    return hashlib.sha256(json.dumps(assinatura, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def ler_construcao_ativa():
+    try:
+        with open(os.path.join(PERSIST_DIRECTORY, ARQUIVO_VERSAO_ATIVA), "r", encoding="utf-8") as f:
+            nome = f.read().strip()
+    except OSError:
+        return None
+    return nome if nome and os.path.isdir(os.path.join(PERSIST_DIRECTORY, nome)) else None
+
+def gravar_construcao_ativa(nome):
+    # Gravação atômica: outro processo nunca lê um ponteiro pela metade
+    caminho = os.path.join(PERSIST_DIRECTORY, ARQUIVO_VERSAO_ATIVA)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        f.write(nome)
+    os.replace(caminho + ".tmp", caminho)
+
+def carimbo_construcao(nome):
+    """Horário de criação de uma construção <versão>_<data>, ou None se o nome não tem esse formato."""
+    try:
+        return time.mktime(time.strptime(nome.rsplit("_", 1)[1], "%Y%m%d%H%M%S"))
+    except (IndexError, ValueError):
+        return None
+
+def em_construcao(nome, agora):
+    try:
+        marcada_em = os.path.getmtime(os.path.join(PERSIST_DIRECTORY, nome + ".construindo"))
+    except OSError:
+        return False
+    return agora - marcada_em < CONSTRUCAO_ABANDONADA_SEGUNDOS
+
+def abrir_vectorstore(nome, embeddings):
+    return Chroma(
+        collection_name=COLLECTION_NAME,
+        persist_directory=os.path.join(PERSIST_DIRECTORY, nome),
+        embedding_function=embeddings
     )
 
-    return vectorstore
+def construir_vectorstore(versao, embeddings):
+    """
+    Indexa o corpus do zero num diretório novo e retorna (nome, vectorstore).
+    O nome nunca se repete, então nenhum cliente Chroma aberto aponta para um
+    diretório apagado ou reconstruído. Durante a construção, o marcador
+    <nome>.construindo impede que outro processo apague o diretório.
+    """
+    nome = f"{versao}_{time.strftime('%Y%m%d%H%M%S')}"
+    marcador = os.path.join(PERSIST_DIRECTORY, nome + ".construindo")
+    with open(marcador, "w", encoding="utf-8") as f:
+        f.write(str(os.getpid()))
+
+    try:
+        chunks = enriquecer_chunks(gerar_chunks(carregar_documentos()))
+        if not chunks:
+            raise RuntimeError("Nenhum documento carregado. Verifique a pasta 'documentos'.")
+
+        vectorstore = Chroma.from_documents(
+            documents=chunks,
+            embedding=embeddings,
+            collection_name=COLLECTION_NAME,
+            persist_directory=os.path.join(PERSIST_DIRECTORY, nome)
+        )
+    finally:
+        os.remove(marcador)
+    return nome, vectorstore
+
+class IndiceVersionado:
+    """
+    Índice compartilhado por todas as sessões do servidor Streamlit.
+    - Abre a versão ativa já construída; só indexa na primeira execução.
+    - Uma thread verifica os PDFs a cada INDICE_VERIFICACAO_SEGUNDOS e, se mudaram,
+      constrói a nova versão em segundo plano enquanto a anterior continua respondendo.
+    - A troca é só a substituição de self.vectorstore. A versão atual e a anterior
+      nunca são apagadas; as mais antigas, só INDICE_RETENCAO_SEGUNDOS depois de
+      substituídas (outros processos do servidor podem ainda usá-las) e nunca
+      enquanto outro processo as constrói.
+    """
+
+    def __init__(self):
+        self.embeddings = provedores.embeddings_langchain()
+        self.vectorstore = None
+        self.versao = None
+        self.construcao = None
+        self.atualizando = False
+        self.erro = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        os.makedirs(PERSIST_DIRECTORY, exist_ok=True)
+        construcao = ler_construcao_ativa()
+
+        if construcao is None:
+            # Primeira execução: não há o que servir enquanto o índice não existir
+            self._atualizar(versao_corpus())
+        else:
+            self.vectorstore = abrir_vectorstore(construcao, self.embeddings)
+            self.construcao = construcao
+            self.versao = construcao.split("_")[0]
+            self.verificar()
+
+        threading.Thread(target=self._monitorar, daemon=True).start()
+        return self
+
+    def verificar(self):
+        """Dispara a reconstrução em segundo plano se os PDFs mudaram."""
+        versao = versao_corpus()
+        with self._lock:
+            if versao == self.versao or self.atualizando:
+                return
+            self.atualizando = True
+        threading.Thread(target=self._atualizar, args=(versao,), daemon=True).start()
+
+    def _monitorar(self):
+        while True:
+            time.sleep(INDICE_VERIFICACAO_SEGUNDOS)
+            self.verificar()
+
+    def _atualizar(self, versao):
+        try:
+            construcao, vectorstore = construir_vectorstore(versao, self.embeddings)
+            gravar_construcao_ativa(construcao)
+            anterior = self.construcao
+            self.vectorstore, self.versao, self.construcao, self.erro = vectorstore, versao, construcao, None
+            self._remover_versoes_antigas(construcao, anterior)
+        except Exception as e:
+            # Sem a nova versão, a anterior continua em uso
+            self.erro = str(e)
+            if self.vectorstore is None:
+                raise
+        finally:
+            self.atualizando = False
+
+    def _remover_versoes_antigas(self, atual, anterior):
+        limite = carimbo_construcao(anterior) if anterior else None
+        if limite is None:
+            return
+
+        agora = time.time()
+        construcoes = sorted(
+            (carimbo_construcao(nome), nome) for nome in os.listdir(PERSIST_DIRECTORY)
+            if os.path.isdir(os.path.join(PERSIST_DIRECTORY, nome)) and carimbo_construcao(nome) is not None
+        )
+        for posicao, (carimbo, nome) in enumerate(construcoes):
+            # Só as mais antigas que a anterior; a seguinte na lista é a que a substituiu
+            if carimbo >= limite or nome in (atual, anterior) or em_construcao(nome, agora):
+                continue
+            if agora - construcoes[posicao + 1][0] < INDICE_RETENCAO_SEGUNDOS:
+                continue
+            shutil.rmtree(os.path.join(PERSIST_DIRECTORY, nome), ignore_errors=True)
+
+@st.cache_resource(show_spinner="Carregando índice das políticas internas...")
+def obter_indice():
+    """
+    Um único índice por processo do servidor, compartilhado entre sessões e reruns.
+    """
+    return IndiceVersionado().iniciar()
+
+@st.cache_resource
+def obter_llms():
+    """
+    LLMs de geração e de reranking do provedor configurado, criados uma vez por
+    processo sobre o mesmo pool de conexões, em vez de um ChatOpenAI por pergunta.
+    """
+    return provedores.llm_langchain("geracao"), provedores.llm_langchain("rerank")
 
 # =========================
 # 7. RERANKING (PARTE CHAVE!)
@@ -127,7 +321,9 @@ def criar_vectorstore(_chunks):
 def rerank_documentos(pergunta, documentos, llm):
     """
     Reordena os documentos recuperados com base na relevância
-    usando o próprio LLM (reranking semântico)
+    usando o próprio LLM (reranking semântico).
+    Modo "concorrente": uma chamada por trecho, disparadas em paralelo.
+    Modo "listwise": um único prompt avalia todos os trechos.
     """
 
     prompt_rerank = PromptTemplate(
@@ -146,26 +342,40 @@ Responda apenas com um número de 0 a 10.
 """
     )
 
-    documentos_com_score = []
-
-    for doc in documentos:
-        score = llm.invoke(
-            prompt_rerank.format(
-                pergunta=pergunta,
-                texto=doc.page_content
-            )
-        ).content
+    inicio = time.perf_counter()
 
+    if RERANK_MODE == "listwise":
         try:
-            score = float(score)
-        except:
-            score = 0
-
-        documentos_com_score.append((score, doc))
-
-    # Ordena do mais relevante para o menos relevante
+            resposta = llm.invoke(
+                rerank.montar_prompt_listwise(pergunta, [doc.page_content for doc in documentos])
+            ).content
+            scores = rerank.extrair_scores_listwise(resposta, len(documentos))
+        except Exception as e:
+            # Como na versão nativa: sem notas, vale a ordem da busca
+            st.warning(f"Erro no reranking: {e}")
+            scores = [0] * len(documentos)
+    else:
+        # Chamadas em paralelo, limitadas por max_concurrency
+        respostas = llm.batch(
+            [prompt_rerank.format(pergunta=pergunta, texto=doc.page_content) for doc in documentos],
+            config={"max_concurrency": RERANK_MAX_CONCORRENCIA},
+            return_exceptions=True
+        )
+
+        scores = []
+        for resposta in respostas:
+            try:
+                scores.append(float(resposta.content))
+            except (AttributeError, TypeError, ValueError):
+                # Exceções devolvidas pelo batch não têm .content: valem 0
+                scores.append(0)
+
+    # Janela de latências do processo (exibida com a resposta)
+    rerank.registrar_latencia(RERANK_MODE, inicio)
+
+    # Ordena do mais relevante para o menos relevante (empates mantêm a ordem da busca)
     documentos_ordenados = sorted(
-        documentos_com_score,
+        zip(scores, documentos),
         key=lambda x: x[0],
         reverse=True
     )
@@ -177,20 +387,12 @@ Responda apenas com um número de 0 a 10.
 # 8. PIPELINE RAG COMPLETO
 # =========================
 
-def responder_pergunta(pergunta, vectorstore):
+def recuperar_contexto(pergunta, vectorstore, llm):
     """
-    Pipeline completo:
-    - Recuperação
-    - Reranking
-    - Geração de resposta
+    Recuperação inicial seguida de reranking.
+    Retorna os trechos que vão para o prompt final.
     """
 
-    # LLM
-    llm = ChatOpenAI(
-        model=LLM_MODEL,
-        temperature=0
-    )
-
     # Recuperação inicial (top-k mais alto)
     documentos_recuperados = vectorstore.similarity_search(
         pergunta,
@@ -205,14 +407,17 @@ def responder_pergunta(pergunta, vectorstore):
     )
 
     # Seleciona os melhores
-    contexto_final = documentos_rerankeados[:4]
+    return documentos_rerankeados[:4]
 
-    # Prompt final
+def montar_prompt_final(pergunta, contexto_final):
+    """
+    Monta o prompt final com os trechos selecionados
+    """
     contexto_texto = "\n\n".join(
         [doc.page_content for doc in contexto_final]
     )
 
-    prompt_final = f"""
+    return f"""
 Você é um agente de RH corporativo.
 Responda APENAS com base nas políticas internas abaixo.
 
@@ -223,10 +428,39 @@ Pergunta:
 {pergunta}
 """
 
-    resposta = llm.invoke(prompt_final)
+def responder_pergunta(pergunta, vectorstore):
+    """
+    Pipeline completo:
+    - Recuperação
+    - Reranking
+    - Geração de resposta
+    """
+
+    llm, llm_rerank = obter_llms()
+
+    contexto_final = recuperar_contexto(pergunta, vectorstore, llm_rerank)
+
+    resposta = llm.invoke(montar_prompt_final(pergunta, contexto_final))
 
     return resposta.content, contexto_final
 
+def responder_pergunta_stream(pergunta, vectorstore):
+    """
+    Pipeline completo em streaming:
+    gera eventos ("token", texto) à medida que o LLM responde
+    e, ao final, ("fontes", contexto_final)
+    """
+
+    llm, llm_rerank = obter_llms()
+
+    contexto_final = recuperar_contexto(pergunta, vectorstore, llm_rerank)
+
+    for chunk in llm.stream(montar_prompt_final(pergunta, contexto_final)):
+        if chunk.content:
+            yield "token", chunk.content
+
+    yield "fontes", contexto_final
+
 # =========================
 # 9. INTERFACE STREAMLIT
 # =========================
@@ -234,19 +468,49 @@ Pergunta:
 st.set_page_config(page_title="Agente de RH com RAG", layout="wide")
 st.title("🤖 Agente de RH — Políticas Internas")
 
+# Configuração que faria todas as chamadas falharem: para antes de abrir o índice
+for erro in provedores.erros:
+    st.error(erro)
+if provedores.erros:
+    st.stop()
+
+indice = obter_indice()
+if indice.atualizando:
+    st.info("Os documentos mudaram: o índice está sendo atualizado em segundo plano. As respostas usam a versão anterior até a troca.")
+elif indice.erro:
+    st.warning(f"Falha ao atualizar o índice; usando a versão {indice.versao}: {indice.erro}")
+
 pergunta = st.text_input("Digite sua pergunta sobre políticas internas de RH:")
 
 if pergunta:
+    fontes = []
+
+    def tokens_resposta(eventos):
+        # Repassa os tokens ao st.write_stream e guarda as fontes do último evento
+        for tipo, valor in eventos:
+            if tipo == "token":
+                yield valor
+            else:
+                fontes.extend(valor)
+
     with st.spinner("Consultando políticas internas..."):
-        documentos = carregar_documentos()
-        chunks = gerar_chunks(documentos)
-        chunks = enriquecer_chunks(chunks)
-        vectorstore = criar_vectorstore(chunks)
+        # Só recuperação e geração por pergunta: o índice já está aberto
+        inicio = time.perf_counter()
+        eventos = responder_pergunta_stream(pergunta, indice.vectorstore)
 
-        resposta, fontes = responder_pergunta(pergunta, vectorstore)
+        # Busca e reranking acontecem até o primeiro token chegar
+        primeiro_evento = next(eventos)
+        tempo_primeiro_token = time.perf_counter() - inicio
 
     st.subheader("Resposta")
-    st.write(resposta)
+    st.write_stream(tokens_resposta(itertools.chain([primeiro_evento], eventos)))
+    latencias_rerank = rerank.percentis(rerank.LATENCIAS[RERANK_MODE])
+    st.caption(
+        f"Primeiro token em {tempo_primeiro_token:.2f}s · "
+        f"resposta completa em {time.perf_counter() - inicio:.2f}s · "
+        f"reranking p50 {latencias_rerank['p50']:.2f}s · p95 {latencias_rerank['p95']:.2f}s · "
+        f"índice {indice.versao}"
+    )
 
     st.subheader("Fontes utilizadas")
     for i, doc in enumerate(fontes, start=1):
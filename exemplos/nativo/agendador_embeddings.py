@@ -0,0 +1,318 @@
+# ============================================
+# AGENDADOR DE EMBEDDINGS
+# Lotes por contagem de tokens, várias requisições em voo,
+# retentativas com backoff e concorrência adaptada ao rate limit
+# ============================================
+
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+import telemetria
+from clientes_openai import sem_retentativas
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# =========================
+# 1. CONTAGEM DE TOKENS
+# =========================
+
+def criar_contador_tokens(modelo: Union[str, Callable[[], str]]) -> Callable[[str], int]:
+    """
+    Usa o tokenizer do modelo quando o tiktoken está instalado.
+    Sem ele (ou sem acesso para baixar o vocabulário), estima de forma
+    conservadora: 1 token a cada 3 caracteres. O vocabulário é carregado
+    na primeira contagem, não na criação do contador; `modelo` pode ser uma
+    função, chamada só nesse momento.
+    """
+    estimativa = lambda texto: len(texto) // 3 + 1
+    if tiktoken is None:
+        return estimativa
+
+    contador = None
+
+    def contar(texto: str) -> int:
+        nonlocal contador
+        if contador is None:
+            try:
+                try:
+                    codificador = tiktoken.encoding_for_model(modelo() if callable(modelo) else modelo)
+                except KeyError:
+                    codificador = tiktoken.get_encoding("cl100k_base")
+                contador = lambda texto: len(codificador.encode(texto, disallowed_special=()))
+            except Exception:
+                contador = estimativa
+        return contador(texto)
+
+    return contar
+
+def lotes_por_tokens(
+    itens: Iterable[Any],
+    contar_tokens: Callable[[str], int],
+    max_tokens: int,
+    max_itens: int,
+    texto: Callable[[Any], str] = lambda item: item
+) -> Iterator[Tuple[List[Any], int]]:
+    # Fecha o lote quando o próximo item estouraria o limite de tokens ou de itens
+    lote, tokens_lote = [], 0
+    for item in itens:
+        tokens = contar_tokens(texto(item))
+        if lote and (tokens_lote + tokens > max_tokens or len(lote) >= max_itens):
+            yield lote, tokens_lote
+            lote, tokens_lote = [], 0
+        lote.append(item)
+        tokens_lote += tokens
+    if lote:
+        yield lote, tokens_lote
+
+# =========================
+# 2. AGENDADOR
+# =========================
+
+def _inteiro_cabecalho(headers, nome: str) -> Optional[int]:
+    try:
+        return int(headers.get(nome))
+    except (TypeError, ValueError):
+        return None
+
+def _espera_retry_after(headers) -> Optional[float]:
+    if headers is None:
+        return None
+    for nome, escala in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers.get(nome)) * escala
+        except (TypeError, ValueError):
+            continue
+    return None
+
+class AgendadorEmbeddings:
+    """
+    Envia embeddings à API com até max_em_voo requisições simultâneas.
+    - Lotes fechados por tokens (max_tokens_lote) e por itens (max_itens_lote).
+    - 429 e 5xx (e falhas de conexão) são repetidos com backoff exponencial
+      com jitter, respeitando Retry-After quando presente.
+    - A concorrência efetiva cai pela metade a cada 429, sobe de um em um a
+      cada sucesso e nunca passa do que x-ratelimit-remaining-requests permite.
+    - Com um cache (CacheEmbeddings), só os textos ausentes vão para a API.
+    - Um lote recusado pela API (400) é dividido ao meio até isolar os textos
+      inválidos, que recebem None; os demais vetores do lote são aproveitados.
+      Se nenhuma requisição foi aceita ainda e nem um texto trivial passa, o
+      problema é a requisição (modelo, parâmetros): RuntimeError, sem marcar nada.
+    - Com dimensoes, pede vetores menores à API (parâmetro dimensions); o cache
+      separa os vetores por `identificador` (padrão: modelo@dimensoes).
+    """
+
+    def __init__(
+        self,
+        client,
+        modelo: Union[str, Callable[[], str]],
+        cache=None,
+        max_tokens_lote: int = 16000,
+        max_itens_lote: int = 2048,
+        max_em_voo: int = 4,
+        max_tentativas: int = 6,
+        espera_base: float = 0.5,
+        espera_maxima: float = 30.0,
+        dimensoes: int = 0,
+        max_tokens_texto: int = 8191,
+        identificador: Union[str, Callable[[], str], None] = None
+    ):
+        # Um cliente ou uma função que o cria na primeira requisição (o SDK da
+        # OpenAI só é importado quando há algo a enviar)
+        self._criar_client = client if callable(client) else (lambda: client)
+        self._client = None
+        # Modelo e identificador também podem vir de funções, chamadas no primeiro uso
+        # (ex.: o modelo de um servidor compatível, negociado via /models)
+        self._modelo = modelo
+        self._identificador = identificador
+        self.cache = cache
+        self.max_tokens_lote = max_tokens_lote
+        self.max_itens_lote = max_itens_lote
+        self.max_em_voo = max_em_voo
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.dimensoes = dimensoes
+        self.max_tokens_texto = max_tokens_texto
+        self.contar_tokens = criar_contador_tokens(lambda: self.modelo)
+
+        self.limite_em_voo = max_em_voo
+        self.pausa_ate = 0.0
+        self.requisicoes = 0
+        self.retentativas = 0
+        self.recusados = 0
+        # Se alguma requisição já foi aceita: até lá, um 400 pode ser da própria requisição
+        self._aceita = False
+        self._lock = threading.Lock()
+
+    @property
+    def modelo(self) -> str:
+        if callable(self._modelo):
+            self._modelo = self._modelo()
+        return self._modelo
+
+    @property
+    def identificador(self) -> str:
+        if callable(self._identificador):
+            self._identificador = self._identificador()
+        elif self._identificador is None:
+            self._identificador = f"{self.modelo}@{self.dimensoes}" if self.dimensoes else self.modelo
+        return self._identificador
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                # As retentativas ficam a cargo do agendador, não do SDK nem do transporte compartilhado
+                self._client = sem_retentativas(self._criar_client())
+            return self._client
+
+    # ---------- controle de concorrência ----------
+
+    def _registrar_sucesso(self, headers) -> None:
+        restantes = _inteiro_cabecalho(headers, "x-ratelimit-remaining-requests")
+        with self._lock:
+            self.requisicoes += 1
+            self.limite_em_voo = min(self.max_em_voo, self.limite_em_voo + 1)
+            if restantes is not None:
+                self.limite_em_voo = max(1, min(self.limite_em_voo, restantes))
+
+    def _registrar_limite(self, espera: float) -> None:
+        with self._lock:
+            self.retentativas += 1
+            self.limite_em_voo = max(1, self.limite_em_voo // 2)
+            # Todas as threads respeitam a mesma pausa
+            self.pausa_ate = max(self.pausa_ate, time.monotonic() + espera)
+
+    def _aguardar_pausa(self) -> None:
+        with self._lock:
+            espera = self.pausa_ate - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+
+    def _backoff(self, tentativa: int) -> float:
+        return min(self.espera_maxima, self.espera_base * (2 ** tentativa)) * random.uniform(0.5, 1.0)
+
+    # ---------- chamadas ----------
+
+    def _chamar_api(self, textos: List[str]) -> List[List[float]]:
+        import openai
+
+        for tentativa in range(self.max_tentativas):
+            self._aguardar_pausa()
+            try:
+                bruto = self.client.embeddings.with_raw_response.create(
+                    model=self.modelo,
+                    input=textos,
+                    **({"dimensions": self.dimensoes} if self.dimensoes else {})
+                )
+                self._registrar_sucesso(bruto.headers)
+                self._aceita = True
+                resposta = bruto.parse()
+                telemetria.registrar_uso("embeddings", self.modelo, resposta.usage)
+                return [item.embedding for item in sorted(resposta.data, key=lambda item: item.index)]
+            except openai.RateLimitError as erro:
+                if tentativa == self.max_tentativas - 1:
+                    raise
+                self._registrar_limite(_espera_retry_after(erro.response.headers) or self._backoff(tentativa))
+            except (openai.InternalServerError, openai.APIConnectionError):
+                if tentativa == self.max_tentativas - 1:
+                    raise
+                with self._lock:
+                    self.retentativas += 1
+                time.sleep(self._backoff(tentativa))
+            except openai.APIStatusError as erro:
+                if erro.status_code < 500 or tentativa == self.max_tentativas - 1:
+                    raise
+                with self._lock:
+                    self.retentativas += 1
+                time.sleep(self._backoff(tentativa))
+
+    def _chamar_isolando(self, textos: List[str]) -> List[Optional[List[float]]]:
+        import openai
+
+        # Erros de requisição não se resolvem com retentativa: divide o lote para salvar o resto
+        try:
+            return self._chamar_api(textos)
+        except openai.BadRequestError as erro:
+            if len(textos) == 1:
+                if not self._aceita and not self._requisicao_aceita():
+                    # Recusa de qualquer texto (modelo, parâmetro): marcar cada chunk como
+                    # recusado esvaziaria o índice inteiro
+                    raise RuntimeError(f"O provedor de embeddings recusou a requisição: {erro}") from erro
+                with self._lock:
+                    self.recusados += 1
+                return [None]
+            meio = len(textos) // 2
+            return self._chamar_isolando(textos[:meio]) + self._chamar_isolando(textos[meio:])
+
+    def _requisicao_aceita(self) -> bool:
+        """Se um texto trivial é aceito: separa um texto inválido de uma requisição inválida."""
+        import openai
+
+        try:
+            self._chamar_api(["teste"])
+        except openai.BadRequestError:
+            return False
+        return True
+
+    def _processar_lote(self, textos: List[str]) -> List[Optional[List[float]]]:
+        if self.cache is None:
+            return self._chamar_isolando(textos)
+
+        embeddings = self.cache.obter_varios(self.identificador, textos)
+        faltantes = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if faltantes:
+            novos = self._chamar_isolando([textos[i] for i in faltantes])
+            validos = [(textos[i], embedding) for i, embedding in zip(faltantes, novos) if embedding is not None]
+            if validos:
+                self.cache.guardar_varios(self.identificador, [t for t, _ in validos], [e for _, e in validos])
+            for i, embedding in zip(faltantes, novos):
+                embeddings[i] = embedding
+        return embeddings
+
+    # ---------- interface ----------
+
+    def embeddar_em_lotes(
+        self,
+        itens: Iterable[Any],
+        texto: Callable[[Any], str] = lambda item: item
+    ) -> Iterator[Tuple[List[Any], List[Optional[List[float]]]]]:
+        """
+        Consome os itens sob demanda e gera (lote, embeddings) na ordem de entrada,
+        com exatamente um embedding (ou None, se recusado) por item do lote.
+        Novos lotes só são montados quando há vaga em voo, então o iterável de
+        entrada nunca é lido muito à frente do que a API consegue absorver.
+        """
+        pendentes = deque()
+
+        with ThreadPoolExecutor(max_workers=self.max_em_voo) as executor:
+            for lote, _ in lotes_por_tokens(itens, self.contar_tokens, self.max_tokens_lote, self.max_itens_lote, texto):
+                while len(pendentes) >= self.limite_em_voo:
+                    lote_pronto, futuro = pendentes.popleft()
+                    yield lote_pronto, futuro.result()
+                pendentes.append((lote, executor.submit(self._processar_lote, [texto(item) for item in lote])))
+
+            while pendentes:
+                lote_pronto, futuro = pendentes.popleft()
+                yield lote_pronto, futuro.result()
+
+    def embeddar(self, textos: List[str]) -> List[Optional[List[float]]]:
+        embeddings = []
+        for _, vetores in self.embeddar_em_lotes(textos):
+            embeddings.extend(vetores)
+        return embeddings
+
+    def estatisticas(self) -> dict:
+        return {
+            "requisicoes": self.requisicoes,
+            "retentativas": self.retentativas,
+            "recusados": self.recusados,
+            "limite_em_voo": self.limite_em_voo
+        }
@@ -0,0 +1,228 @@
+# ============================================
+# CACHE PERSISTENTE DE EMBEDDINGS
+# SQLite em disco + LRU em memória, chave (modelo, hash do texto normalizado)
+# ============================================
+
+import os
+import re
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# =========================
+# 1. CHAVES
+# =========================
+
+def normalizar_texto(texto: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", texto)).strip()
+
+def chave_embedding(modelo: str, texto: str) -> str:
+    return hashlib.sha256(f"{modelo}\x00{normalizar_texto(texto)}".encode("utf-8")).hexdigest()
+
+# =========================
+# 2. CACHE
+# =========================
+
+class CacheEmbeddings:
+    """
+    Cache de dois níveis para vetores de embedding.
+    - Memória: LRU de arrays float32 com até max_bytes_memoria bytes de vetores
+      (~6 KB por vetor de 1536 dimensões; uma lista de floats ocuparia ~49 KB).
+    - Disco: tabela SQLite com os vetores em float32; quando o tamanho total
+      passa de max_bytes, os menos acessados recentemente são descartados
+      até sobrar 90% do limite.
+    Os acessos das leituras são acumulados e gravados em lote (a cada
+    ACESSOS_POR_GRAVACAO acessos, INTERVALO_GRAVACAO segundos, antes de cada
+    escrita e na saída do processo): acertos não escrevem no SQLite.
+    """
+
+    ACESSOS_POR_GRAVACAO = 1000
+    INTERVALO_GRAVACAO = 30.0
+
+    def __init__(self, caminho: str, max_bytes: int = 512 * 1024 * 1024, max_bytes_memoria: int = 64 * 1024 * 1024):
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_bytes_memoria = max_bytes_memoria
+        self.memoria: OrderedDict = OrderedDict()
+        self.bytes_em_memoria = 0
+        self._acessos: Dict[str, float] = {}
+        self._ultima_gravacao = time.monotonic()
+        self.acertos = 0
+        self.faltas = 0
+        self._lock = threading.Lock()
+
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " chave TEXT PRIMARY KEY,"
+            " modelo TEXT NOT NULL,"
+            " vetor BLOB NOT NULL,"
+            " tamanho INTEGER NOT NULL,"
+            " ultimo_acesso REAL NOT NULL)"
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_ultimo_acesso ON embeddings (ultimo_acesso)")
+        self._conexao.commit()
+        self.bytes_em_disco = self._conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM embeddings").fetchone()[0]
+        atexit.register(self.gravar_acessos)
+
+    # ---------- memória ----------
+
+    def _lembrar(self, chave: str, vetor: np.ndarray) -> None:
+        anterior = self.memoria.pop(chave, None)
+        if anterior is not None:
+            self.bytes_em_memoria -= anterior.nbytes
+        self.memoria[chave] = vetor
+        self.bytes_em_memoria += vetor.nbytes
+        while self.bytes_em_memoria > self.max_bytes_memoria and len(self.memoria) > 1:
+            self.bytes_em_memoria -= self.memoria.popitem(last=False)[1].nbytes
+
+    # ---------- acessos ----------
+
+    def _registrar_acessos(self, chaves) -> None:
+        agora = time.time()
+        for chave in chaves:
+            self._acessos[chave] = agora
+        if (
+            len(self._acessos) >= self.ACESSOS_POR_GRAVACAO
+            or time.monotonic() - self._ultima_gravacao >= self.INTERVALO_GRAVACAO
+        ):
+            self._gravar_acessos()
+
+    def _gravar_acessos(self) -> None:
+        self._ultima_gravacao = time.monotonic()
+        if not self._acessos:
+            return
+        self._conexao.executemany(
+            "UPDATE embeddings SET ultimo_acesso = ? WHERE chave = ?",
+            [(agora, chave) for chave, agora in self._acessos.items()]
+        )
+        self._conexao.commit()
+        self._acessos.clear()
+
+    def gravar_acessos(self) -> None:
+        """Grava os acessos pendentes (chamado na saída do processo)."""
+        with self._lock:
+            try:
+                self._gravar_acessos()
+            except sqlite3.Error:
+                pass
+
+    # ---------- leitura ----------
+
+    def obter_varios(self, modelo: str, textos: List[str]) -> List[Optional[List[float]]]:
+        """Retorna um vetor por texto, ou None para os que não estão no cache."""
+        chaves = [chave_embedding(modelo, texto) for texto in textos]
+        vetores: List[Optional[np.ndarray]] = [None] * len(textos)
+        pendentes = {}
+        lidas = set()
+
+        with self._lock:
+            for i, chave in enumerate(chaves):
+                if chave in self.memoria:
+                    self.memoria.move_to_end(chave)
+                    vetores[i] = self.memoria[chave]
+                    lidas.add(chave)
+                else:
+                    pendentes.setdefault(chave, []).append(i)
+
+            if pendentes:
+                encontrados = {}
+                lista = list(pendentes)
+                for inicio in range(0, len(lista), 500):
+                    lote = lista[inicio:inicio + 500]
+                    marcadores = ",".join("?" * len(lote))
+                    for chave, vetor in self._conexao.execute(
+                        f"SELECT chave, vetor FROM embeddings WHERE chave IN ({marcadores})", lote
+                    ):
+                        encontrados[chave] = np.frombuffer(vetor, dtype=np.float32)
+
+                for chave, vetor in encontrados.items():
+                    self._lembrar(chave, vetor)
+                    lidas.add(chave)
+                    for i in pendentes[chave]:
+                        vetores[i] = vetor
+
+            if lidas:
+                self._registrar_acessos(lidas)
+
+            acertos = sum(1 for vetor in vetores if vetor is not None)
+            self.acertos += acertos
+            self.faltas += len(textos) - acertos
+
+        # Listas só na saída: quem chama recebe o mesmo formato da API
+        return [None if vetor is None else vetor.tolist() for vetor in vetores]
+
+    # ---------- escrita ----------
+
+    def guardar_varios(self, modelo: str, textos: List[str], vetores: List[List[float]]) -> None:
+        agora = time.time()
+        por_chave = {}
+        for texto, vetor in zip(textos, vetores):
+            blob = np.asarray(vetor, dtype=np.float32).tobytes()
+            chave = chave_embedding(modelo, texto)
+            por_chave[chave] = (chave, modelo, blob, len(blob), agora)
+        linhas = list(por_chave.values())
+
+        with self._lock:
+            for chave, _, blob, _, _ in linhas:
+                self._lembrar(chave, np.frombuffer(blob, dtype=np.float32))
+                self._acessos.pop(chave, None)
+            # Acessos pendentes entram antes do despejo, que escolhe pelos mais antigos
+            self._gravar_acessos()
+
+            # Desconta o que será sobrescrito para manter o total de bytes exato
+            chaves = [linha[0] for linha in linhas]
+            for inicio in range(0, len(chaves), 500):
+                lote = chaves[inicio:inicio + 500]
+                marcadores = ",".join("?" * len(lote))
+                self.bytes_em_disco -= self._conexao.execute(
+                    f"SELECT COALESCE(SUM(tamanho), 0) FROM embeddings WHERE chave IN ({marcadores})", lote
+                ).fetchone()[0]
+
+            self._conexao.executemany(
+                "INSERT OR REPLACE INTO embeddings (chave, modelo, vetor, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?, ?)",
+                linhas
+            )
+            self.bytes_em_disco += sum(linha[3] for linha in linhas)
+            self._despejar()
+            self._conexao.commit()
+
+    def _despejar(self) -> None:
+        if self.bytes_em_disco <= self.max_bytes:
+            return
+
+        alvo = int(self.max_bytes * 0.9)
+        removidas = []
+        cursor = self._conexao.execute("SELECT chave, tamanho FROM embeddings ORDER BY ultimo_acesso")
+        for chave, tamanho in cursor:
+            if self.bytes_em_disco <= alvo:
+                break
+            removidas.append((chave,))
+            self.bytes_em_disco -= tamanho
+            vetor = self.memoria.pop(chave, None)
+            if vetor is not None:
+                self.bytes_em_memoria -= vetor.nbytes
+        cursor.close()
+
+        self._conexao.executemany("DELETE FROM embeddings WHERE chave = ?", removidas)
+
+    # ---------- métricas ----------
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.faltas
+        return {
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "itens_memoria": len(self.memoria),
+            "bytes_em_memoria": self.bytes_em_memoria,
+            "bytes_em_disco": self.bytes_em_disco
+        }
@@ -0,0 +1,131 @@
+# ============================================
+# CACHE SEMÂNTICO DE RESPOSTAS
+# Pergunta normalizada exata + quase duplicatas por similaridade de cosseno
+# ============================================
+
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# =========================
+# 1. NORMALIZAÇÃO
+# =========================
+
+def normalizar_pergunta(pergunta: str) -> str:
+    texto = unicodedata.normalize("NFKD", pergunta.casefold())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[^\w\s]", " ", texto)
+    return re.sub(r"\s+", " ", texto).strip()
+
+# =========================
+# 2. CACHE
+# =========================
+
+class CacheRespostas:
+    """
+    Guarda pares (resposta, contexto_final) já gerados.
+    - Acerto exato: mesma pergunta após normalização (caixa, acentos, pontuação).
+    - Acerto semântico: embedding da pergunta com cosseno >= limiar_similaridade.
+    Entradas expiram após ttl_segundos; acima de max_itens sai a menos usada.
+    Todo o cache é descartado quando a versão do corpus indexado muda.
+    """
+
+    def __init__(self, ttl_segundos: float = 3600, max_itens: int = 500, limiar_similaridade: float = 0.95):
+        self.ttl_segundos = ttl_segundos
+        self.max_itens = max_itens
+        self.limiar_similaridade = limiar_similaridade
+        self.versao_corpus: Optional[str] = None
+        self.entradas: OrderedDict = OrderedDict()
+        self.acertos_exatos = 0
+        self.acertos_semanticos = 0
+        self.faltas = 0
+        self._lock = threading.Lock()
+
+    # ---------- invalidação ----------
+
+    def definir_versao_corpus(self, versao: str) -> None:
+        with self._lock:
+            if versao != self.versao_corpus:
+                self.entradas.clear()
+                self.versao_corpus = versao
+
+    def _expirar(self) -> None:
+        limite = time.time() - self.ttl_segundos
+        for chave in [c for c, e in self.entradas.items() if e["criado_em"] < limite]:
+            del self.entradas[chave]
+
+    # ---------- leitura ----------
+
+    def buscar(self, pergunta: str, embedding: Optional[List[float]] = None) -> Optional[Tuple[str, List[Dict]]]:
+        """
+        Sem embedding, tenta apenas o acerto exato (não exige chamada à API).
+        Com embedding, tenta também a quase duplicata mais próxima.
+        """
+        chave = normalizar_pergunta(pergunta)
+
+        with self._lock:
+            self._expirar()
+
+            entrada = self.entradas.get(chave)
+            if entrada:
+                self.entradas.move_to_end(chave)
+                self.acertos_exatos += 1
+                return entrada["resposta"], entrada["contexto"]
+
+            if embedding is None:
+                return None
+
+            candidatas = [(c, e) for c, e in self.entradas.items() if e["embedding"] is not None]
+            if candidatas:
+                consulta = np.asarray(embedding, dtype=np.float32)
+                consulta /= np.linalg.norm(consulta) or 1.0
+                matriz = np.stack([e["embedding"] for _, e in candidatas])
+                similaridades = matriz @ consulta
+                melhor = int(similaridades.argmax())
+
+                if similaridades[melhor] >= self.limiar_similaridade:
+                    chave_similar, entrada = candidatas[melhor]
+                    self.entradas.move_to_end(chave_similar)
+                    self.acertos_semanticos += 1
+                    return entrada["resposta"], entrada["contexto"]
+
+            self.faltas += 1
+            return None
+
+    # ---------- escrita ----------
+
+    def guardar(self, pergunta: str, embedding: Optional[List[float]], resposta: str, contexto: List[Dict]) -> None:
+        vetor = None
+        if embedding is not None:
+            vetor = np.asarray(embedding, dtype=np.float32)
+            vetor /= np.linalg.norm(vetor) or 1.0
+
+        with self._lock:
+            chave = normalizar_pergunta(pergunta)
+            self.entradas[chave] = {
+                "resposta": resposta,
+                "contexto": contexto,
+                "embedding": vetor,
+                "criado_em": time.time()
+            }
+            self.entradas.move_to_end(chave)
+            while len(self.entradas) > self.max_itens:
+                self.entradas.popitem(last=False)
+
+    # ---------- métricas ----------
+
+    def estatisticas(self) -> dict:
+        acertos = self.acertos_exatos + self.acertos_semanticos
+        total = acertos + self.faltas
+        return {
+            "acertos_exatos": self.acertos_exatos,
+            "acertos_semanticos": self.acertos_semanticos,
+            "faltas": self.faltas,
+            "taxa_acerto": acertos / total if total else 0.0,
+            "itens": len(self.entradas)
+        }
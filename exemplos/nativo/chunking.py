@@ -0,0 +1,140 @@
+# ============================================
+# CHUNKING POR TOKENS
+# Uma passada por página: cortes em fronteiras de frase e parágrafo,
+# tamanho medido em tokens e posição (início/fim) de cada chunk na página
+# ============================================
+
+import re
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, Tuple
+
+# Fim de frase seguido de espaço ou quebra de parágrafo (linha em branco); começar por um
+# caractere fixo deixa a busca da expressão rápida
+FRONTEIRA = re.compile(r"[.!?…]\s+|\n[ \t]*\n\s*")
+
+# Palavras seguidas de ponto que não encerram a frase (no máximo 6 caracteres)
+ABREVIATURAS = {
+    "art", "arts", "inc", "cap", "p", "pág", "págs", "fl", "fls", "n", "nº",
+    "sr", "sra", "srs", "sras", "dr", "dra", "prof", "profa", "eng", "exmo", "exma", "v.exa",
+    "ltda", "cia", "s.a", "av", "tel", "ex", "obs", "aprox", "máx", "mín",
+    "jan", "fev", "abr", "jun", "jul", "ago", "out", "nov", "dez"
+}
+
+# Abreviatura ou numeração ("1", "2.1") imediatamente antes do ponto
+ANTES_DO_PONTO = re.compile(
+    r"(?<![^\s(\"“])(?:" + "|".join(re.escape(abreviatura) for abreviatura in ABREVIATURAS) + r"|\d+(?:\.\d+)*)$",
+    re.IGNORECASE
+)
+
+PALAVRA = re.compile(r"\S+")
+
+# =========================
+# 1. FRASES
+# =========================
+
+def segmentar(texto: str) -> Iterator[Tuple[int, int]]:
+    """Frases e parágrafos do texto como intervalos (início, fim), sem os espaços das bordas."""
+    inicio = len(texto) - len(texto.lstrip())
+    for fronteira in FRONTEIRA.finditer(texto, inicio):
+        fim = fronteira.start()
+        if texto[fim] == "\n":
+            while fim > inicio and texto[fim - 1] in " \t":
+                fim -= 1
+        elif texto[fim] == "." and ANTES_DO_PONTO.search(texto, max(0, fim - 7), fim):
+            # "art. 5", "Sr. João", "1. Objetivo": o ponto não encerra a frase
+            continue
+        else:
+            fim += 1
+        if fim > inicio:
+            yield inicio, fim
+        inicio = fronteira.end()
+
+    fim = len(texto.rstrip())
+    if fim > inicio:
+        yield inicio, fim
+
+def _unidades(
+    texto: str,
+    contar_tokens: Callable[[str], int],
+    max_tokens: int
+) -> Iterator[Tuple[int, int, int]]:
+    # (início, fim, tokens) de cada frase; frases maiores que um chunk são cortadas entre
+    # palavras e, em último caso (ex.: linha pontilhada de sumário), no meio da palavra
+    for inicio, fim in segmentar(texto):
+        tokens = contar_tokens(texto[inicio:fim])
+        if tokens <= max_tokens:
+            yield inicio, fim, tokens
+            continue
+
+        parte_inicio, parte_fim, parte_tokens = inicio, inicio, 0
+        for palavra in PALAVRA.finditer(texto, inicio, fim):
+            tokens_palavra = contar_tokens(palavra.group())
+            if tokens_palavra > max_tokens:
+                if parte_tokens:
+                    yield parte_inicio, parte_fim, parte_tokens
+                passo = max(1, len(palavra.group()) * max_tokens // tokens_palavra)
+                for corte in range(palavra.start(), palavra.end(), passo):
+                    pedaco_fim = min(corte + passo, palavra.end())
+                    yield corte, pedaco_fim, contar_tokens(texto[corte:pedaco_fim])
+                parte_inicio, parte_fim, parte_tokens = palavra.end(), palavra.end(), 0
+                continue
+
+            if parte_tokens and parte_tokens + tokens_palavra > max_tokens:
+                yield parte_inicio, parte_fim, parte_tokens
+                parte_inicio, parte_tokens = palavra.start(), 0
+            elif not parte_tokens:
+                parte_inicio = palavra.start()
+            parte_fim = palavra.end()
+            parte_tokens += tokens_palavra
+
+        if parte_tokens:
+            yield parte_inicio, parte_fim, parte_tokens
+
+# =========================
+# 2. CHUNKS
+# =========================
+
+def dividir_texto(
+    texto: str,
+    contar_tokens: Callable[[str], int],
+    max_tokens: int,
+    sobreposicao_tokens: int
+) -> Iterator[Tuple[int, int]]:
+    """
+    Agrupa frases consecutivas em chunks de até max_tokens (soma dos tokens das
+    frases; o texto inteiro pode diferir em um ou dois tokens) e devolve a posição
+    (início, fim) de cada um no texto. O chunk seguinte recomeça pelas últimas
+    frases do anterior que somam até sobreposicao_tokens. Cada frase é contada
+    uma única vez e o texto só é fatiado na saída, sem concatenações.
+    """
+    janela = deque()
+    tokens_janela = 0
+
+    for inicio, fim, tokens in _unidades(texto, contar_tokens, max_tokens):
+        if janela and tokens_janela + tokens > max_tokens:
+            yield janela[0][0], janela[-1][1]
+            while janela and (tokens_janela > sobreposicao_tokens or tokens_janela + tokens > max_tokens):
+                tokens_janela -= janela.popleft()[2]
+        janela.append((inicio, fim, tokens))
+        tokens_janela += tokens
+
+    if janela:
+        yield janela[0][0], janela[-1][1]
+
+def iterar_chunks(
+    documentos: Iterable[Dict],
+    contar_tokens: Callable[[str], int],
+    max_tokens: int,
+    sobreposicao_tokens: int
+) -> Iterator[Dict]:
+    """
+    Chunks página a página, com metadata["inicio"] e metadata["fim"]:
+    page_content é exatamente texto_da_pagina[inicio:fim].
+    """
+    for doc in documentos:
+        texto = doc["page_content"]
+        for inicio, fim in dividir_texto(texto, contar_tokens, max_tokens, sobreposicao_tokens):
+            yield {
+                "page_content": texto[inicio:fim],
+                "metadata": {**doc["metadata"], "inicio": inicio, "fim": fim}
+            }
@@ -0,0 +1,172 @@
+# ============================================
+# CLIENTES DA API DA OPENAI
+# Conexões compartilhadas (pool, keep-alive, HTTP/2), timeouts por etapa,
+# retentativas com jitter e disjuntor, para todas as interfaces do projeto
+# ============================================
+
+import os
+import sys
+import threading
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Dict, Optional
+
+from dotenv import load_dotenv
+
+# O SDK da OpenAI e o httpx (com o transporte de transporte_openai) são importados só
+# ao criar o primeiro cliente: juntos levam centenas de ms
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
+# HTTP/2 é opcional: requer o pacote h2 (pip install "httpx[http2]"); procurado sem importá-lo
+HTTP2_DISPONIVEL = find_spec("h2") is not None
+
+# =========================
+# 1. CONFIGURAÇÕES
+# =========================
+
+# Lidas na importação, antes do load_dotenv das interfaces
+load_dotenv()
+
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "1") == "1"
+
+# Conexões mantidas por cliente e tempo que uma conexão ociosa fica aberta
+# (o padrão do httpx, 5 s, fecha as conexões entre uma pergunta e outra da CLI)
+OPENAI_MAX_CONEXOES = int(os.getenv("OPENAI_MAX_CONEXOES", "64"))
+OPENAI_KEEPALIVE_SEGUNDOS = float(os.getenv("OPENAI_KEEPALIVE_SEGUNDOS", "120"))
+OPENAI_TIMEOUT_CONEXAO = float(os.getenv("OPENAI_TIMEOUT_CONEXAO", "5"))
+
+# Tempo máximo de espera pela resposta (ou pelo próximo trecho, em streaming), por etapa
+TIMEOUTS: Dict[str, float] = {
+    "embeddings": float(os.getenv("OPENAI_TIMEOUT_EMBEDDINGS", "30")),
+    "rerank": float(os.getenv("OPENAI_TIMEOUT_RERANK", "10")),
+    "geracao": float(os.getenv("OPENAI_TIMEOUT_GERACAO", "60"))
+}
+
+# Retentativas (no transporte HTTP, não no SDK): espera aleatória entre 0 e
+# min(ESPERA_MAXIMA, ESPERA_BASE x 2^tentativa), ou o Retry-After da API. Nenhuma
+# tentativa começa depois de OPENAI_PRAZO_RETENTATIVAS segundos da primeira
+OPENAI_MAX_TENTATIVAS = int(os.getenv("OPENAI_MAX_TENTATIVAS", "3"))
+OPENAI_ESPERA_BASE = float(os.getenv("OPENAI_ESPERA_BASE", "0.5"))
+OPENAI_ESPERA_MAXIMA = float(os.getenv("OPENAI_ESPERA_MAXIMA", "8"))
+OPENAI_PRAZO_RETENTATIVAS = float(os.getenv("OPENAI_PRAZO_RETENTATIVAS", "20"))
+STATUS_RETENTAVEIS = {408, 429, 500, 502, 503, 504}
+
+# Disjuntor: após N falhas seguidas (erro de conexão, timeout ou 5xx) as chamadas
+# falham na hora por PAUSA segundos; depois, uma chamada de teste decide se ele fecha
+OPENAI_DISJUNTOR_FALHAS = int(os.getenv("OPENAI_DISJUNTOR_FALHAS", "5"))
+OPENAI_DISJUNTOR_PAUSA = float(os.getenv("OPENAI_DISJUNTOR_PAUSA", "30"))
+
+# Cabeçalho interno (removido antes do envio) de quem faz as próprias retentativas
+CABECALHO_SEM_RETENTATIVA = "x-rh-sem-retentativa"
+
+# =========================
+# 2. CLIENTES
+# =========================
+
+def http2_ativo() -> bool:
+    return OPENAI_HTTP2 and HTTP2_DISPONIVEL
+
+def _limites(max_conexoes: int) -> "httpx.Limits":
+    import httpx
+
+    return httpx.Limits(
+        max_connections=max_conexoes,
+        max_keepalive_connections=max_conexoes,
+        keepalive_expiry=OPENAI_KEEPALIVE_SEGUNDOS
+    )
+
+def _timeout(etapa: str) -> "httpx.Timeout":
+    import httpx
+
+    return httpx.Timeout(TIMEOUTS[etapa], connect=OPENAI_TIMEOUT_CONEXAO)
+
+def criar_http_client(max_conexoes: int = OPENAI_MAX_CONEXOES) -> "httpx.Client":
+    import httpx
+    from transporte_openai import TransporteResiliente
+
+    transporte = httpx.HTTPTransport(http2=http2_ativo(), limits=_limites(max_conexoes))
+    return httpx.Client(transport=TransporteResiliente(transporte), timeout=_timeout("geracao"))
+
+def criar_http_client_async(max_conexoes: int = OPENAI_MAX_CONEXOES) -> "httpx.AsyncClient":
+    import httpx
+    from transporte_openai import TransporteResilienteAsync
+
+    transporte = httpx.AsyncHTTPTransport(http2=http2_ativo(), limits=_limites(max_conexoes))
+    return httpx.AsyncClient(transport=TransporteResilienteAsync(transporte), timeout=_timeout("geracao"))
+
+_http_client: Optional["httpx.Client"] = None
+_clientes: Dict[tuple, "OpenAI"] = {}
+_lock_clientes = threading.Lock()
+
+def http_client() -> "httpx.Client":
+    """Pool síncrono único do processo (CLI, LangChain, threads do reranking)."""
+    global _http_client
+    with _lock_clientes:
+        if _http_client is None:
+            _http_client = criar_http_client()
+        return _http_client
+
+def cliente(base_url: Optional[str] = None, api_key: Optional[str] = None) -> "OpenAI":
+    """
+    Cliente síncrono compartilhado, um por servidor (base_url None: OPENAI_BASE_URL
+    ou a API da OpenAI), todos sobre o mesmo pool. As retentativas ficam no
+    transporte (max_retries=0 no SDK).
+    """
+    from openai import OpenAI
+
+    http = http_client()
+    chave = (base_url, api_key)
+    with _lock_clientes:
+        if chave not in _clientes:
+            _clientes[chave] = OpenAI(
+                api_key=api_key or os.getenv("OPENAI_API_KEY"),
+                base_url=base_url,
+                http_client=http,
+                max_retries=0
+            )
+        return _clientes[chave]
+
+def criar_cliente_async(
+    max_conexoes: int = OPENAI_MAX_CONEXOES,
+    base_url: Optional[str] = None,
+    api_key: Optional[str] = None
+) -> "AsyncOpenAI":
+    """
+    Cliente assíncrono com pool próprio: o pool do httpx fica preso ao event loop
+    em que é usado, então cada serviço (ou asyncio.run) cria e fecha o seu.
+    """
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=api_key or os.getenv("OPENAI_API_KEY"),
+        base_url=base_url,
+        http_client=criar_http_client_async(max_conexoes),
+        max_retries=0
+    )
+
+def com_timeout(client, etapa: str):
+    """Cópia do cliente (mesmo pool) com o timeout da etapa: "embeddings", "rerank" ou "geracao"."""
+    return client.with_options(timeout=_timeout(etapa))
+
+def sem_retentativas(client):
+    """Cópia do cliente cujas chamadas vão uma única vez à rede (quem chama trata 429 e erros)."""
+    return client.with_options(max_retries=0, default_headers={CABECALHO_SEM_RETENTATIVA: "1"})
+
+def parametros_langchain(etapa: str = "geracao") -> Dict:
+    """Argumentos para ChatOpenAI/OpenAIEmbeddings usarem o mesmo pool, timeout e retentativas."""
+    return {
+        "http_client": http_client(),
+        "max_retries": 0,
+        "timeout": TIMEOUTS[etapa]
+    }
+
+def estatisticas() -> Dict:
+    # Sem transporte importado, nenhuma requisição foi feita: não importa o httpx só para isso
+    transporte = sys.modules.get("transporte_openai")
+    return {
+        **(transporte.contadores() if transporte else {"requisicoes": 0, "retentativas": 0, "falhas": 0}),
+        "http2": http2_ativo(),
+        **(transporte.estado_disjuntores() if transporte else
+           {"disjuntores_abertos": 0, "disjuntor_aberturas": 0, "disjuntor_recusadas": 0})
+    }
@@ -0,0 +1,176 @@
+# ============================================
+# MONTAGEM DO CONTEXTO
+# Preenche um orçamento de tokens com os trechos rerankeados, unindo
+# trechos sobrepostos ou vizinhos da mesma página
+# ============================================
+
+from typing import Callable, Dict, List, Tuple
+
+# Distância máxima (em caracteres da página) entre o fim de um trecho e o início do
+# seguinte para tratá-los como vizinhos: entre chunks consecutivos só há espaços
+FOLGA_VIZINHOS = 16
+
+# Início de um trecho procurado no final do anterior para localizar a sobreposição
+TAMANHO_ANCORA = 40
+
+# Com menos tokens que isso sobrando no orçamento, não vale truncar um bloco
+MIN_TOKENS_TRUNCADO = 64
+
+MARCA_TRUNCADO = " [...]"
+
+SEPARADOR = "\n\n"
+
+# =========================
+# 1. UNIÃO DE TRECHOS
+# =========================
+
+def unir_textos(anterior: str, seguinte: str, sobreposicao_esperada: int = 0) -> str:
+    """
+    Concatena dois trechos consecutivos, sem repetir a parte sobreposta.
+    Texto repetitivo (ex.: linhas pontilhadas de sumário) admite mais de uma
+    sobreposição; vale a de tamanho mais próximo do esperado pelas posições na página.
+    """
+    if anterior in seguinte:
+        return seguinte
+
+    # A sobreposição não passa do tamanho do trecho seguinte: procura só no final do anterior
+    ancora = seguinte[:TAMANHO_ANCORA]
+    candidatas = []
+    posicao = anterior.find(ancora, max(0, len(anterior) - len(seguinte)))
+    while posicao != -1:
+        if seguinte.startswith(anterior[posicao:]):
+            candidatas.append(posicao)
+        posicao = anterior.find(ancora, posicao + 1)
+
+    if candidatas:
+        posicao = min(candidatas, key=lambda p: abs(len(anterior) - p - sobreposicao_esperada))
+        return anterior[:posicao] + seguinte
+    if seguinte in anterior:
+        return anterior
+    return anterior + " " + seguinte
+
+def _intervalo(doc: Dict) -> Tuple[int, int]:
+    # Chunks sem "fim" (índices antigos) usam o tamanho do texto como estimativa
+    metadata = doc.get("metadata", {})
+    inicio = metadata.get("inicio", 0)
+    return inicio, metadata.get("fim", inicio + len(doc["page_content"]))
+
+def _unir_bloco(bloco: Dict, doc: Dict, inicio: int, fim: int) -> None:
+    if bloco["exato"] and "fim" in doc.get("metadata", {}):
+        # Com as posições exatas (page_content == pagina[inicio:fim]), a união é aritmética
+        if fim > bloco["fim"]:
+            sobreposicao = bloco["fim"] - inicio
+            bloco["page_content"] += doc["page_content"][sobreposicao:] if sobreposicao > 0 else " " + doc["page_content"]
+    else:
+        bloco["page_content"] = unir_textos(bloco["page_content"], doc["page_content"], bloco["fim"] - inicio)
+        bloco["exato"] = False
+    bloco["fim"] = max(bloco["fim"], fim)
+
+def agrupar_trechos(documentos: List[Dict]) -> List[Dict]:
+    """
+    Une os trechos da mesma página que se sobrepõem ou são vizinhos e descarta
+    textos repetidos. Cada bloco guarda em "posicao" a melhor colocação, no
+    reranking, entre os trechos que o formam.
+    """
+    paginas: Dict[tuple, List[tuple]] = {}
+    for posicao, doc in enumerate(documentos):
+        metadata = doc.get("metadata", {})
+        if metadata.get("documento") is None or metadata.get("pagina") is None or "inicio" not in metadata:
+            # Sem posição na página não há como saber se o trecho é vizinho de outro
+            chave = ("", posicao)
+        else:
+            chave = (metadata["documento"], metadata["pagina"])
+        paginas.setdefault(chave, []).append((posicao, doc))
+
+    blocos = []
+    for trechos in paginas.values():
+        trechos.sort(key=lambda item: _intervalo(item[1])[0])
+        atual = None
+        for posicao, doc in trechos:
+            inicio, fim = _intervalo(doc)
+            if atual and inicio <= atual["fim"] + FOLGA_VIZINHOS:
+                _unir_bloco(atual, doc, inicio, fim)
+                if posicao < atual["posicao"]:
+                    atual["posicao"] = posicao
+                    atual["metadata"] = {**doc.get("metadata", {}), "inicio": atual["inicio"]}
+                if "fim" in atual["metadata"]:
+                    atual["metadata"]["fim"] = atual["fim"]
+                continue
+
+            atual = {
+                "page_content": doc["page_content"],
+                "metadata": dict(doc.get("metadata", {})),
+                "posicao": posicao,
+                "inicio": inicio,
+                "fim": fim,
+                "exato": "fim" in doc.get("metadata", {})
+            }
+            blocos.append(atual)
+
+    # O mesmo texto em páginas ou documentos diferentes (ex.: rodapés, cláusulas repetidas) entra uma vez
+    vistos = set()
+    unicos = []
+    for bloco in sorted(blocos, key=lambda bloco: bloco["posicao"]):
+        normalizado = " ".join(bloco["page_content"].split())
+        if normalizado not in vistos:
+            vistos.add(normalizado)
+            unicos.append(bloco)
+    return unicos
+
+# =========================
+# 2. ORÇAMENTO DE TOKENS
+# =========================
+
+def truncar_para_tokens(texto: str, max_tokens: int, contar_tokens: Callable[[str], int]) -> str:
+    # Busca binária no número de caracteres; o corte recua até o fim da última frase ou palavra
+    baixo, alto = 0, len(texto)
+    while baixo < alto:
+        meio = (baixo + alto + 1) // 2
+        if contar_tokens(texto[:meio] + MARCA_TRUNCADO) <= max_tokens:
+            baixo = meio
+        else:
+            alto = meio - 1
+
+    fim_frase = texto.rfind(". ", 0, baixo)
+    if fim_frase >= baixo // 2:
+        baixo = fim_frase + 1
+    elif texto.rfind(" ", 0, baixo) > 0:
+        baixo = texto.rfind(" ", 0, baixo)
+    return texto[:baixo].rstrip() + MARCA_TRUNCADO if baixo else ""
+
+def montar_contexto(
+    documentos: List[Dict],
+    contar_tokens: Callable[[str], int],
+    max_tokens: int,
+    max_blocos: int
+) -> Tuple[List[Dict], int]:
+    """
+    Seleciona o contexto final a partir dos documentos na ordem do reranking:
+    agrupa os trechos (agrupar_trechos) e, do bloco mais bem colocado ao pior,
+    adiciona até max_blocos blocos sem passar de max_tokens. Um bloco que não
+    cabe inteiro é truncado se ainda sobrarem MIN_TOKENS_TRUNCADO tokens;
+    senão, blocos menores mais abaixo ainda podem entrar.
+    Retorna (contexto, tokens usados, contando os separadores).
+    """
+    tokens_separador = contar_tokens(SEPARADOR)
+    contexto, usados = [], 0
+
+    for bloco in agrupar_trechos(documentos):
+        if len(contexto) >= max_blocos:
+            break
+
+        restante = max_tokens - usados - (tokens_separador if contexto else 0)
+        texto = bloco["page_content"]
+        tokens = contar_tokens(texto)
+        if tokens > restante:
+            if restante < MIN_TOKENS_TRUNCADO and contexto:
+                continue
+            texto = truncar_para_tokens(texto, restante, contar_tokens)
+            if not texto:
+                continue
+            tokens = contar_tokens(texto)
+
+        usados += tokens + (tokens_separador if contexto else 0)
+        contexto.append({"page_content": texto, "metadata": bloco["metadata"]})
+
+    return contexto, usados
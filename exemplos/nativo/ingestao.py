@@ -0,0 +1,197 @@
+# ============================================
+# INGESTÃO PARALELA DE PDFs
+# Extração de texto distribuída em um pool de processos
+# e estágios de pipeline em streaming com memória limitada
+# ============================================
+
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Abaixo disso o custo de subir os processos supera o ganho
+PAGINAS_MINIMAS_POOL = 32
+
+# =========================
+# 1. TAREFAS (EXECUTADAS NOS PROCESSOS FILHOS)
+# =========================
+
+# Último PDF aberto neste processo, por (caminho, data, tamanho): as tarefas seguintes
+# do mesmo arquivo que caem no mesmo processo não o analisam de novo
+_leitor_aberto: Dict[Tuple[str, int, int], Any] = {}
+
+def abrir_pdf(caminho: str):
+    # O pypdf é importado nas tarefas, não no módulo: abrir a CLI com o índice em dia não o carrega
+    from pypdf import PdfReader
+
+    estado = os.stat(caminho)
+    chave = (caminho, estado.st_mtime_ns, estado.st_size)
+    if chave not in _leitor_aberto:
+        _leitor_aberto.clear()
+        _leitor_aberto[chave] = PdfReader(caminho)
+    return _leitor_aberto[chave]
+
+def contar_paginas(caminho: str) -> int:
+    return len(abrir_pdf(caminho).pages)
+
+def extrair_paginas(tarefa: Tuple[str, int, int]) -> List[Dict]:
+    """Extrai o texto das páginas [inicio, fim) de um PDF no formato usado pelo pipeline."""
+    caminho, inicio, fim = tarefa
+    reader = abrir_pdf(caminho)
+
+    paginas = []
+    for i in range(inicio, fim):
+        texto = reader.pages[i].extract_text()
+        if texto and texto.strip():
+            paginas.append({
+                "page_content": texto.strip(),
+                "metadata": {
+                    "documento": caminho,
+                    "pagina": i + 1
+                }
+            })
+    return paginas
+
+# =========================
+# 2. PLANEJAMENTO
+# =========================
+
+def planejar_tarefas(caminhos: List[str], total_paginas: List[int], paginas_por_tarefa: int) -> List[Tuple[str, int, int]]:
+    # Arquivos grandes viram várias tarefas; a ordem (arquivo, página) é preservada
+    tarefas = []
+    for caminho, total in zip(caminhos, total_paginas):
+        for inicio in range(0, total, paginas_por_tarefa):
+            tarefas.append((caminho, inicio, min(inicio + paginas_por_tarefa, total)))
+    return tarefas
+
+# =========================
+# 3. EXTRAÇÃO EM STREAMING
+# =========================
+
+def extrair_documentos(
+    caminhos: List[str],
+    max_workers: Optional[int] = None,
+    paginas_por_tarefa: int = 16
+) -> Iterator[Dict]:
+    """
+    Gera as páginas de todos os PDFs, em ordem determinística (arquivo, página),
+    à medida que a extração termina. Cada tarefa cobre até paginas_por_tarefa
+    páginas de um arquivo; as tarefas rodam em paralelo em um ProcessPoolExecutor.
+    Arquivos inexistentes são ignorados.
+    """
+    caminhos = [caminho for caminho in caminhos if os.path.exists(caminho)]
+    if not caminhos:
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    try:
+        # Só os primeiros arquivos são contados aqui, até decidir se o pool compensa;
+        # os demais são contados pelos processos, em paralelo
+        contados = []
+        for caminho in caminhos:
+            if max_workers == 1 or sum(contados) >= PAGINAS_MINIMAS_POOL:
+                break
+            contados.append(contar_paginas(caminho))
+
+        if max_workers == 1 or sum(contados) < PAGINAS_MINIMAS_POOL:
+            for caminho in caminhos:
+                yield from extrair_paginas((caminho, 0, contar_paginas(caminho)))
+            return
+    finally:
+        _leitor_aberto.clear()
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        total_paginas = contados + list(executor.map(contar_paginas, caminhos[len(contados):]))
+        tarefas = planejar_tarefas(caminhos, total_paginas, paginas_por_tarefa)
+
+        # No máximo 2 tarefas por processo em andamento: se o consumidor atrasar,
+        # a extração espera em vez de acumular páginas na memória
+        pendentes = deque()
+        proximas = iter(tarefas)
+
+        for tarefa in proximas:
+            pendentes.append(executor.submit(extrair_paginas, tarefa))
+            if len(pendentes) >= 2 * max_workers:
+                break
+
+        while pendentes:
+            paginas = pendentes.popleft().result()
+            tarefa = next(proximas, None)
+            if tarefa is not None:
+                pendentes.append(executor.submit(extrair_paginas, tarefa))
+            yield from paginas
+    finally:
+        # Se o consumidor parar antes do fim (erro ou close()), as tarefas na fila
+        # são descartadas em vez de extraídas para ninguém
+        executor.shutdown(wait=True, cancel_futures=True)
+
+# =========================
+# 4. ESTÁGIOS DO PIPELINE
+# =========================
+
+def em_lotes(itens: Iterable[Any], tamanho: int) -> Iterator[List[Any]]:
+    lote = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+_FIM = object()
+
+def antecipar(itens: Iterable[Any], maximo: int) -> Iterator[Any]:
+    """
+    Consome o iterável em uma thread, mantendo até `maximo` itens prontos.
+    Os estágios anteriores (extração, chunking) avançam enquanto o consumidor
+    espera a rede (embeddings, banco); a fila limitada aplica backpressure.
+    Exceções do produtor são relançadas no consumidor. Se o consumidor parar
+    antes do fim, o produtor fecha o iterável (liberando, por exemplo, o pool
+    de extrair_documentos) e a thread termina antes de antecipar retornar.
+    """
+    fila = queue.Queue(maxsize=maximo)
+    parar = threading.Event()
+    itens = iter(itens)
+
+    def entregar(par) -> bool:
+        # Desiste se o consumidor parou, em vez de esperar para sempre pela fila cheia
+        while not parar.is_set():
+            try:
+                fila.put(par, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produzir():
+        try:
+            for item in itens:
+                if not entregar((item, None)):
+                    return
+            entregar((_FIM, None))
+        except BaseException as erro:
+            entregar((_FIM, erro))
+        finally:
+            # Um gerador só pode ser fechado pela thread que o executa
+            fechar = getattr(itens, "close", None)
+            if fechar:
+                fechar()
+
+    produtor = threading.Thread(target=produzir, daemon=True)
+    produtor.start()
+
+    try:
+        while True:
+            item, erro = fila.get()
+            if item is _FIM:
+                if erro is not None:
+                    raise erro
+                return
+            yield item
+    finally:
+        parar.set()
+        produtor.join()
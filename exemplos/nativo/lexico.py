@@ -0,0 +1,252 @@
+# ============================================
+# RELEVÂNCIA LÉXICA (BM25)
+# Normalização, radicalização em português, pontuação vetorizada,
+# índice invertido persistente e fusão de rankings (RRF)
+# ============================================
+
+import os
+import re
+import json
+import math
+import heapq
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+# =========================
+# 1. NORMALIZAÇÃO
+# =========================
+
+STOPWORDS = {
+    "a", "ao", "aos", "as", "com", "como", "da", "das", "de", "do", "dos", "e", "ela", "ele",
+    "em", "entre", "essa", "esse", "esta", "este", "eu", "foi", "ha", "isso", "ja", "lhe",
+    "mais", "mas", "me", "meu", "minha", "na", "nas", "nao", "no", "nos", "o", "os", "ou",
+    "para", "pela", "pelas", "pelo", "pelos", "por", "qual", "quais", "quando", "que", "se",
+    "sem", "ser", "seu", "sua", "suas", "seus", "sao", "sobre", "tem", "um", "uma", "umas",
+    "uns", "voce", "sera", "deve", "pode", "posso", "quantos", "quantas"
+}
+
+# Regras aplicadas sobre o texto já sem acentos; vale a primeira que casar em cada etapa
+SUFIXOS_PLURAL = (
+    ("coes", "cao"), ("oes", "ao"), ("aes", "ao"), ("ais", "al"),
+    ("eis", "el"), ("ois", "ol"), ("ns", "m"), ("res", "r"), ("s", "")
+)
+
+SUFIXOS_DERIVACAO = (
+    "amente", "mente", "acao", "icao", "idade", "ismo", "ista", "avel", "ivel",
+    "ando", "endo", "indo", "ado", "ido", "ada", "ida", "ar", "er", "ir"
+)
+
+TAMANHO_MINIMO_RADICAL = 3
+
+def remover_acentos(texto: str) -> str:
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+def radical(palavra: str) -> str:
+    """
+    Radicalizador leve para português: reduz plural, sufixos derivacionais
+    e verbais mais comuns e a vogal temática final.
+    """
+    for sufixo, troca in SUFIXOS_PLURAL:
+        if palavra.endswith(sufixo) and len(palavra) - len(sufixo) >= TAMANHO_MINIMO_RADICAL:
+            palavra = palavra[:-len(sufixo)] + troca
+            break
+
+    for sufixo in SUFIXOS_DERIVACAO:
+        if palavra.endswith(sufixo) and len(palavra) - len(sufixo) >= TAMANHO_MINIMO_RADICAL:
+            palavra = palavra[:-len(sufixo)]
+            break
+
+    if palavra[-1] in "aeo" and len(palavra) > TAMANHO_MINIMO_RADICAL:
+        palavra = palavra[:-1]
+
+    return palavra
+
+def tokenizar(texto: str) -> List[str]:
+    termos = re.findall(r"\w+", remover_acentos(texto.lower()))
+    return [
+        radical(termo) if not termo.isdigit() else termo
+        for termo in termos
+        if termo not in STOPWORDS and (len(termo) > 1 or termo.isdigit())
+    ]
+
+# =========================
+# 2. BM25
+# =========================
+
+def pontuar_bm25(consulta: str, textos: List[str], k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """
+    Pontua todos os textos contra a consulta em uma única passada vetorizada.
+    As estatísticas de IDF vêm do próprio conjunto de candidatos.
+    """
+    termos_consulta = list(dict.fromkeys(tokenizar(consulta)))
+    if not textos or not termos_consulta:
+        return np.zeros(len(textos))
+
+    contagens = [Counter(tokenizar(texto)) for texto in textos]
+
+    # Matriz documentos x termos da consulta com as frequências
+    tf = np.array(
+        [[contagem.get(termo, 0) for termo in termos_consulta] for contagem in contagens],
+        dtype=np.float32
+    )
+    tamanhos = np.array([sum(contagem.values()) for contagem in contagens], dtype=np.float32)
+    tamanho_medio = tamanhos.mean() or 1.0
+
+    n = len(textos)
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    normalizacao = k1 * (1 - b + b * tamanhos / tamanho_medio)
+    scores = (tf * (k1 + 1) / (tf + normalizacao[:, None])) * idf
+    return scores.sum(axis=1)
+
+# =========================
+# 3. ÍNDICE INVERTIDO
+# =========================
+
+ARQUIVO_INDICE_BM25 = "indice_bm25.json"
+VERSAO_INDICE_BM25 = 1
+
+class IndiceBM25:
+    """
+    Índice invertido persistente para busca BM25 no corpus inteiro.
+    - postings: termo -> {id do chunk: frequência do termo no chunk}
+    - tamanhos: id do chunk -> total de termos (para a normalização por tamanho)
+    As estatísticas de IDF são globais, ao contrário de pontuar_bm25.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.tamanhos: Dict[str, int] = {}
+        self.termos_chunk: Dict[str, List[str]] = {}
+        self.total_termos = 0
+        self.alterado = False
+
+    # ---------- manutenção ----------
+
+    def adicionar(self, id_chunk: str, texto: str) -> None:
+        if id_chunk in self.tamanhos:
+            self.remover(id_chunk)
+
+        contagem = Counter(tokenizar(texto))
+        for termo, frequencia in contagem.items():
+            self.postings.setdefault(termo, {})[id_chunk] = frequencia
+        self.tamanhos[id_chunk] = sum(contagem.values())
+        self.termos_chunk[id_chunk] = list(contagem)
+        self.total_termos += self.tamanhos[id_chunk]
+        self.alterado = True
+
+    def remover(self, id_chunk: str) -> None:
+        if id_chunk not in self.tamanhos:
+            return
+
+        for termo in self.termos_chunk.pop(id_chunk):
+            postings = self.postings[termo]
+            del postings[id_chunk]
+            if not postings:
+                del self.postings[termo]
+        self.total_termos -= self.tamanhos.pop(id_chunk)
+        self.alterado = True
+
+    def ids(self) -> Set[str]:
+        return set(self.tamanhos)
+
+    # ---------- busca ----------
+
+    def buscar(self, consulta: str, k: int) -> List[Tuple[str, float]]:
+        """Retorna até k pares (id do chunk, score), do mais para o menos relevante."""
+        return self.buscar_varios([consulta], k)[0]
+
+    def buscar_varios(self, consultas: List[str], k: int) -> List[List[Tuple[str, float]]]:
+        """
+        buscar() para várias consultas. A contribuição de cada termo (idf e
+        normalização pelo tamanho de cada chunk) é calculada uma vez e somada
+        em todas as consultas que o contêm: perguntas de um lote repetem termos.
+        """
+        n = len(self.tamanhos)
+        if not n:
+            return [[] for _ in consultas]
+
+        tamanho_medio = self.total_termos / n or 1.0
+        contribuicoes: Dict[str, Dict[str, float]] = {}
+
+        def contribuicao(termo: str) -> Dict[str, float]:
+            if termo not in contribuicoes:
+                postings = self.postings.get(termo) or {}
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                contribuicoes[termo] = {
+                    id_chunk: idf * frequencia * (self.k1 + 1) / (
+                        frequencia + self.k1 * (1 - self.b + self.b * self.tamanhos[id_chunk] / tamanho_medio)
+                    )
+                    for id_chunk, frequencia in postings.items()
+                }
+            return contribuicoes[termo]
+
+        resultados = []
+        for consulta in consultas:
+            # Só os chunks que contêm algum termo da consulta são visitados
+            scores: Dict[str, float] = {}
+            for termo in dict.fromkeys(tokenizar(consulta)):
+                for id_chunk, parcela in contribuicao(termo).items():
+                    scores[id_chunk] = scores.get(id_chunk, 0.0) + parcela
+            resultados.append(heapq.nlargest(k, scores.items(), key=lambda item: item[1]))
+        return resultados
+
+    # ---------- persistência ----------
+
+    def salvar(self, diretorio: str) -> None:
+        # Mesmo esquema do manifesto: arquivo temporário + substituição atômica
+        os.makedirs(diretorio, exist_ok=True)
+        caminho = os.path.join(diretorio, ARQUIVO_INDICE_BM25)
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({
+                "versao": VERSAO_INDICE_BM25,
+                "postings": self.postings,
+                "tamanhos": self.tamanhos
+            }, f, ensure_ascii=False)
+        os.replace(temporario, caminho)
+        self.alterado = False
+
+    @classmethod
+    def carregar(cls, diretorio: str) -> "IndiceBM25":
+        """Lê o índice salvo; ausente ou corrompido, retorna um índice vazio."""
+        indice = cls()
+        caminho = os.path.join(diretorio, ARQUIVO_INDICE_BM25)
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return indice
+
+        if dados.get("versao") != VERSAO_INDICE_BM25:
+            return indice
+
+        indice.postings = dados["postings"]
+        indice.tamanhos = dados["tamanhos"]
+        indice.total_termos = sum(indice.tamanhos.values())
+        for termo, postings in indice.postings.items():
+            for id_chunk in postings:
+                indice.termos_chunk.setdefault(id_chunk, []).append(termo)
+        return indice
+
+# =========================
+# 4. FUSÃO DE RANKINGS
+# =========================
+
+def fundir_rrf(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """
+    Reciprocal Rank Fusion: cada lista contribui 1 / (k + posição) para cada id.
+    Empates mantêm a ordem de primeira aparição (a primeira lista tem prioridade).
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for posicao, id_chunk in enumerate(ranking, start=1):
+            scores[id_chunk] = scores.get(id_chunk, 0.0) + 1.0 / (k + posicao)
+    return sorted(scores, key=lambda id_chunk: -scores[id_chunk])
@@ -0,0 +1,311 @@
+# ============================================
+# AGENTE DE RH COM RAG + RERANKING (PERGUNTAS EM LOTE)
+# Respostas pré-calculadas (FAQ) e avaliações de regressão a partir de JSONL ou CSV
+# ============================================
+
+# Uso (a partir da raiz do projeto):
+#   uv run exemplos/nativo/lote.py perguntas.jsonl respostas.jsonl
+#   uv run exemplos/nativo/lote.py faq.csv respostas.jsonl --concorrencia 16
+#
+# Entrada: JSONL com {"pergunta": "...", "id": "..."} por linha ou CSV com as colunas
+# pergunta e id (opcional); sem id, a pergunta é identificada pelo hash do texto.
+# Saída: uma linha JSON por pergunta respondida, na ordem em que ficam prontas.
+# Ao reiniciar com a mesma saída, as perguntas já respondidas são puladas; as que
+# falharam não são gravadas e entram na próxima execução.
+# O cache de respostas fica desligado: numa avaliação, uma pergunta quase idêntica a
+# outra receberia a resposta dela. --cache-respostas o liga (FAQ pré-calculado).
+
+# =========================
+# 1. IMPORTAÇÕES
+# =========================
+
+import os
+import csv
+import sys
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+from rich.console import Console
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn, TimeElapsedColumn
+
+# Índice, caches e configurações são os da CLI: o lote é outra interface para o mesmo pipeline
+import main_cli2_nativo as rag
+import telemetria
+import provedores
+from manifesto import hash_texto
+from rerank import pontuar_async, ordenar_por_score
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+DOCUMENTOS_PADRAO = "documentos/politica_ferias.pdf,documentos/politica_home_office.pdf,documentos/codigo_conduta.pdf"
+
+console = Console()
+
+# =========================
+# 2. ENTRADA E SAÍDA
+# =========================
+
+def ler_perguntas(caminho: str) -> List[Dict]:
+    """
+    Perguntas do arquivo como {"id", "pergunta"}, sem vazias e sem ids repetidos.
+    Um CSV sem a coluna 'pergunta' ou uma linha do JSONL que não é um objeto com
+    o campo 'pergunta' gera ValueError com o número da linha.
+    """
+    # utf-8-sig: o BOM de um CSV salvo pelo Excel colaria no nome da primeira coluna
+    with open(caminho, encoding="utf-8-sig", newline="") as f:
+        if caminho.lower().endswith(".csv"):
+            leitor = csv.DictReader(f)
+            if "pergunta" not in (leitor.fieldnames or []):
+                raise ValueError(f"{caminho}: sem a coluna 'pergunta' (colunas: {', '.join(leitor.fieldnames or [])})")
+            registros = list(leitor)
+        else:
+            registros = []
+            for numero, linha in enumerate(f, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except ValueError as erro:
+                    raise ValueError(f"{caminho}:{numero}: JSON inválido ({erro})") from erro
+                if not isinstance(registro, dict) or not isinstance(registro.get("pergunta"), str):
+                    raise ValueError(f"{caminho}:{numero}: esperado um objeto com o campo 'pergunta' (texto)")
+                registros.append(registro)
+
+    perguntas, vistos = [], set()
+    for registro in registros:
+        pergunta = (registro.get("pergunta") or "").strip()
+        if not pergunta:
+            continue
+        id_pergunta = str(registro.get("id") or hash_texto(pergunta)[:16])
+        if id_pergunta not in vistos:
+            vistos.add(id_pergunta)
+            perguntas.append({"id": id_pergunta, "pergunta": pergunta})
+    return perguntas
+
+def ids_respondidos(caminho: str) -> Set[str]:
+    """
+    Ids já gravados na saída. Uma última linha incompleta (execução interrompida
+    no meio da escrita) é descartada, para que a próxima linha comece limpa.
+    """
+    if not os.path.exists(caminho):
+        return set()
+
+    with open(caminho, "rb+") as f:
+        conteudo = f.read()
+        if conteudo and not conteudo.endswith(b"\n"):
+            f.truncate(conteudo.rfind(b"\n") + 1)
+            conteudo = conteudo[:conteudo.rfind(b"\n") + 1]
+
+    respondidos = set()
+    for linha in conteudo.decode("utf-8").splitlines():
+        try:
+            respondidos.add(json.loads(linha)["id"])
+        except (ValueError, KeyError):
+            continue
+    return respondidos
+
+# =========================
+# 3. PIPELINE EM LOTE
+# =========================
+
+def recuperar_lote(perguntas: List[Dict], collection, usar_cache: bool = False) -> List[Dict]:
+    """
+    Etapas anteriores ao reranking para um bloco de perguntas: um pedido de
+    embeddings para todas (com o BM25 do bloco calculado ao mesmo tempo, numa
+    thread), respostas em cache (se usar_cache) e uma busca vetorial por categoria.
+    Retorna, por pergunta, {"resposta"} (cache) ou {"embedding", "documentos"}.
+    """
+    textos = [item["pergunta"] for item in perguntas]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        lexicos = executor.submit(rag.busca_lexica_lote, textos) if rag.BUSCA_HIBRIDA else None
+        embeddings = rag.gerar_embeddings(textos)
+        lexicos = lexicos.result() if lexicos else [[] for _ in textos]
+
+    recuperados: List[Optional[Dict]] = [None] * len(perguntas)
+    pendentes = []
+    for i, (texto, embedding) in enumerate(zip(textos, embeddings)):
+        em_cache = rag.cache_respostas.buscar(texto, embedding) if usar_cache else None
+        if em_cache:
+            recuperados[i] = {"resposta": em_cache[0], "contexto": em_cache[1], "cache": True}
+        elif embedding is None:
+            recuperados[i] = {"erro": "Não foi possível gerar o embedding da pergunta"}
+        else:
+            pendentes.append(i)
+
+    if pendentes:
+        resultados = rag.busca_vetorial_lote(
+            [textos[i] for i in pendentes],
+            [embeddings[i] for i in pendentes],
+            collection
+        )
+        for i, resultado in zip(pendentes, resultados):
+            documentos = rag.combinar_candidatos(resultado, lexicos[i], collection)
+            if documentos:
+                recuperados[i] = {"embedding": embeddings[i], "documentos": documentos}
+            else:
+                recuperados[i] = {"resposta": rag.RESPOSTA_SEM_CONTEXTO, "contexto": [], "cache": False}
+    return recuperados
+
+async def responder(item: Dict, recuperado: Dict, clientes: Dict[str, "AsyncOpenAI"], usar_cache: bool = False) -> Dict:
+    """Reranking, contexto e geração de uma pergunta; retorna a linha da saída."""
+    tempos = {}
+    inicio = time.perf_counter()
+
+    if "resposta" in recuperado:
+        resposta, contexto, em_cache = recuperado["resposta"], recuperado["contexto"], recuperado["cache"]
+    else:
+        with telemetria.trecho("rerank", modo=rag.RERANK_MODE):
+            try:
+                scores = await pontuar_async(
+                    rag.RERANK_MODE,
+                    item["pergunta"],
+                    recuperado["documentos"],
+                    clientes["rerank"],
+                    rag.provedores.modelo("rerank"),
+                    max_concorrencia=rag.RERANK_MAX_CONCORRENCIA,
+                    parar_quando=rag.criterio_parada_rerank()
+                )
+            except Exception:
+                # Como na CLI: sem notas, vale a ordem da recuperação
+                scores = [0] * len(recuperado["documentos"])
+        tempos["rerank"] = time.perf_counter() - inicio
+
+        contexto = rag.selecionar_contexto(ordenar_por_score(recuperado["documentos"], scores))
+        inicio_geracao = time.perf_counter()
+        with telemetria.trecho("geracao"):
+            response = await clientes["geracao"].chat.completions.create(
+                model=rag.provedores.modelo("geracao"),
+                messages=[{"role": "user", "content": rag.montar_prompt_final(item["pergunta"], contexto)}],
+                temperature=0
+            )
+            telemetria.registrar_uso("geracao", rag.provedores.modelo("geracao"), response.usage)
+        resposta, em_cache = response.choices[0].message.content, False
+        tempos["geracao"] = time.perf_counter() - inicio_geracao
+        if usar_cache:
+            rag.cache_respostas.guardar(item["pergunta"], recuperado["embedding"], resposta, contexto)
+
+    tempos["total"] = time.perf_counter() - inicio
+    return {
+        "id": item["id"],
+        "pergunta": item["pergunta"],
+        "resposta": resposta,
+        "fontes": rag.serializar_fontes(contexto),
+        "cache": em_cache,
+        "tempos_ms": {etapa: round(segundos * 1000, 1) for etapa, segundos in tempos.items()}
+    }
+
+async def processar(perguntas: List[Dict], collection, args) -> Dict:
+    # Embeddings e busca usam o pipeline síncrono da CLI; aqui só reranking e geração
+    clientes = provedores.criar_clientes_async(args.max_conexoes)
+    vagas = asyncio.Semaphore(args.concorrencia)
+    totais = {"respondidas": 0, "falhas": 0, "recuperacao": 0.0}
+
+    with open(args.saida, "a", encoding="utf-8") as saida, Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+        console=console
+    ) as progresso:
+        tarefa = progresso.add_task("[cyan]Respondendo perguntas...", total=len(perguntas))
+
+        async def uma(item: Dict, recuperado: Dict, recuperacao_ms: float) -> None:
+            try:
+                if "erro" in recuperado:
+                    raise ValueError(recuperado["erro"])
+                linha = await responder(item, recuperado, clientes, args.cache_respostas)
+                linha["tempos_ms"]["recuperacao_lote"] = round(recuperacao_ms, 1)
+                # Uma linha completa por vez: a saída sempre pode ser retomada
+                saida.write(json.dumps(linha, ensure_ascii=False) + "\n")
+                saida.flush()
+                totais["respondidas"] += 1
+            except Exception as e:
+                totais["falhas"] += 1
+                progresso.console.print(f"[yellow]⚠️[/yellow] {item['id']}: {e}")
+            finally:
+                progresso.advance(tarefa)
+                vagas.release()
+
+        tarefas = set()
+        try:
+            for inicio_bloco in range(0, len(perguntas), args.lote):
+                bloco = perguntas[inicio_bloco:inicio_bloco + args.lote]
+
+                # Fora do event loop: as respostas do bloco anterior continuam sendo geradas
+                inicio = time.perf_counter()
+                recuperados = await asyncio.to_thread(recuperar_lote, bloco, collection, args.cache_respostas)
+                duracao = time.perf_counter() - inicio
+                totais["recuperacao"] += duracao
+
+                for item, recuperado in zip(bloco, recuperados):
+                    await vagas.acquire()
+                    tarefa_pergunta = asyncio.create_task(uma(item, recuperado, duracao * 1000 / len(bloco)))
+                    tarefas.add(tarefa_pergunta)
+                    tarefa_pergunta.add_done_callback(tarefas.discard)
+
+            if tarefas:
+                await asyncio.gather(*tarefas)
+        finally:
+            for client in clientes.values():
+                await client.close()
+
+    return totais
+
+# =========================
+# 4. EXECUÇÃO
+# =========================
+
+def main():
+    parser = argparse.ArgumentParser(description="Responde perguntas em lote com o pipeline nativo do agente de RH")
+    parser.add_argument("entrada", help="arquivo .jsonl ou .csv com a coluna 'pergunta' (e 'id', opcional)")
+    parser.add_argument("saida", help="arquivo .jsonl de respostas (retomado se já existir)")
+    parser.add_argument("--concorrencia", type=int, default=8, help="perguntas em reranking/geração ao mesmo tempo")
+    parser.add_argument("--lote", type=int, default=500, help="perguntas por pedido de embeddings e busca vetorial")
+    parser.add_argument("--max-conexoes", type=int, default=64, help="conexões HTTP com a API da OpenAI")
+    parser.add_argument("--documentos", default=DOCUMENTOS_PADRAO, help="PDFs indexados, separados por vírgula")
+    parser.add_argument(
+        "--cache-respostas", action="store_true",
+        help="reaproveita respostas de perguntas iguais ou quase idênticas (desligado: cada pergunta é respondida)"
+    )
+    args = parser.parse_args()
+
+    try:
+        perguntas = ler_perguntas(args.entrada)
+    except ValueError as erro:
+        console.print(f"[bold red]ERRO:[/bold red] {erro}")
+        sys.exit(1)
+    respondidos = ids_respondidos(args.saida)
+    pendentes = [item for item in perguntas if item["id"] not in respondidos]
+    console.print(
+        f"[bold]{len(perguntas)}[/bold] perguntas, [bold]{len(perguntas) - len(pendentes)}[/bold] já respondidas, "
+        f"[bold]{len(pendentes)}[/bold] pendentes"
+    )
+    if not pendentes:
+        return
+
+    collection = rag.inicializar_vectorstore(args.documentos.split(","))
+    rag.console.quiet = True
+
+    inicio = time.perf_counter()
+    totais = asyncio.run(processar(pendentes, collection, args))
+    duracao = time.perf_counter() - inicio
+
+    console.print(
+        f"[green]✓[/green] {totais['respondidas']} respondidas, {totais['falhas']} falhas em {duracao:.1f}s "
+        f"[dim]({totais['respondidas'] / duracao:.1f} perguntas/s; embeddings e busca: {totais['recuperacao']:.1f}s)[/dim]"
+    )
+    if telemetria.ativa():
+        uso = telemetria.resumo()
+        console.print(f"[dim]💲 OpenAI: {uso['chamadas']} chamadas, {uso['tokens']} tokens, US$ {uso['custo_usd']:.4f}[/dim]")
+    if totais["falhas"]:
+        console.print("[yellow]Execute de novo com a mesma saída para tentar as perguntas que falharam.[/yellow]")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -9,66 +9,233 @@
 
 import os
 import sys
+import time
 import hashlib
-import shutil
-from typing import List, Dict
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional
 from dotenv import load_dotenv
 
-from pypdf import PdfReader
-import chromadb
-from openai import OpenAI
+import clientes_openai
+import provedores
 
+# chromadb, o SDK da OpenAI, o pypdf e os componentes do Rich que usam Markdown e
+# realce de sintaxe são importados no primeiro uso: a pergunta aparece sem esperar
+# por eles (ver abrir_colecao, clientes_openai e benchmarks/bench_inicializacao.py)
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
-from rich.syntax import Syntax
-from rich.table import Table
+
+if TYPE_CHECKING:
+    import chromadb
+    from openai import OpenAI
+
+from manifesto import (
+    carregar_manifesto,
+    salvar_manifesto,
+    novo_manifesto,
+    classificar_arquivos,
+    total_chunks,
+    versao_corpus,
+    hash_texto
+)
+from cache_embeddings import CacheEmbeddings
+from agendador_embeddings import criar_contador_tokens
+from cache_respostas import CacheRespostas
+from ingestao import extrair_documentos, antecipar
+from lexico import IndiceBM25, fundir_rrf
+from roteamento import CATEGORIA_PADRAO, categorizar_texto, rotear_pergunta
+from contexto import montar_contexto
+from terminal import painel_resposta, exibir_resposta_stream
+from chunking import iterar_chunks as dividir_paginas
+from vectorstore import BACKENDS_VECTOR_STORE, ColecaoNumpy, abrir_colecao_local
+from quantizacao import MODOS_QUANTIZACAO
+import telemetria
+from rerank import (
+    MODOS_RERANK,
+    NOTA_NAO_AVALIADO,
+    pontuar,
+    ordenar_por_score,
+    topo_definido,
+    registrar_latencia,
+    resumo_latencias
+)
 
 console = Console()
 
 load_dotenv()
 
-if not os.getenv("OPENAI_API_KEY"):
-    console.print("[bold red]ERRO:[/bold red] OPENAI_API_KEY não encontrada no arquivo .env")
+for aviso in provedores.avisos:
+    console.print(f"[yellow]AVISO:[/yellow] {aviso}")
+for erro in provedores.erros:
+    console.print(f"[bold red]ERRO:[/bold red] {erro}")
+if provedores.erros:
     sys.exit(1)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# A chave só é exigida se alguma etapa usa a OpenAI (provedores locais funcionam sem rede externa)
+if provedores.chave_necessaria() and not os.getenv("OPENAI_API_KEY"):
+    console.print(
+        "[bold red]ERRO:[/bold red] OPENAI_API_KEY não encontrada no arquivo .env "
+        "(sem a OpenAI: PROVEDOR_EMBEDDINGS=local ou compativel e PROVEDOR_LLM=compativel)"
+    )
+    sys.exit(1)
 
 # =========================
 # 2. CONFIGURAÇÕES GERAIS
 # =========================
 
 PERSIST_DIRECTORY = "./chroma_rh"
-EMBEDDING_MODEL = "text-embedding-3-small"
-LLM_MODEL = "gpt-4o-mini"
+# Modelos de geração e reranking: provedores.modelo("geracao") e provedores.modelo("rerank")
+# (LLM_MODEL e RERANK_MODEL no .env; num servidor compatível sem modelo definido, o primeiro
+# listado por ele, consultado só no primeiro uso)
+COLLECTION_NAME = "rh_documentos"
+# Tamanho dos chunks e sobreposição entre chunks vizinhos, em tokens do modelo de embeddings
+# (limitado ao máximo de tokens por texto do provedor de embeddings)
+CHUNK_TOKENS = 200
+CHUNK_OVERLAP_TOKENS = 40
+
+# Armazenamento dos vetores: "chroma" (padrão), "numpy" (matriz mapeada em memória)
+# ou "faiss" (requer faiss-cpu; FAISS_FABRICA="HNSW32" troca a busca exata por aproximada)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
+if VECTOR_STORE not in BACKENDS_VECTOR_STORE:
+    console.print(f"[yellow]AVISO:[/yellow] VECTOR_STORE '{VECTOR_STORE}' inválido. Usando 'chroma'.")
+    VECTOR_STORE = "chroma"
+FAISS_FABRICA = os.getenv("FAISS_FABRICA", "Flat")
+
+# Quantização (VECTOR_STORE=numpy): a busca percorre códigos compactos em RAM ("int8" ou "pq";
+# "float32" só trunca) e refaz em precisão total as QUANTIZACAO_RESCORE x k melhores linhas.
+# QUANTIZACAO_DIMENSOES trunca os vetores do primeiro estágio (Matryoshka, ex.: 512 ou 256)
+QUANTIZACAO = os.getenv("QUANTIZACAO", "").strip().lower()
+QUANTIZACAO_DIMENSOES = int(os.getenv("QUANTIZACAO_DIMENSOES", "0"))
+QUANTIZACAO_RESCORE = int(os.getenv("QUANTIZACAO_RESCORE", "4"))
+if QUANTIZACAO and QUANTIZACAO not in MODOS_QUANTIZACAO:
+    console.print(f"[yellow]AVISO:[/yellow] QUANTIZACAO '{QUANTIZACAO}' inválida. Usando a busca exata.")
+    QUANTIZACAO = ""
+if (QUANTIZACAO or QUANTIZACAO_DIMENSOES) and VECTOR_STORE != "numpy":
+    console.print(
+        "[yellow]AVISO:[/yellow] QUANTIZACAO e QUANTIZACAO_DIMENSOES valem só para VECTOR_STORE=numpy "
+        "(no FAISS, use FAISS_FABRICA, ex.: HNSW32 ou SQ8; PQ96 precisa de 256+ chunks para o treino). "
+        "Usando a busca exata."
+    )
+    QUANTIZACAO, QUANTIZACAO_DIMENSOES = "", 0
+
+# Processos usados na extração de texto dos PDFs (padrão: todos os núcleos)
+INGESTAO_WORKERS = int(os.getenv("INGESTAO_WORKERS", "0")) or None
+
+# Embeddings: lotes fechados por tokens e várias requisições simultâneas à API
+EMBEDDING_MAX_TOKENS_LOTE = int(os.getenv("EMBEDDING_MAX_TOKENS_LOTE", "16000"))
+EMBEDDING_MAX_EM_VOO = int(os.getenv("EMBEDDING_MAX_EM_VOO", "4"))
+
+# Indexação em streaming: chunks prontos aguardando embedding e lote de atualização de metadados
+CHUNKS_EM_ESPERA = 500
+LOTE_METADADOS = 100
+
+# Reranking: "concorrente" (uma chamada ao LLM por trecho, em paralelo),
+# "listwise" (um prompt para todos) ou "lexico" (BM25 local, sem LLM)
+RERANK_MODE = os.getenv("RERANK_MODE", "concorrente")
+if RERANK_MODE not in MODOS_RERANK:
+    console.print(f"[yellow]AVISO:[/yellow] RERANK_MODE '{RERANK_MODE}' inválido. Usando 'concorrente'.")
+    RERANK_MODE = "concorrente"
+RERANK_MAX_CONCORRENCIA = int(os.getenv("RERANK_MAX_CONCORRENCIA", "8"))
+
+# Busca híbrida: BM25 local e busca vetorial em paralelo, combinadas por RRF
+# (BUSCA_HIBRIDA=0 volta à busca apenas vetorial)
+BUSCA_HIBRIDA = os.getenv("BUSCA_HIBRIDA", "1") == "1"
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Candidatos enviados ao reranking; com a busca híbrida o primeiro estágio é mais preciso
+RERANK_CANDIDATOS = int(os.getenv("RERANK_CANDIDATOS", "6" if BUSCA_HIBRIDA else "8"))
+
+# Roteamento: perguntas claramente de uma categoria buscam nos chunks dela e nos "geral"
+# (confiança = fração das palavras-chave da pergunta que pertencem à categoria). Com
+# confiança >= ROTEAMENTO_CONFIANCA_EXCLUSIVA e a partição cheia, só ela é consultada;
+# abaixo disso, ou com a partição incompleta, os ROTEAMENTO_GLOBAIS melhores trechos do
+# corpus inteiro entram junto, por distância (um trecho relevante marcado com outra
+# categoria não é descartado pelo filtro)
+ROTEAMENTO = os.getenv("ROTEAMENTO", "1") == "1"
+ROTEAMENTO_CONFIANCA = float(os.getenv("ROTEAMENTO_CONFIANCA", "0.6"))
+ROTEAMENTO_CONFIANCA_EXCLUSIVA = float(os.getenv("ROTEAMENTO_CONFIANCA_EXCLUSIVA", "0.8"))
+ROTEAMENTO_GLOBAIS = int(os.getenv("ROTEAMENTO_GLOBAIS", "4"))
+
+# Contexto do prompt final: trechos vizinhos da mesma página são unidos e os blocos entram,
+# na ordem do reranking, até CONTEXTO_MAX_TOKENS (tokenizer do LLM) ou CONTEXTO_MAX_BLOCOS
+CONTEXTO_MAX_TOKENS = int(os.getenv("CONTEXTO_MAX_TOKENS", "1500"))
+CONTEXTO_MAX_BLOCOS = int(os.getenv("CONTEXTO_MAX_BLOCOS", "4"))
+contar_tokens_llm = criar_contador_tokens(lambda: provedores.modelo("geracao"))
+
+# Exibe a resposta token a token (STREAMING=0 volta a esperar a resposta completa)
+STREAMING = os.getenv("STREAMING", "1") == "1"
+
+# Execução sobreposta: conexões com a API aquecidas enquanto a recuperação roda e, no
+# reranking concorrente, geração iniciada assim que CONTEXTO_MAX_BLOCOS trechos tiverem
+# nota >= RERANK_NOTA_SUFICIENTE (as avaliações restantes são canceladas; com 10, o topo
+# só muda em caso de empate)
+PIPELINE_SOBREPOSTO = os.getenv("PIPELINE_SOBREPOSTO", "0") == "1"
+RERANK_NOTA_SUFICIENTE = float(os.getenv("RERANK_NOTA_SUFICIENTE", "9"))
+
+# Telemetria: "metricas" (duração por etapa, tokens, custo e caches em memória) ou
+# "otel" (o mesmo, mais spans OpenTelemetry); desligada por padrão, sem custo
+TELEMETRIA = os.getenv("TELEMETRIA", "").strip().lower()
+if TELEMETRIA not in telemetria.MODOS_TELEMETRIA:
+    console.print(f"[yellow]AVISO:[/yellow] TELEMETRIA '{TELEMETRIA}' inválida. Telemetria desligada.")
+    TELEMETRIA = ""
+if telemetria.configurar(TELEMETRIA) != TELEMETRIA and TELEMETRIA == "otel":
+    console.print("[yellow]AVISO:[/yellow] Pacote opentelemetry não instalado. Registrando apenas métricas.")
+
+# Cache de embeddings (chunks e perguntas), compartilhado entre indexação e consulta
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./cache_rh/embeddings.sqlite")
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+EMBEDDING_CACHE_MEMORIA_MB = int(os.getenv("EMBEDDING_CACHE_MEMORIA_MB", "64"))
+
+cache_embeddings = CacheEmbeddings(
+    EMBEDDING_CACHE_PATH,
+    max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+    max_bytes_memoria=EMBEDDING_CACHE_MEMORIA_MB * 1024 * 1024
+)
+
+# AgendadorEmbeddings (OpenAI ou servidor compatível) ou EmbeddingsLocais, conforme PROVEDOR_EMBEDDINGS
+agendador_embeddings = provedores.criar_embeddador(
+    cache=cache_embeddings,
+    max_tokens_lote=EMBEDDING_MAX_TOKENS_LOTE,
+    max_em_voo=EMBEDDING_MAX_EM_VOO
+)
+contar_tokens_embedding = agendador_embeddings.contar_tokens
+
+# Cache de respostas: perguntas repetidas ou quase idênticas (cosseno >= limiar)
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ITEMS = int(os.getenv("ANSWER_CACHE_MAX_ITEMS", "500"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+cache_respostas = CacheRespostas(
+    ttl_segundos=ANSWER_CACHE_TTL,
+    max_itens=ANSWER_CACHE_MAX_ITEMS,
+    limiar_similaridade=ANSWER_CACHE_THRESHOLD
+)
+
+# Índice BM25 do corpus, persistido ao lado da coleção (carregado em inicializar_vectorstore)
+indice_lexico = IndiceBM25()
+
+# Lidas só quando as métricas são exportadas
+telemetria.registrar_fonte("cache_respostas", cache_respostas.estatisticas)
+telemetria.registrar_fonte("cache_embeddings", cache_embeddings.estatisticas)
+telemetria.registrar_fonte("agendador_embeddings", agendador_embeddings.estatisticas)
+telemetria.registrar_fonte("clientes_openai", clientes_openai.estatisticas)
+
+# Conexões abertas em segundo plano, sem bloquear a pergunta
+executor_aquecimento = ThreadPoolExecutor(max_workers=RERANK_MAX_CONCORRENCIA + 1, thread_name_prefix="aquecimento")
 
 # =========================
 # 3. LEITURA DOS DOCUMENTOS
 # =========================
 
+def avisar_ausentes(lista_documentos: List[str]) -> None:
+    for caminho in lista_documentos:
+        if not os.path.exists(caminho):
+            console.print(f"[yellow]AVISO:[/yellow] Arquivo não encontrado: {caminho}")
+
 def carregar_documentos(lista_documentos: List[str] = None) -> List[Dict]:
-    
-    documentos = []
+    avisar_ausentes(lista_documentos)
 
     with console.status("[bold green]Carregando documentos PDF..."):
-        for caminho in lista_documentos:
-            if not os.path.exists(caminho):
-                console.print(f"[yellow]AVISO:[/yellow] Arquivo não encontrado: {caminho}")
-                continue
-            
-            reader = PdfReader(caminho)
-            
-            for i, page in enumerate(reader.pages):
-                texto = page.extract_text()
-                if texto and texto.strip():
-                    documentos.append({
-                        "page_content": texto.strip(),
-                        "metadata": {
-                            "documento": caminho,
-                            "pagina": i + 1
-                        }
-                    })
+        documentos = list(extrair_documentos(lista_documentos, max_workers=INGESTAO_WORKERS))
     
     console.print(f"[green]✓[/green] OK ([bold]{len(documentos)}[/bold] páginas carregadas)")
     return documentos
@@ -77,72 +244,41 @@ def carregar_documentos(lista_documentos: List[str] = None) -> List[Dict]:
 # 4. CHUNKING
 # =========================
 
-def gerar_chunks(documentos: List[Dict], chunk_size: int = 800, chunk_overlap: int = 150) -> List[Dict]:
-    chunks = []
-    
-    for doc in documentos:
-        texto = doc["page_content"]
-        metadata = doc["metadata"]
-        
-        # Split por parágrafos
-        paragrafos = texto.split('\n\n')
-        chunk_atual = ""
-        
-        for paragrafo in paragrafos:
-            paragrafo = paragrafo.strip()
-            if not paragrafo:
-                continue
-                
-            if len(chunk_atual) + len(paragrafo) <= chunk_size:
-                chunk_atual += paragrafo + " "
-            else:
-                if chunk_atual.strip():
-                    chunks.append({
-                        "page_content": chunk_atual.strip(),
-                        "metadata": metadata.copy()
-                    })
-                chunk_atual = paragrafo + " "
-        
-        if chunk_atual.strip():
-            chunks.append({
-                "page_content": chunk_atual.strip(),
-                "metadata": metadata.copy()
-            })
-    
-    # Divide chunks muito grandes
-    chunks_finais = []
-    for chunk in chunks:
-        if len(chunk["page_content"]) > chunk_size:
-            texto = chunk["page_content"]
-            for i in range(0, len(texto), chunk_size - chunk_overlap):
-                chunk_texto = texto[i:i + chunk_size]
-                if chunk_texto.strip():
-                    chunks_finais.append({
-                        "page_content": chunk_texto.strip(),
-                        "metadata": chunk["metadata"].copy()
-                    })
-        else:
-            if chunk["page_content"].strip():
-                chunks_finais.append(chunk)
-    
-    return chunks_finais
+def iterar_chunks(
+    documentos: Iterable[Dict],
+    max_tokens: int = CHUNK_TOKENS,
+    sobreposicao_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> Iterator[Dict]:
+    """
+    Gera os chunks página a página, sem materializar o corpus inteiro.
+    Os cortes caem em fronteiras de frase ou parágrafo, o tamanho é medido com
+    o tokenizer do modelo de embeddings e cada chunk registra em metadata["inicio"]
+    e metadata["fim"] sua posição (em caracteres) dentro do texto da página.
+    """
+    # Um chunk acima do limite do modelo seria truncado no embedding (ex.: 126 tokens no modelo local padrão)
+    max_tokens = min(max_tokens, agendador_embeddings.max_tokens_texto)
+    sobreposicao_tokens = min(sobreposicao_tokens, max_tokens // 2)
+    return dividir_paginas(documentos, contar_tokens_embedding, max_tokens, sobreposicao_tokens)
+
+def gerar_chunks(
+    documentos: Iterable[Dict],
+    max_tokens: int = CHUNK_TOKENS,
+    sobreposicao_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> List[Dict]:
+    return list(iterar_chunks(documentos, max_tokens, sobreposicao_tokens))
 
 # =========================
 # 5. ENRIQUECIMENTO COM METADADOS
 # =========================
 
+def enriquecer_chunk(chunk: Dict) -> Dict:
+    # As mesmas regras classificam as perguntas no roteamento da busca
+    chunk["metadata"]["categoria"] = categorizar_texto(chunk["page_content"])
+    return chunk
+
 def enriquecer_chunks(chunks: List[Dict]) -> List[Dict]:
     for chunk in chunks:
-        texto = chunk["page_content"].lower()
-
-        if "férias" in texto or "ferias" in texto:
-            chunk["metadata"]["categoria"] = "ferias"
-        elif "home office" in texto or "remoto" in texto or "teletrabalho" in texto:
-            chunk["metadata"]["categoria"] = "home_office"
-        elif "conduta" in texto or "ética" in texto or "etica" in texto:
-            chunk["metadata"]["categoria"] = "conduta"
-        else:
-            chunk["metadata"]["categoria"] = "geral"
+        enriquecer_chunk(chunk)
 
     return chunks
 
@@ -150,100 +286,382 @@ def enriquecer_chunks(chunks: List[Dict]) -> List[Dict]:
 # 6. EMBEDDINGS
 # =========================
 
-def gerar_embeddings(textos: List[str]) -> List[List[float]]:
-    # Filtra textos vazios
-    textos_validos = [t for t in textos if t and t.strip()]
-    if not textos_validos:
-        return []
-    
-    response = client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=textos_validos
-    )
-    return [embedding.embedding for embedding in response.data]
+def gerar_embeddings(textos: List[str]) -> List[Optional[List[float]]]:
+    """
+    Retorna exatamente um item por texto, na mesma ordem: textos vazios e
+    textos recusados pela API ficam com None em vez de sumir da lista,
+    para que o i-ésimo vetor sempre corresponda ao i-ésimo texto.
+    """
+    embeddings: List[Optional[List[float]]] = [None] * len(textos)
+    validos = [i for i, t in enumerate(textos) if t and t.strip()]
+    if not validos:
+        return embeddings
+
+    # O agendador consulta o cache e só envia à API os textos ausentes
+    for i, embedding in zip(validos, agendador_embeddings.embeddar([textos[i] for i in validos])):
+        embeddings[i] = embedding
+    return embeddings
 
+@telemetria.medido("embedding_pergunta")
 def gerar_embedding_unico(texto: str) -> List[float]:
-    response = client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=texto
-    )
-    return response.data[0].embedding
+    embedding = gerar_embeddings([texto])[0]
+    if embedding is None:
+        raise ValueError("Não foi possível gerar o embedding do texto informado")
+    return embedding
 
 # =========================
 # 7. VECTOR STORE
 # =========================
 
-def inicializar_vectorstore(lista_documentos: List[str]) -> chromadb.api.models.Collection.Collection:
-    # Força recriação para garantir dados limpos
-    if os.path.exists(PERSIST_DIRECTORY):
-        console.print("[yellow]![/yellow] Banco existente detectado. Limpando para garantir integridade...")
-        shutil.rmtree(PERSIST_DIRECTORY)
-    
+def gerar_id_chunk(chunk: Dict) -> str:
+    # Documento, página e posição na página entram no hash: trechos idênticos (cabeçalhos,
+    # cláusulas padrão) em outros PDFs ou páginas não colidem, e o mesmo chunk sempre
+    # gera o mesmo id, o que torna a reindexação idempotente
+    metadata = chunk["metadata"]
+    chave = f"{metadata['documento']}\x00{metadata.get('pagina', 0)}\x00{metadata.get('inicio', 0)}\x00{chunk['page_content']}"
+    return f"chunk_{hashlib.sha256(chave.encode('utf-8')).hexdigest()[:24]}"
+
+def upsert_lote(collection, lote: List[Dict], embeddings: List[Optional[List[float]]]) -> List[Dict]:
+    """
+    Grava o lote mantendo o par (chunk, vetor) alinhado e retorna os chunks que
+    não puderam ser gravados. Se o upsert do lote falhar, tenta chunk a chunk,
+    para que um trecho problemático não descarte os embeddings dos demais.
+    """
+    pares = [(chunk, embedding) for chunk, embedding in zip(lote, embeddings) if embedding is not None]
+    falhas = [chunk for chunk, embedding in zip(lote, embeddings) if embedding is None]
+    if not pares:
+        return falhas
+
+    def gravar(itens):
+        collection.upsert(
+            ids=[chunk["id"] for chunk, _ in itens],
+            embeddings=[embedding for _, embedding in itens],
+            documents=[chunk["page_content"] for chunk, _ in itens],
+            metadatas=[chunk["metadata"] for chunk, _ in itens]
+        )
+
+    try:
+        gravar(pares)
+    except Exception:
+        for par in pares:
+            try:
+                gravar([par])
+            except Exception as e:
+                console.print(f"[yellow]AVISO:[/yellow] Chunk {par[0]['id']} não gravado: {e}")
+                falhas.append(par[0])
+
+    return falhas
+
+def abrir_colecao(recriar: bool = False):
+    if VECTOR_STORE != "chroma":
+        return abrir_colecao_local(
+            VECTOR_STORE,
+            os.path.join(PERSIST_DIRECTORY, f"{COLLECTION_NAME}_{VECTOR_STORE}"),
+            recriar=recriar,
+            fabrica_faiss=FAISS_FABRICA,
+            quantizacao=QUANTIZACAO,
+            dimensoes=QUANTIZACAO_DIMENSOES,
+            fator_rescore=QUANTIZACAO_RESCORE
+        )
+
+    import chromadb
+
     chroma_client = chromadb.PersistentClient(path=PERSIST_DIRECTORY)
-    
-    console.print("[yellow]![/yellow] Criando novo banco vetorial...")
-    documentos = carregar_documentos(lista_documentos)
-    
-    if not documentos:
-        console.print("[bold red]ERRO:[/bold red] Nenhum documento carregado. Verifique a pasta 'documentos'.")
-        console.print(f"[dim]Caminho esperado: {os.path.abspath('documentos')}[/dim]")
-        sys.exit(1)
-    
-    chunks = gerar_chunks(documentos)
-    console.print(f"[green]✓[/green] [bold]{len(chunks)}[/bold] chunks gerados")
-    
-    chunks = enriquecer_chunks(chunks)
-    
-    with console.status("[bold green]Criando embeddings e salvando banco..."):
-        # Deleta coleção se existir
+    if recriar:
         try:
-            chroma_client.delete_collection(name="rh_documentos")
-        except:
+            chroma_client.delete_collection(name=COLLECTION_NAME)
+        except Exception:
             pass
-        
-        collection = chroma_client.create_collection(
-            name="rh_documentos",
-            metadata={"hnsw:space": "cosine"}
-        )
-        
-        ids = []
-        documentos_textos = []
-        metadatas = []
-        
-        for i, chunk in enumerate(chunks):
-            if not chunk["page_content"].strip():
+
+    return chroma_client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        metadata={"hnsw:space": "cosine"}
+    )
+
+@telemetria.medido("persistir_colecao")
+def persistir_colecao(collection) -> None:
+    # O ChromaDB grava a cada operação; as coleções locais gravam tudo de uma vez
+    # (a quantizada também grava códigos refeitos após mudar QUANTIZACAO)
+    if isinstance(collection, ColecaoNumpy):
+        collection.salvar()
+
+def gravar_progresso(collection, manifesto: Dict) -> None:
+    # O manifesto só pode listar chunks que já estão no disco. O ChromaDB grava a cada
+    # operação, então o manifesto vai arquivo a arquivo; as coleções locais só chegam ao
+    # disco em persistir_colecao, e o manifesto é gravado depois dela. Interrompida no
+    # meio, a indexação local recomeça do manifesto anterior, coerente com a coleção gravada.
+    if not isinstance(collection, ColecaoNumpy):
+        salvar_manifesto(PERSIST_DIRECTORY, manifesto)
+
+def finalizar_arquivo(collection, manifesto: Dict, caminho: str, estado: Dict, progresso: Dict) -> None:
+    # Remove os chunks que deixaram de existir e grava o registro do arquivo no manifesto
+    hashes_anteriores = manifesto["arquivos"].get(caminho, {"chunks": {}})["chunks"]
+    ids_obsoletos = [i for i in hashes_anteriores if i not in progresso["hashes"]]
+    if ids_obsoletos:
+        collection.delete(ids=ids_obsoletos)
+    for id_chunk in ids_obsoletos:
+        indice_lexico.remover(id_chunk)
+
+    # Com chunks pendentes, o arquivo fica sem mtime/hash e volta a ser processado na próxima inicialização
+    if progresso["falhas"]:
+        estado = {**estado, "mtime": None, "sha256": None}
+
+    manifesto["arquivos"][caminho] = {
+        **estado,
+        "chunks": progresso["hashes"]
+    }
+    gravar_progresso(collection, manifesto)
+
+    console.print(
+        f"[dim]📄 {caminho}: {progresso['inseridos']} inseridos, "
+        f"{progresso['mantidos']} reaproveitados, {len(ids_obsoletos)} removidos[/dim]"
+    )
+    if progresso["falhas"]:
+        console.print(f"[yellow]AVISO:[/yellow] {caminho}: {progresso['falhas']} chunks não indexados")
+
+@telemetria.medido("indexacao")
+def indexar_alterados(collection, manifesto: Dict, alterados: Dict[str, Dict], chunks: Iterable[Dict]) -> None:
+    """
+    Consome os chunks de todos os arquivos alterados em um único fluxo.
+    Chunks sem mudança só têm os metadados atualizados; os novos ou modificados
+    seguem para o agendador de embeddings, que mantém vários lotes em voo
+    mesmo quando os arquivos são pequenos. Cada arquivo é gravado no manifesto
+    assim que todos os seus chunks chegam ao banco.
+    """
+    progresso = {
+        caminho: {"hashes": {}, "inseridos": 0, "mantidos": 0, "falhas": 0, "pendentes": 0, "lido": False, "concluido": False}
+        for caminho in alterados
+    }
+
+    def concluir_se_pronto(caminho: str) -> None:
+        registro = progresso[caminho]
+        if registro["lido"] and not registro["pendentes"] and not registro["concluido"]:
+            registro["concluido"] = True
+            finalizar_arquivo(collection, manifesto, caminho, alterados[caminho], registro)
+
+    def atualizar_metadados(lote: List[Dict]) -> None:
+        if lote:
+            collection.update(ids=[c["id"] for c in lote], metadatas=[c["metadata"] for c in lote])
+            progresso[lote[0]["metadata"]["documento"]]["mantidos"] += len(lote)
+
+    def separar_novos(chunks: Iterable[Dict]) -> Iterator[Dict]:
+        mantidos = []
+        anterior = None
+
+        for chunk in chunks:
+            caminho = chunk["metadata"]["documento"]
+            if caminho != anterior:
+                if anterior is not None:
+                    atualizar_metadados(mantidos)
+                    mantidos = []
+                    progresso[anterior]["lido"] = True
+                    concluir_se_pronto(anterior)
+                anterior = caminho
+                hashes_anteriores = manifesto["arquivos"].get(caminho, {"chunks": {}})["chunks"]
+
+            registro = progresso[caminho]
+            # Descarta trechos repetidos dentro do mesmo arquivo
+            if chunk["id"] in registro["hashes"]:
                 continue
-            chunk_id = f"chunk_{hashlib.md5(chunk['page_content'].encode()).hexdigest()[:16]}"
-            ids.append(chunk_id)
-            documentos_textos.append(chunk["page_content"])
-            metadatas.append(chunk["metadata"])
-        
-        console.print(f"[dim]Total de documentos para inserção: {len(ids)}[/dim]")
-        
-        batch_size = 50
-        total_inserido = 0
-        
-        for i in range(0, len(documentos_textos), batch_size):
-            batch_textos = documentos_textos[i:i + batch_size]
-            batch_ids = ids[i:i + batch_size]
-            batch_metadatas = metadatas[i:i + batch_size]
-            
-            embeddings = gerar_embeddings(batch_textos)
-            
-            if embeddings:
-                collection.add(
-                    ids=batch_ids,
-                    embeddings=embeddings,
-                    documents=batch_textos,
-                    metadatas=batch_metadatas
-                )
-                total_inserido += len(batch_ids)
-        
-        console.print(f"[green]✓[/green] OK ([bold]{total_inserido}[/bold] chunks inseridos)")
-        
-        # Verifica quantos documentos existem na coleção
-        count = collection.count()
-        console.print(f"[dim]📊 Total na coleção: {count} documentos[/dim]")
+            registro["hashes"][chunk["id"]] = hash_texto(chunk["page_content"])
+
+            if hashes_anteriores.get(chunk["id"]) == registro["hashes"][chunk["id"]]:
+                mantidos.append(chunk)
+                if len(mantidos) >= LOTE_METADADOS:
+                    atualizar_metadados(mantidos)
+                    mantidos = []
+            else:
+                registro["pendentes"] += 1
+                yield chunk
+
+        if anterior is not None:
+            atualizar_metadados(mantidos)
+            progresso[anterior]["lido"] = True
+            concluir_se_pronto(anterior)
+
+    for lote, embeddings in agendador_embeddings.embeddar_em_lotes(
+        separar_novos(chunks),
+        texto=lambda chunk: chunk["page_content"]
+    ):
+        falhas = {chunk["id"] for chunk in upsert_lote(collection, lote, embeddings)}
+
+        caminhos = []
+        for chunk in lote:
+            registro = progresso[chunk["metadata"]["documento"]]
+            registro["pendentes"] -= 1
+            if chunk["id"] in falhas:
+                # Fora do manifesto, o chunk é tentado de novo na próxima inicialização (ver finalizar_arquivo)
+                del registro["hashes"][chunk["id"]]
+                registro["falhas"] += 1
+            else:
+                registro["inseridos"] += 1
+                indice_lexico.adicionar(chunk["id"], chunk["page_content"])
+            caminhos.append(chunk["metadata"]["documento"])
+        for caminho in dict.fromkeys(caminhos):
+            concluir_se_pronto(caminho)
+
+    # Arquivos alterados sem nenhuma página com texto ficam sem chunks
+    for caminho in alterados:
+        progresso[caminho]["lido"] = True
+        concluir_se_pronto(caminho)
+
+def preparar_chunk(chunk: Dict) -> Dict:
+    enriquecer_chunk(chunk)
+    chunk["id"] = gerar_id_chunk(chunk)
+    return chunk
+
+@telemetria.medido("sincronizar_indice_lexico")
+def sincronizar_indice_lexico(collection, manifesto: Dict) -> None:
+    """
+    Garante que o índice BM25 cubra exatamente os chunks do manifesto.
+    Ausente ou fora de sincronia (índice criado antes da busca híbrida, gravação
+    interrompida), é reconstruído a partir dos textos já guardados na coleção.
+    """
+    global indice_lexico
+
+    ids_manifesto = {id_chunk for registro in manifesto["arquivos"].values() for id_chunk in registro["chunks"]}
+    if indice_lexico.ids() != ids_manifesto:
+        console.print("[yellow]![/yellow] Reconstruindo índice léxico (BM25) a partir da coleção...")
+        indice_lexico = IndiceBM25()
+        total = collection.count()
+        for inicio in range(0, total, 1000):
+            lote = collection.get(limit=1000, offset=inicio, include=["documents"])
+            for id_chunk, texto in zip(lote["ids"], lote["documents"]):
+                indice_lexico.adicionar(id_chunk, texto or "")
+
+    if indice_lexico.alterado:
+        indice_lexico.salvar(PERSIST_DIRECTORY)
+
+def assinatura_indice() -> Dict:
+    # Configuração que invalida o índice inteiro quando muda
+    return {
+        "embedding_model": agendador_embeddings.identificador,
+        "chunk_tokens": CHUNK_TOKENS,
+        "chunk_overlap_tokens": CHUNK_OVERLAP_TOKENS,
+        "vector_store": VECTOR_STORE
+    }
+
+def manifesto_em_dia(lista_documentos: List[str]) -> Optional[Dict]:
+    """
+    Manifesto desta configuração, se nenhum documento é novo, foi alterado ou
+    removido; None caso contrário. Não abre a coleção (só lê o manifesto e
+    confere tamanho e data dos arquivos).
+    """
+    manifesto, manifesto_valido = carregar_manifesto(PERSIST_DIRECTORY, assinatura_indice())
+    if not manifesto_valido:
+        return None
+    _, alterados, removidos = classificar_arquivos(lista_documentos, manifesto)
+    return None if alterados or removidos else manifesto
+
+def abrir_indice_em_dia(lista_documentos: List[str]) -> Optional["chromadb.Collection"]:
+    """
+    Caminho rápido de inicializar_vectorstore, sem mensagens no terminal: abre a
+    coleção quando os documentos estão em dia e coleção e índice BM25 conferem
+    com o manifesto. Retorna None quando há algo a indexar ou reconstruir.
+    Pode rodar numa thread enquanto a CLI já espera a primeira pergunta.
+    """
+    global indice_lexico
+
+    manifesto = manifesto_em_dia(lista_documentos)
+    if manifesto is None:
+        return None
+
+    collection = abrir_colecao()
+    lexico = IndiceBM25.carregar(PERSIST_DIRECTORY)
+    ids_manifesto = {id_chunk for registro in manifesto["arquivos"].values() for id_chunk in registro["chunks"]}
+    if not collection.count() or collection.count() != total_chunks(manifesto) or lexico.ids() != ids_manifesto:
+        return None
+
+    indice_lexico = lexico
+    salvar_manifesto(PERSIST_DIRECTORY, manifesto)
+    persistir_colecao(collection)
+    cache_respostas.definir_versao_corpus(versao_corpus(manifesto))
+    return collection
+
+@telemetria.medido("inicializar_vectorstore")
+def inicializar_vectorstore(lista_documentos: List[str]) -> "chromadb.Collection":
+    global indice_lexico
+
+    avisar_ausentes(lista_documentos)
+    collection = abrir_indice_em_dia(lista_documentos)
+    if collection is not None:
+        arquivos = sum(1 for caminho in lista_documentos if os.path.exists(caminho))
+        console.print(f"[green]✓[/green] Índice atualizado ([bold]{arquivos}[/bold] arquivos, [bold]{collection.count()}[/bold] chunks)")
+        return collection
+
+    assinatura = assinatura_indice()
+    manifesto, manifesto_valido = carregar_manifesto(PERSIST_DIRECTORY, assinatura)
+    collection = abrir_colecao()
+
+    # Manifesto ausente, de outra configuração ou fora de sincronia com a coleção: reconstrói do zero
+    if not manifesto_valido or collection.count() != total_chunks(manifesto):
+        if collection.count() or manifesto_valido:
+            console.print("[yellow]![/yellow] Manifesto inconsistente com o banco. Reconstruindo índice...")
+        manifesto = novo_manifesto(assinatura)
+        collection = abrir_colecao(recriar=True)
+        indice_lexico = IndiceBM25()
+    else:
+        indice_lexico = IndiceBM25.carregar(PERSIST_DIRECTORY)
+
+    inalterados, alterados, removidos = classificar_arquivos(lista_documentos, manifesto)
+
+    if not alterados and not removidos and collection.count():
+        salvar_manifesto(PERSIST_DIRECTORY, manifesto)
+        persistir_colecao(collection)
+        sincronizar_indice_lexico(collection, manifesto)
+        cache_respostas.definir_versao_corpus(versao_corpus(manifesto))
+        console.print(f"[green]✓[/green] Índice atualizado ([bold]{len(inalterados)}[/bold] arquivos, [bold]{collection.count()}[/bold] chunks)")
+        return collection
+
+    console.print(
+        f"[yellow]![/yellow] Atualizando banco vetorial: "
+        f"{len(alterados)} novo(s)/alterado(s), {len(removidos)} removido(s), {len(inalterados)} inalterado(s)"
+    )
+
+    for caminho in removidos:
+        ids_removidos = list(manifesto["arquivos"][caminho]["chunks"])
+        if ids_removidos:
+            collection.delete(ids=ids_removidos)
+        for id_chunk in ids_removidos:
+            indice_lexico.remover(id_chunk)
+        del manifesto["arquivos"][caminho]
+        gravar_progresso(collection, manifesto)
+        console.print(f"[dim]🗑️  {caminho}: {len(ids_removidos)} chunks removidos[/dim]")
+
+    # Pipeline em streaming: páginas -> chunks -> enriquecimento -> embeddings -> upsert.
+    # A extração e o chunking seguem adiantados em outra thread (até CHUNKS_EM_ESPERA
+    # chunks prontos) enquanto o agendador mantém vários lotes na API de embeddings.
+    paginas = extrair_documentos(list(alterados), max_workers=INGESTAO_WORKERS)
+    chunks = (preparar_chunk(chunk) for chunk in iterar_chunks(paginas) if chunk["page_content"].strip())
+
+    # closing: se a indexação falhar, a thread do produtor e o pool de extração param junto
+    with console.status("[bold green]Criando embeddings e salvando banco..."), \
+            closing(antecipar(chunks, maximo=CHUNKS_EM_ESPERA)) as chunks_prontos:
+        indexar_alterados(collection, manifesto, alterados, chunks_prontos)
+
+    estatisticas = agendador_embeddings.estatisticas()
+    if provedores.PROVEDOR_EMBEDDINGS == "local":
+        console.print(f"[dim]⚡ Embeddings locais: {estatisticas['textos']} textos em {estatisticas['segundos']:.1f}s[/dim]")
+    else:
+        console.print(
+            f"[dim]⚡ Embeddings: {estatisticas['requisicoes']} requisições, "
+            f"{estatisticas['retentativas']} retentativas[/dim]"
+        )
+
+    count = collection.count()
+    if not count:
+        console.print("[bold red]ERRO:[/bold red] Nenhum documento carregado. Verifique a pasta 'documentos'.")
+        console.print(f"[dim]Caminho esperado: {os.path.abspath('documentos')}[/dim]")
+        sys.exit(1)
+
+    console.print(f"[dim]📊 Total na coleção: {count} documentos[/dim]")
+
+    persistir_colecao(collection)
+    salvar_manifesto(PERSIST_DIRECTORY, manifesto)
+    sincronizar_indice_lexico(collection, manifesto)
+
+    # Respostas geradas sobre o corpus anterior deixam de valer
+    cache_respostas.definir_versao_corpus(versao_corpus(manifesto))
 
     return collection
 
@@ -251,118 +669,309 @@ def inicializar_vectorstore(lista_documentos: List[str]) -> chromadb.api.models.
 # 8. RERANKING
 # =========================
 
-def rerank_documentos(pergunta: str, documentos: List[Dict], client: OpenAI) -> List[Dict]:
+@telemetria.medido("rerank")
+def rerank_documentos(pergunta: str, documentos: List[Dict], client: "OpenAI") -> List[Dict]:
     if not documentos:
         console.print("[yellow]⚠️[/yellow] Nenhum documento para reranking")
         return []
-    
-    documentos_com_score = []
-
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-        console=console
-    ) as progress:
-        task = progress.add_task("[cyan]Realizando Reranking...", total=len(documentos))
-        
-        for doc in documentos:
-            prompt = f"""
-Você é um especialista em políticas internas de RH.
 
-Pergunta do usuário:
-{pergunta}
+    modo = RERANK_MODE
+    inicio = time.perf_counter()
 
-Trecho do documento:
-{doc["page_content"][:500]}
+    if modo == "concorrente":
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 
-Avalie a relevância desse trecho para responder a pergunta.
-Responda apenas com um número de 0 a 10.
-"""
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+            console=console
+        ) as progress:
+            task = progress.add_task("[cyan]Realizando Reranking...", total=len(documentos))
+
+            def ao_concluir(indice, score, erro):
+                if erro is not None:
+                    console.print(f"[yellow]⚠️[/yellow] Erro no reranking: {erro}")
+                progress.update(task, advance=1)
+
+            scores = pontuar(
+                modo,
+                pergunta,
+                documentos,
+                client,
+                provedores.modelo("rerank"),
+                max_concorrencia=RERANK_MAX_CONCORRENCIA,
+                ao_concluir=ao_concluir,
+                parar_quando=criterio_parada_rerank()
+            )
+    else:
+        with console.status(f"[cyan]Realizando Reranking ({modo})..."):
             try:
-                response = client.chat.completions.create(
-                    model=LLM_MODEL,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0,
-                    max_tokens=5
-                )
-                
-                score_text = response.choices[0].message.content.strip()
-                
-                try:
-                    score = float(score_text)
-                except:
-                    score = 0
+                scores = pontuar(modo, pergunta, documentos, client, provedores.modelo("rerank"))
             except Exception as e:
                 console.print(f"[yellow]⚠️[/yellow] Erro no reranking: {e}")
-                score = 0
+                scores = [0] * len(documentos)
 
-            documentos_com_score.append((score, doc))
-            progress.update(task, advance=1)
+    duracao = registrar_latencia(modo, inicio)
+    latencias = resumo_latencias()[modo]
 
-    documentos_ordenados = sorted(
-        documentos_com_score,
-        key=lambda x: x[0],
-        reverse=True
+    avaliados = sum(1 for score in scores if score != NOTA_NAO_AVALIADO)
+    console.print(
+        f"[green]✓[/green] Reranking concluído [dim]({modo}: {duracao:.2f}s | "
+        f"p50 {latencias['p50']:.2f}s · p95 {latencias['p95']:.2f}s"
+        f"{f' | {avaliados}/{len(documentos)} avaliados' if avaliados < len(documentos) else ''})[/dim]"
     )
+    return ordenar_por_score(documentos, scores)
+
+def criterio_parada_rerank():
+    # Parada antecipada do reranking concorrente (PIPELINE_SOBREPOSTO); None = avaliar todos
+    if not PIPELINE_SOBREPOSTO:
+        return None
+    return topo_definido(CONTEXTO_MAX_BLOCOS, RERANK_NOTA_SUFICIENTE)
 
-    console.print("[green]✓[/green] Reranking concluído")
-    return [doc for _, doc in documentos_ordenados]
+def aquecer_conexoes(quantidade: int) -> None:
+    """
+    Abre até `quantidade` conexões com a API em segundo plano (GET /models, sem custo
+    de tokens), para que reranking e geração não paguem o handshake TCP/TLS. Conexões
+    ociosas há mais de OPENAI_KEEPALIVE_SEGUNDOS expiram; falhas são ignoradas.
+    """
+    def abrir():
+        try:
+            clientes_openai.sem_retentativas(provedores.cliente("geracao")).with_options(timeout=5.0).models.list()
+        except Exception:
+            pass
+
+    for _ in range(quantidade):
+        executor_aquecimento.submit(abrir)
 
 # =========================
 # 9. PIPELINE RAG
 # =========================
 
-def responder_pergunta(pergunta: str, collection) -> tuple[str, List[Dict]]:
-    console.print(f"[dim]🔍 Buscando por: '{pergunta[:50]}...'[/dim]")
-    
-    # Gera embedding da pergunta
-    pergunta_embedding = gerar_embedding_unico(pergunta)
-    console.print(f"[dim]📐 Embedding gerado: {len(pergunta_embedding)} dimensões[/dim]")
-
-    # Recuperação
-    resultados = collection.query(
-        query_embeddings=[pergunta_embedding],
-        n_results=8,
-        include=["documents", "metadatas", "distances"]
-    )
+RESPOSTA_SEM_CONTEXTO = "Não encontrei informações relevantes nos documentos."
 
-    console.print(f"[dim]📦 Resultados da query: {resultados}[/dim]")
-    
-    if not resultados.get("documents") or not resultados["documents"][0]:
-        console.print("[yellow]⚠️[/yellow] Nenhum documento recuperado do banco vetorial")
-        return "Não encontrei informações relevantes nos documentos.", []
+@telemetria.medido("busca_lexica")
+def busca_lexica(pergunta: str) -> List[tuple]:
+    return indice_lexico.buscar(pergunta, 2 * RERANK_CANDIDATOS)
 
-    documentos_recuperados = []
-    for i, doc_text in enumerate(resultados["documents"][0]):
-        if doc_text and doc_text.strip():
-            documentos_recuperados.append({
-                "page_content": doc_text,
+@telemetria.medido("busca_lexica")
+def busca_lexica_lote(perguntas: List[str]) -> List[List[tuple]]:
+    return indice_lexico.buscar_varios(perguntas, 2 * RERANK_CANDIDATOS)
+
+def busca_vetorial(pergunta: str, pergunta_embedding: List[float], collection) -> Dict:
+    return busca_vetorial_lote([pergunta], [pergunta_embedding], collection)[0]
+
+def mesclar_resultados(roteado: Dict, global_: Dict, extras: int, limite: int) -> Dict:
+    """
+    Resultado da partição somado aos `extras` melhores trechos globais que não
+    estão nela, em ordem de distância e cortado em `limite` (mesmo formato de
+    uma consulta com um único embedding).
+    """
+    linhas = list(zip(*(roteado[chave][0] for chave in ("ids", "documents", "metadatas", "distances"))))
+    vistos = {linha[0] for linha in linhas}
+    fora = [
+        linha for linha in zip(*(global_[chave][0] for chave in ("ids", "documents", "metadatas", "distances")))
+        if linha[0] not in vistos
+    ][:extras]
+    # sorted é estável: em empates, os trechos da partição vêm primeiro
+    linhas = sorted(linhas + fora, key=lambda linha: linha[3])[:limite]
+    ids_finais = {linha[0] for linha in linhas}
+    entraram = sum(1 for linha in fora if linha[0] in ids_finais)
+    if entraram:
+        console.print(f"[dim]🧭 {entraram} trecho(s) de fora da categoria entre os candidatos[/dim]")
+    return {
+        chave: [[linha[posicao] for linha in linhas]]
+        for posicao, chave in enumerate(("ids", "documents", "metadatas", "distances"))
+    }
+
+@telemetria.medido("busca_vetorial")
+def busca_vetorial_lote(perguntas: List[str], embeddings: List[List[float]], collection) -> List[Dict]:
+    """
+    Busca vetorial de várias perguntas com uma consulta por categoria roteada
+    (categoria da pergunta + "geral"). Uma consulta global, só com as perguntas
+    que precisam dela, atende as sem categoria e completa as roteadas com
+    confiança abaixo de ROTEAMENTO_CONFIANCA_EXCLUSIVA ou cuja partição não
+    preencheu os candidatos (ver mesclar_resultados).
+    Cada item do retorno tem o formato de uma consulta com um único embedding.
+    """
+    n_results = 2 * RERANK_CANDIDATOS if BUSCA_HIBRIDA else RERANK_CANDIDATOS
+    include = ["documents", "metadatas", "distances"]
+
+    por_categoria: Dict[Optional[str], List[int]] = {}
+    confiancas: Dict[int, float] = {}
+    for i, pergunta in enumerate(perguntas):
+        categoria, confianca = rotear_pergunta(pergunta, ROTEAMENTO_CONFIANCA) if ROTEAMENTO else (None, 0.0)
+        if categoria:
+            console.print(f"[dim]🧭 Categoria da pergunta: {categoria} (confiança {confianca:.0%})[/dim]")
+        por_categoria.setdefault(categoria, []).append(i)
+        confiancas[i] = confianca
+
+    resultados: List[Optional[Dict]] = [None] * len(perguntas)
+    roteados: Dict[int, Dict] = {}
+    # Perguntas que dependem da consulta global: as sem categoria e as roteadas a completar
+    globais = por_categoria.pop(None, [])
+
+    for categoria, indices in por_categoria.items():
+        consulta = collection.query(
+            query_embeddings=[embeddings[i] for i in indices],
+            n_results=n_results,
+            where={"categoria": {"$in": [categoria, CATEGORIA_PADRAO]}},
+            include=include
+        )
+        for posicao, i in enumerate(indices):
+            roteado = {chave: [consulta[chave][posicao]] for chave in ["ids", *include]}
+            encontrados = len(roteado["ids"][0])
+            if encontrados >= n_results and confiancas[i] >= ROTEAMENTO_CONFIANCA_EXCLUSIVA:
+                resultados[i] = roteado
+                continue
+            if encontrados < n_results:
+                console.print(f"[dim]🧭 Só {encontrados} trecho(s) em '{categoria}'; completando com o corpus inteiro[/dim]")
+            roteados[i] = roteado
+            globais.append(i)
+
+    if globais:
+        globais.sort()
+        consulta = collection.query(
+            query_embeddings=[embeddings[i] for i in globais],
+            n_results=n_results,
+            include=include
+        )
+        for posicao, i in enumerate(globais):
+            global_ = {chave: [consulta[chave][posicao]] for chave in ["ids", *include]}
+            if i in roteados:
+                # Partição incompleta: os globais preenchem as vagas que faltam
+                extras = max(ROTEAMENTO_GLOBAIS, n_results - len(roteados[i]["ids"][0]))
+                resultados[i] = mesclar_resultados(roteados[i], global_, extras, n_results)
+            else:
+                resultados[i] = global_
+
+    return resultados
+
+@telemetria.medido("fusao_candidatos")
+def combinar_candidatos(resultados: Dict, resultados_lexicos: List[tuple], collection) -> List[Dict]:
+    """
+    Funde o ranking vetorial com o do BM25 (quando a busca híbrida está ligada)
+    e devolve até RERANK_CANDIDATOS documentos com texto, na ordem da fusão.
+    """
+    distancias = resultados.get("distances", [[]])[0] if resultados.get("distances") else []
+    if distancias:
+        console.print(f"[dim]📦 Busca vetorial: {len(distancias)} resultados (distância {min(distancias):.3f}–{max(distancias):.3f})[/dim]")
+
+    documentos_por_id = {}
+    if resultados.get("ids") and resultados["ids"][0]:
+        for i, id_chunk in enumerate(resultados["ids"][0]):
+            documentos_por_id[id_chunk] = {
+                "page_content": resultados["documents"][0][i],
                 "metadata": resultados["metadatas"][0][i] if resultados.get("metadatas") and resultados["metadatas"][0] else {}
-            })
+            }
+    ranking_denso = list(documentos_por_id)
+    ranking_lexico = [id_chunk for id_chunk, _ in resultados_lexicos]
+
+    if BUSCA_HIBRIDA:
+        console.print(f"[dim]🔤 BM25: {len(ranking_lexico)} candidatos ({len(set(ranking_lexico) - set(ranking_denso))} fora da busca vetorial)[/dim]")
+        ids_candidatos = fundir_rrf([ranking_denso, ranking_lexico], k=RRF_K)[:RERANK_CANDIDATOS]
+
+        # Trechos encontrados só pelo BM25 vêm do banco pelo id
+        faltantes = [id_chunk for id_chunk in ids_candidatos if id_chunk not in documentos_por_id]
+        if faltantes:
+            extras = collection.get(ids=faltantes, include=["documents", "metadatas"])
+            for id_chunk, texto, metadata in zip(extras["ids"], extras["documents"], extras["metadatas"]):
+                documentos_por_id[id_chunk] = {"page_content": texto, "metadata": metadata or {}}
+    else:
+        ids_candidatos = ranking_denso
+
+    documentos_recuperados = []
+    for id_chunk in ids_candidatos:
+        documento = documentos_por_id.get(id_chunk)
+        if documento and documento["page_content"] and documento["page_content"].strip():
+            documentos_recuperados.append(documento)
 
     console.print(f"[dim]📄 Documentos recuperados: {len(documentos_recuperados)}[/dim]")
-    
+    return documentos_recuperados
+
+@telemetria.medido("recuperar_contexto")
+def recuperar_contexto(pergunta: str, collection) -> tuple[Optional[str], List[Dict], Optional[List[float]]]:
+    """
+    Etapas anteriores à geração: cache, embedding, busca e reranking.
+    Retorna (resposta_pronta, contexto_final, pergunta_embedding); resposta_pronta
+    só é preenchida quando não há nada a gerar (acerto no cache ou nenhum documento).
+    """
+    console.print(f"[dim]🔍 Buscando por: '{pergunta[:50]}...'[/dim]")
+
+    # Pergunta idêntica já respondida: nem o embedding é necessário
+    em_cache = cache_respostas.buscar(pergunta)
+    if em_cache:
+        console.print("[dim]⚡ Resposta obtida do cache (pergunta idêntica)[/dim]")
+        return em_cache[0], em_cache[1], None
+
+    if PIPELINE_SOBREPOSTO:
+        # Uma conexão por avaliação simultânea do reranking e uma para a geração
+        aquecer_conexoes(min(RERANK_CANDIDATOS, RERANK_MAX_CONCORRENCIA) + 1 if RERANK_MODE == "concorrente" else 1)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # A busca léxica não depende do embedding: roda enquanto ele é gerado e a busca vetorial acontece
+        futuro_lexico = executor.submit(busca_lexica, pergunta) if BUSCA_HIBRIDA else None
+
+        # Gera embedding da pergunta
+        pergunta_embedding = gerar_embedding_unico(pergunta)
+        console.print(f"[dim]📐 Embedding gerado: {len(pergunta_embedding)} dimensões[/dim]")
+
+        em_cache = cache_respostas.buscar(pergunta, pergunta_embedding)
+        if em_cache:
+            console.print("[dim]⚡ Resposta obtida do cache (pergunta semelhante)[/dim]")
+            return em_cache[0], em_cache[1], pergunta_embedding
+
+        # Recuperação
+        resultados = busca_vetorial(pergunta, pergunta_embedding, collection)
+        resultados_lexicos = futuro_lexico.result() if futuro_lexico else []
+
+    documentos_recuperados = combinar_candidatos(resultados, resultados_lexicos, collection)
+
     if not documentos_recuperados:
-        return "Não encontrei informações relevantes nos documentos.", []
+        console.print("[yellow]⚠️[/yellow] Nenhum documento recuperado do banco vetorial")
+        return RESPOSTA_SEM_CONTEXTO, [], pergunta_embedding
 
-    # Reranking
+    # Reranking (cliente do provedor de reranking, com timeout menor que o da geração)
     documentos_rerankeados = rerank_documentos(
         pergunta,
         documentos_recuperados,
-        client
+        provedores.cliente("rerank")
     )
 
-    contexto_final = documentos_rerankeados[:4]
-    
-    console.print(f"[dim]🎯 Contexto final: {len(contexto_final)} documentos[/dim]")
+    return None, selecionar_contexto(documentos_rerankeados), pergunta_embedding
 
+def selecionar_contexto(documentos_rerankeados: List[Dict]) -> List[Dict]:
+    contexto_final, tokens = montar_contexto(
+        documentos_rerankeados,
+        contar_tokens_llm,
+        CONTEXTO_MAX_TOKENS,
+        CONTEXTO_MAX_BLOCOS
+    )
+    console.print(
+        f"[dim]🎯 Contexto final: {len(contexto_final)} blocos de {len(documentos_rerankeados)} documentos "
+        f"({tokens}/{CONTEXTO_MAX_TOKENS} tokens)[/dim]"
+    )
+    return contexto_final
+
+def serializar_fontes(contexto: List[Dict]) -> List[Dict]:
+    # Fontes em formato JSON (serviço HTTP e modo em lote)
+    return [
+        {
+            "documento": doc.get("metadata", {}).get("documento", "desconhecido"),
+            "pagina": doc.get("metadata", {}).get("pagina"),
+            "categoria": doc.get("metadata", {}).get("categoria", "geral"),
+            "trecho": doc["page_content"][:200]
+        }
+        for doc in contexto
+    ]
+
+def montar_prompt_final(pergunta: str, contexto_final: List[Dict]) -> str:
     contexto_texto = "\n\n".join(
         [doc["page_content"] for doc in contexto_final]
     )
 
-    prompt_final = f"""
+    return f"""
 Você é um agente de RH corporativo.
 Responda APENAS com base nas políticas internas abaixo.
 
@@ -373,16 +982,61 @@ Pergunta:
 {pergunta}
 """
 
-    response = client.chat.completions.create(
-        model=LLM_MODEL,
-        messages=[{"role": "user", "content": prompt_final}],
-        temperature=0
-    )
+@telemetria.medido("responder_pergunta")
+def responder_pergunta(pergunta: str, collection) -> tuple[str, List[Dict]]:
+    resposta, contexto_final, pergunta_embedding = recuperar_contexto(pergunta, collection)
+    if resposta is not None:
+        return resposta, contexto_final
+
+    with telemetria.trecho("geracao"):
+        response = provedores.cliente("geracao").chat.completions.create(
+            model=provedores.modelo("geracao"),
+            messages=[{"role": "user", "content": montar_prompt_final(pergunta, contexto_final)}],
+            temperature=0
+        )
+        telemetria.registrar_uso("geracao", provedores.modelo("geracao"), response.usage)
 
     resposta = response.choices[0].message.content
 
+    cache_respostas.guardar(pergunta, pergunta_embedding, resposta, contexto_final)
+
     return resposta, contexto_final
 
+def responder_pergunta_stream(pergunta: str, collection) -> Iterator[tuple[str, Any]]:
+    """
+    Versão em streaming de responder_pergunta.
+    Gera eventos ("token", texto) à medida que o LLM responde e,
+    ao final, um único evento ("fontes", contexto_final).
+    """
+    resposta, contexto_final, pergunta_embedding = recuperar_contexto(pergunta, collection)
+    if resposta is not None:
+        yield "token", resposta
+        yield "fontes", contexto_final
+        return
+
+    inicio_geracao = time.perf_counter()
+    stream = provedores.cliente("geracao").chat.completions.create(
+        model=provedores.modelo("geracao"),
+        messages=[{"role": "user", "content": montar_prompt_final(pergunta, contexto_final)}],
+        temperature=0,
+        stream=True,
+        # Com a telemetria ligada, o último evento do stream traz a contagem de tokens
+        **({"stream_options": {"include_usage": True}} if telemetria.ativa() else {})
+    )
+
+    partes = []
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            partes.append(chunk.choices[0].delta.content)
+            yield "token", chunk.choices[0].delta.content
+        if getattr(chunk, "usage", None):
+            telemetria.registrar_uso("geracao", provedores.modelo("geracao"), chunk.usage)
+    telemetria.registrar_duracao("geracao", time.perf_counter() - inicio_geracao)
+
+    cache_respostas.guardar(pergunta, pergunta_embedding, "".join(partes), contexto_final)
+
+    yield "fontes", contexto_final
+
 # =========================
 # 10. INTERFACE
 # =========================
@@ -393,13 +1047,16 @@ def limpar_tela():
 def imprimir_cabecalho():
     console.print(Panel.fit(
         "[bold blue]🤖 AGENTE DE RH — POLÍTICAS INTERNAS[/bold blue]\n"
-        "[dim]RAG + Reranking com ChromaDB Nativo[/dim]",
+        "[dim]RAG + Reranking com ChromaDB Nativo[/dim]"
+        + (f"\n[dim]{provedores.descrever()}[/dim]" if set(provedores.PROVEDORES.values()) != {"openai"} else ""),
         border_style="blue",
         padding=(1, 2)
     ))
     console.print("\nDigite sua pergunta ou '[bold]sair[/bold]' para encerrar.\n")
 
 def imprimir_fontes(fontes: List[Dict]):
+    from rich.syntax import Syntax
+
     console.print(Panel(
         "[bold]📚 FONTES UTILIZADAS[/bold]",
         border_style="yellow",
@@ -420,6 +1077,55 @@ def imprimir_fontes(fontes: List[Dict]):
         )
         console.print(syntax)
 
+def imprimir_estatisticas_cache():
+    respostas = cache_respostas.estatisticas()
+    embeddings = cache_embeddings.estatisticas()
+    console.print(
+        f"\n[dim]⚡ Cache de respostas: {respostas['acertos_exatos']} exatos, "
+        f"{respostas['acertos_semanticos']} semelhantes, {respostas['faltas']} faltas "
+        f"({respostas['taxa_acerto']:.0%}) | Cache de embeddings: {embeddings['acertos']} acertos, "
+        f"{embeddings['faltas']} faltas ({embeddings['taxa_acerto']:.0%})[/dim]"
+    )
+    if telemetria.ativa():
+        uso = telemetria.resumo()
+        console.print(
+            f"[dim]💲 OpenAI: {uso['chamadas']} chamadas, {uso['tokens']} tokens, "
+            f"custo estimado US$ {uso['custo_usd']:.4f}[/dim]"
+        )
+
+def preparar_em_segundo_plano(lista_documentos: List[str]):
+    """
+    Abre o índice (abrir_indice_em_dia) e carrega o SDK da API, os tokenizers e o
+    Markdown do Rich enquanto a CLI já espera a primeira pergunta.
+    """
+    collection = abrir_indice_em_dia(lista_documentos)
+    try:
+        provedores.cliente("geracao")
+        provedores.cliente("rerank")
+        contar_tokens_llm("")
+        contar_tokens_embedding("")
+        painel_resposta("")
+    except Exception:
+        # Só antecipa o trabalho da primeira pergunta: uma falha aqui reaparece nela
+        pass
+    return collection
+
+def aguardar_indice(abertura, lista_documentos: List[str]) -> "chromadb.Collection":
+    # Coleção aberta em segundo plano; se ela precisar de (re)indexação, indexa agora
+    if not abertura.done():
+        with console.status("[bold green]Abrindo índice...", spinner="dots"):
+            abertura.exception()
+    collection = abertura.result()
+    if collection is None:
+        collection = inicializar_vectorstore(lista_documentos)
+    return collection
+
+def erro_critico(e: Exception):
+    console.print(Panel(f"[bold red]ERRO CRÍTICO:[/bold red] {e}", border_style="red"))
+    import traceback
+    console.print(f"[dim]{traceback.format_exc()}[/dim]")
+    sys.exit(1)
+
 def main():
     limpar_tela()
     imprimir_cabecalho()
@@ -430,13 +1136,17 @@ def main():
         "documentos/codigo_conduta.pdf"
     ]
     
+    # Documentos em dia: a coleção abre em segundo plano e a pergunta aparece na hora;
+    # com algo a indexar, a indexação (e seu progresso) vem antes da primeira pergunta
+    collection, abertura = None, None
     try:
-        collection = inicializar_vectorstore(caminhos_documentos)
+        if manifesto_em_dia(caminhos_documentos) is not None:
+            avisar_ausentes(caminhos_documentos)
+            abertura = executor_aquecimento.submit(preparar_em_segundo_plano, caminhos_documentos)
+        else:
+            collection = inicializar_vectorstore(caminhos_documentos)
     except Exception as e:
-        console.print(Panel(f"[bold red]ERRO CRÍTICO:[/bold red] {e}", border_style="red"))
-        import traceback
-        console.print(f"[dim]{traceback.format_exc()}[/dim]")
-        sys.exit(1)
+        erro_critico(e)
 
     console.print("\n[bold green]✅ Sistema pronto para consultas.[/bold green]\n")
 
@@ -445,28 +1155,32 @@ def main():
             pergunta = console.input("[bold green]👤 Você:[/bold green] ").strip()
 
             if pergunta.lower() in ["sair", "exit", "quit"]:
+                imprimir_estatisticas_cache()
                 console.print("\n[bold blue]👋 Encerrando agente de RH. Até logo![/bold blue]")
                 break
             
             if not pergunta:
                 continue
 
-            with console.status("[bold green]Consultando políticas internas...", spinner="dots"):
+            if collection is None:
                 try:
-                    resposta, fontes = responder_pergunta(pergunta, collection)
+                    collection = aguardar_indice(abertura, caminhos_documentos)
                 except Exception as e:
-                    console.print(f"\n[bold red]❌ Erro ao processar a pergunta:[/bold red] {e}")
-                    import traceback
-                    console.print(f"[dim]{traceback.format_exc()}[/dim]")
-                    continue
-
-            console.print()
-            console.print(Panel(
-                Markdown(resposta, code_theme="monokai"),
-                title="[bold blue]🤖 Agente[/bold blue]",
-                border_style="blue",
-                padding=(1, 2)
-            ))
+                    erro_critico(e)
+
+            try:
+                if STREAMING:
+                    fontes = exibir_resposta_stream(console, responder_pergunta_stream(pergunta, collection))
+                else:
+                    with console.status("[bold green]Consultando políticas internas...", spinner="dots"):
+                        resposta, fontes = responder_pergunta(pergunta, collection)
+                    console.print()
+                    console.print(painel_resposta(resposta))
+            except Exception as e:
+                console.print(f"\n[bold red]❌ Erro ao processar a pergunta:[/bold red] {e}")
+                import traceback
+                console.print(f"[dim]{traceback.format_exc()}[/dim]")
+                continue
             
             if fontes:
                 imprimir_fontes(fontes)
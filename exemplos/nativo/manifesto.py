@@ -0,0 +1,128 @@
+# ============================================
+# MANIFESTO DE INDEXAÇÃO INCREMENTAL
+# Controle de hashes por arquivo e por chunk
+# ============================================
+
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+ARQUIVO_MANIFESTO = "manifesto.json"
+# Versão 2: ids de chunk incluem página e posição na página
+VERSAO_MANIFESTO = 2
+
+# =========================
+# 1. HASHES
+# =========================
+
+def hash_texto(texto: str) -> str:
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+def hash_arquivo(caminho: str, tamanho_bloco: int = 1024 * 1024) -> str:
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+# =========================
+# 2. LEITURA E GRAVAÇÃO
+# =========================
+
+def novo_manifesto(assinatura: Dict) -> Dict:
+    return {
+        "versao": VERSAO_MANIFESTO,
+        "assinatura": assinatura,
+        "arquivos": {}
+    }
+
+def carregar_manifesto(diretorio: str, assinatura: Dict) -> Tuple[Dict, bool]:
+    """
+    Lê o manifesto salvo no diretório do banco.
+    Retorna (manifesto, valido). Um manifesto ausente, corrompido ou gerado
+    com outra assinatura (modelo de embeddings, parâmetros de chunking)
+    é considerado inválido e exige reindexação completa.
+    """
+    caminho = os.path.join(diretorio, ARQUIVO_MANIFESTO)
+    if not os.path.exists(caminho):
+        return novo_manifesto(assinatura), False
+
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            manifesto = json.load(f)
+    except (OSError, ValueError):
+        return novo_manifesto(assinatura), False
+
+    if manifesto.get("versao") != VERSAO_MANIFESTO or manifesto.get("assinatura") != assinatura:
+        return novo_manifesto(assinatura), False
+
+    return manifesto, True
+
+def salvar_manifesto(diretorio: str, manifesto: Dict) -> None:
+    # Grava em arquivo temporário e substitui para nunca deixar um manifesto pela metade
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, ARQUIVO_MANIFESTO)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+def versao_corpus(manifesto: Dict) -> str:
+    # Muda sempre que algum arquivo indexado, ou a configuração do índice, muda
+    partes = [json.dumps(manifesto["assinatura"], sort_keys=True)]
+    partes += [f"{caminho}:{registro['sha256']}" for caminho, registro in sorted(manifesto["arquivos"].items())]
+    return hash_texto("\n".join(partes))
+
+def total_chunks(manifesto: Dict) -> int:
+    return sum(len(registro["chunks"]) for registro in manifesto["arquivos"].values())
+
+# =========================
+# 3. DETECÇÃO DE MUDANÇAS
+# =========================
+
+def verificar_arquivo(caminho: str, registro: Optional[Dict]) -> Tuple[bool, Dict]:
+    """
+    Compara um arquivo com seu registro no manifesto.
+    Caminho rápido: mtime e tamanho iguais dispensam a leitura do arquivo.
+    Caso contrário, o hash do conteúdo confirma se houve alteração real.
+    Retorna (inalterado, estado_atual).
+    """
+    stat = os.stat(caminho)
+    estado = {"mtime": stat.st_mtime_ns, "tamanho": stat.st_size}
+
+    if registro and registro["mtime"] == estado["mtime"] and registro["tamanho"] == estado["tamanho"]:
+        estado["sha256"] = registro["sha256"]
+        return True, estado
+
+    estado["sha256"] = hash_arquivo(caminho)
+    inalterado = bool(registro) and registro["sha256"] == estado["sha256"]
+    return inalterado, estado
+
+def classificar_arquivos(caminhos: List[str], manifesto: Dict) -> Tuple[List[str], Dict[str, Dict], List[str]]:
+    """
+    Separa os arquivos em inalterados, alterados (novos ou editados) e removidos.
+    Alterados vêm acompanhados do estado atual (mtime, tamanho, sha256).
+    Arquivos inalterados cujo mtime mudou têm o registro atualizado no próprio manifesto.
+    """
+    registros = manifesto["arquivos"]
+    inalterados = []
+    alterados = {}
+
+    for caminho in caminhos:
+        if not os.path.exists(caminho):
+            continue
+
+        registro = registros.get(caminho)
+        inalterado, estado = verificar_arquivo(caminho, registro)
+
+        if inalterado:
+            registro.update(estado)
+            inalterados.append(caminho)
+        else:
+            alterados[caminho] = estado
+
+    existentes = set(inalterados) | set(alterados)
+    removidos = [caminho for caminho in registros if caminho not in existentes]
+
+    return inalterados, alterados, removidos
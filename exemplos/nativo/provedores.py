@@ -0,0 +1,358 @@
+# ============================================
+# PROVEDORES DE MODELOS
+# Embeddings, reranking e geração pela OpenAI, por um servidor local no
+# formato da API da OpenAI (llama.cpp, vLLM, Ollama) ou, para embeddings,
+# por um modelo executado no próprio processo, em CPU
+# ============================================
+
+import os
+import time
+import threading
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+import clientes_openai
+import telemetria
+from agendador_embeddings import AgendadorEmbeddings
+
+# Só para as anotações: o SDK é importado por clientes_openai ao criar o primeiro cliente
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+PROVEDORES_EMBEDDINGS = ("openai", "compativel", "local")
+PROVEDORES_LLM = ("openai", "compativel")
+
+# Papéis de cada provedor; também são as etapas de timeout de clientes_openai
+PAPEIS = ("embeddings", "rerank", "geracao")
+
+# Modelo usado quando a variável de ambiente não é definida
+# (no "compativel", vazio = primeiro modelo listado pelo servidor em /models)
+MODELOS_PADRAO = {
+    "embeddings": {
+        "openai": "text-embedding-3-small",
+        "compativel": "",
+        "local": "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    },
+    "geracao": {"openai": "gpt-4o-mini", "compativel": ""}
+}
+
+# Limites de uma requisição de embeddings: a API da OpenAI aceita lotes grandes;
+# servidores locais costumam ter poucos slots e contexto curto
+# "dimensoes": se o provedor aceita o parâmetro dimensions (vetores menores); muitos
+# servidores compatíveis respondem 400 a ele
+LIMITES_EMBEDDINGS = {
+    "openai": {"max_itens_lote": 2048, "max_tokens_texto": 8191, "dimensoes": True},
+    "compativel": {
+        "max_itens_lote": int(os.getenv("COMPATIVEL_MAX_ITENS_LOTE", "32")),
+        "max_tokens_texto": int(os.getenv("COMPATIVEL_MAX_TOKENS_TEXTO", "512")),
+        "max_em_voo": int(os.getenv("COMPATIVEL_MAX_EM_VOO", "2")),
+        "dimensoes": os.getenv("COMPATIVEL_ACEITA_DIMENSOES", "0") == "1"
+    }
+}
+
+# =========================
+# 1. CONFIGURAÇÃO
+# =========================
+
+# Lidas na importação, antes do load_dotenv das interfaces
+load_dotenv()
+
+# Mensagens de configuração inválida, exibidas por cada interface: os avisos são
+# corrigidos com um valor padrão; os erros encerram a interface antes de qualquer chamada
+avisos: List[str] = []
+erros: List[str] = []
+
+def _ler_provedor(variavel: str, validos: Tuple[str, ...], padrao: str) -> str:
+    valor = os.getenv(variavel, padrao).strip().lower()
+    if valor not in validos:
+        avisos.append(f"{variavel} '{valor}' inválido. Usando '{padrao}'.")
+        return padrao
+    return valor
+
+PROVEDOR_EMBEDDINGS = _ler_provedor("PROVEDOR_EMBEDDINGS", PROVEDORES_EMBEDDINGS, "openai")
+PROVEDOR_LLM = _ler_provedor("PROVEDOR_LLM", PROVEDORES_LLM, "openai")
+PROVEDOR_RERANK = _ler_provedor("PROVEDOR_RERANK", PROVEDORES_LLM, PROVEDOR_LLM)
+
+PROVEDORES = {"embeddings": PROVEDOR_EMBEDDINGS, "rerank": PROVEDOR_RERANK, "geracao": PROVEDOR_LLM}
+
+# Servidor compatível (ex.: llama.cpp em :8080, Ollama em :11434/v1); vLLM serve um modelo
+# por processo, então os embeddings podem vir de outro endereço
+COMPATIVEL_BASE_URL = os.getenv("COMPATIVEL_BASE_URL", "http://localhost:8080/v1")
+COMPATIVEL_EMBEDDINGS_BASE_URL = os.getenv("COMPATIVEL_EMBEDDINGS_BASE_URL", COMPATIVEL_BASE_URL)
+# Servidores locais costumam ignorar a chave, mas o SDK exige uma
+COMPATIVEL_API_KEY = os.getenv("COMPATIVEL_API_KEY", "local")
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", MODELOS_PADRAO["embeddings"][PROVEDOR_EMBEDDINGS])
+EMBEDDING_DIMENSOES = int(os.getenv("EMBEDDING_DIMENSOES", "0"))
+if EMBEDDING_DIMENSOES and not (
+    LIMITES_EMBEDDINGS.get(PROVEDOR_EMBEDDINGS, {}).get("dimensoes")
+    and (PROVEDOR_EMBEDDINGS != "openai" or EMBEDDING_MODEL.startswith("text-embedding-3"))
+):
+    # Enviado assim mesmo, o parâmetro seria recusado (400) em todas as requisições
+    erros.append(
+        f"EMBEDDING_DIMENSOES={EMBEDDING_DIMENSOES} não é aceito pelo provedor de embeddings "
+        f"'{PROVEDOR_EMBEDDINGS}' (na OpenAI, só pelos modelos text-embedding-3; num servidor "
+        "compatível que aceite o parâmetro dimensions, defina COMPATIVEL_ACEITA_DIMENSOES=1). "
+        "Remova a variável para usar as dimensões do modelo."
+    )
+
+LLM_MODEL = os.getenv("LLM_MODEL", MODELOS_PADRAO["geracao"][PROVEDOR_LLM])
+# Com o mesmo provedor, o reranking usa o modelo da geração
+RERANK_MODEL = os.getenv("RERANK_MODEL", LLM_MODEL if PROVEDOR_RERANK == PROVEDOR_LLM else MODELOS_PADRAO["geracao"][PROVEDOR_RERANK])
+
+# Modelo local: textos por chamada ao encode e threads de CPU (0 = padrão do PyTorch)
+LOCAL_TAMANHO_LOTE = int(os.getenv("LOCAL_TAMANHO_LOTE", "32"))
+LOCAL_THREADS = int(os.getenv("LOCAL_THREADS", "0"))
+
+def chave_necessaria() -> bool:
+    """Se algum papel usa a API da OpenAI (e portanto OPENAI_API_KEY)."""
+    return "openai" in PROVEDORES.values()
+
+def descrever() -> str:
+    # Ex.: "embeddings: local · rerank: compativel · geração: compativel"
+    return " · ".join(
+        f"{'geração' if papel == 'geracao' else papel}: {PROVEDORES[papel]}" for papel in PAPEIS
+    )
+
+# =========================
+# 2. PROVEDORES NO FORMATO DA API DA OPENAI
+# =========================
+
+def _conexao(papel: str) -> Tuple[Optional[str], Optional[str]]:
+    # (base_url, api_key); None, None = OPENAI_BASE_URL / OPENAI_API_KEY do ambiente
+    if PROVEDORES[papel] != "compativel":
+        return None, None
+    base_url = COMPATIVEL_EMBEDDINGS_BASE_URL if papel == "embeddings" else COMPATIVEL_BASE_URL
+    return base_url, COMPATIVEL_API_KEY
+
+def cliente(papel: str) -> "OpenAI":
+    """Cliente síncrono do provedor do papel, com o timeout da etapa (pool compartilhado)."""
+    return clientes_openai.com_timeout(clientes_openai.cliente(*_conexao(papel)), papel)
+
+def criar_clientes_async(max_conexoes: int) -> Dict[str, "AsyncOpenAI"]:
+    """
+    Clientes assíncronos por papel (exceto embeddings locais). Papéis no mesmo
+    servidor dividem o pool; fechar qualquer um deles fecha o pool inteiro.
+    """
+    pools: Dict[tuple, "AsyncOpenAI"] = {}
+    clientes = {}
+    for papel in PAPEIS:
+        if PROVEDORES[papel] == "local":
+            continue
+        conexao = _conexao(papel)
+        if conexao not in pools:
+            pools[conexao] = clientes_openai.criar_cliente_async(max_conexoes, *conexao)
+        clientes[papel] = clientes_openai.com_timeout(pools[conexao], papel)
+    return clientes
+
+_modelos_negociados: Dict[str, str] = {}
+
+def modelo(papel: str) -> str:
+    """
+    Modelo do papel. Num servidor compatível sem modelo configurado, usa o
+    primeiro listado em /models (de embeddings ou não, conforme o papel).
+    """
+    configurado = {"embeddings": EMBEDDING_MODEL, "rerank": RERANK_MODEL, "geracao": LLM_MODEL}[papel]
+    if configurado or PROVEDORES[papel] != "compativel":
+        return configurado
+    if papel not in _modelos_negociados:
+        # Negociado no primeiro uso, não na importação: com o servidor fora do ar, --help e a
+        # medição de inicialização continuam funcionando. GET direto no pool compartilhado,
+        # sem carregar o SDK da OpenAI
+        import httpx
+
+        base_url, api_key = _conexao(papel)
+        try:
+            resposta = clientes_openai.http_client().get(
+                base_url.rstrip("/") + "/models", headers={"Authorization": f"Bearer {api_key}"}
+            )
+            resposta.raise_for_status()
+        except httpx.HTTPError as erro:
+            raise RuntimeError(
+                f"Não foi possível listar os modelos de {base_url} ({erro}); defina o modelo de {papel} no .env"
+            ) from erro
+        ids = [item["id"] for item in resposta.json().get("data", [])]
+        de_embeddings = [i for i in ids if "embed" in i.lower()]
+        candidatos = (de_embeddings or ids) if papel == "embeddings" else ([i for i in ids if i not in de_embeddings] or ids)
+        if not candidatos:
+            raise RuntimeError(f"O servidor {_conexao(papel)[0]} não listou nenhum modelo; defina o modelo de {papel}")
+        _modelos_negociados[papel] = candidatos[0]
+    return _modelos_negociados[papel]
+
+# =========================
+# 3. EMBEDDINGS NO PRÓPRIO PROCESSO
+# =========================
+
+class EmbeddingsLocais:
+    """
+    Modelo de sentence embeddings (sentence-transformers) executado em CPU, sem
+    rede nem chave de API, com a mesma interface do AgendadorEmbeddings
+    (embeddar, embeddar_em_lotes, contar_tokens, estatisticas).
+    - O modelo é carregado na primeira chamada, não na importação.
+    - Tokens são contados com o tokenizer do próprio modelo; max_tokens_texto é o
+      comprimento máximo de sequência do modelo (o excedente seria truncado).
+    - Com um cache (CacheEmbeddings), só os textos ausentes passam pelo modelo.
+    """
+
+    def __init__(self, modelo: str, cache=None, tamanho_lote: int = 32, threads: int = 0):
+        self.modelo = modelo
+        self.identificador = f"local:{modelo}"
+        self.cache = cache
+        self.tamanho_lote = tamanho_lote
+        self.threads = threads
+        self.textos = 0
+        self.segundos = 0.0
+        self._modelo = None
+        self._lock = threading.Lock()
+
+    def _carregar(self):
+        with self._lock:
+            if self._modelo is None:
+                # Importado só aqui: o PyTorch leva segundos para carregar
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    raise RuntimeError(
+                        "PROVEDOR_EMBEDDINGS=local requer o pacote sentence-transformers "
+                        "(uv pip install sentence-transformers)"
+                    )
+                if self.threads:
+                    import torch
+                    torch.set_num_threads(self.threads)
+                self._modelo = SentenceTransformer(self.modelo, device="cpu")
+            return self._modelo
+
+    @property
+    def max_tokens_texto(self) -> int:
+        # Descontados os tokens especiais de início e fim
+        return self._carregar().max_seq_length - 2
+
+    def dimensoes(self) -> int:
+        return self._carregar().get_sentence_embedding_dimension()
+
+    def contar_tokens(self, texto: str) -> int:
+        return len(self._carregar().tokenizer(texto, add_special_tokens=False)["input_ids"])
+
+    def _codificar(self, textos: List[str]) -> List[List[float]]:
+        with telemetria.trecho("embeddings_locais", textos=len(textos)):
+            inicio = time.perf_counter()
+            vetores = self._carregar().encode(
+                textos,
+                batch_size=self.tamanho_lote,
+                normalize_embeddings=True,
+                convert_to_numpy=True
+            )
+            self.segundos += time.perf_counter() - inicio
+        self.textos += len(textos)
+        return vetores.tolist()
+
+    def _processar_lote(self, textos: List[str]) -> List[Optional[List[float]]]:
+        if self.cache is None:
+            return self._codificar(textos)
+
+        embeddings = self.cache.obter_varios(self.identificador, textos)
+        faltantes = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if faltantes:
+            novos = self._codificar([textos[i] for i in faltantes])
+            self.cache.guardar_varios(self.identificador, [textos[i] for i in faltantes], novos)
+            for i, embedding in zip(faltantes, novos):
+                embeddings[i] = embedding
+        return embeddings
+
+    def embeddar_em_lotes(
+        self,
+        itens: Iterable[Any],
+        texto: Callable[[Any], str] = lambda item: item
+    ) -> Iterator[Tuple[List[Any], List[Optional[List[float]]]]]:
+        """Gera (lote, embeddings) na ordem de entrada, consumindo os itens sob demanda."""
+        iterador = iter(itens)
+        while True:
+            # Lotes de alguns encodes: a indexação em streaming avança sem esperar o corpus inteiro
+            lote = list(islice(iterador, self.tamanho_lote * 8))
+            if not lote:
+                return
+            yield lote, self._processar_lote([texto(item) for item in lote])
+
+    def embeddar(self, textos: List[str]) -> List[Optional[List[float]]]:
+        embeddings = []
+        for _, vetores in self.embeddar_em_lotes(textos):
+            embeddings.extend(vetores)
+        return embeddings
+
+    def estatisticas(self) -> dict:
+        return {"textos": self.textos, "segundos": round(self.segundos, 3)}
+
+# =========================
+# 4. FÁBRICAS
+# =========================
+
+def criar_embeddador(cache=None, max_tokens_lote: int = 16000, max_em_voo: int = 4):
+    """
+    Gerador de embeddings do PROVEDOR_EMBEDDINGS: EmbeddingsLocais ou
+    AgendadorEmbeddings com os limites de lote negociados para o provedor.
+    """
+    if PROVEDOR_EMBEDDINGS == "local":
+        return EmbeddingsLocais(EMBEDDING_MODEL, cache=cache, tamanho_lote=LOCAL_TAMANHO_LOTE, threads=LOCAL_THREADS)
+
+    limites = LIMITES_EMBEDDINGS[PROVEDOR_EMBEDDINGS]
+    # Modelo e identificador resolvidos no primeiro uso (num servidor compatível, via /models)
+    return AgendadorEmbeddings(
+        lambda: cliente("embeddings"),
+        lambda: modelo("embeddings"),
+        cache=cache,
+        max_tokens_lote=max_tokens_lote,
+        max_itens_lote=limites["max_itens_lote"],
+        max_em_voo=min(max_em_voo, limites.get("max_em_voo", max_em_voo)),
+        dimensoes=EMBEDDING_DIMENSOES,
+        max_tokens_texto=limites["max_tokens_texto"],
+        identificador=identificador_embeddings
+    )
+
+def identificador_embeddings() -> str:
+    """
+    Identifica os vetores no cache e na assinatura dos índices: trocar de modelo,
+    de dimensões ou de provedor (o mesmo nome em outro servidor não é o mesmo
+    modelo) reconstrói o índice. Com o padrão da OpenAI, é só o nome do modelo.
+    """
+    if PROVEDOR_EMBEDDINGS == "openai":
+        return f"{EMBEDDING_MODEL}@{EMBEDDING_DIMENSOES}" if EMBEDDING_DIMENSOES else EMBEDDING_MODEL
+    identificador = f"{PROVEDOR_EMBEDDINGS}:{modelo('embeddings')}"
+    return f"{identificador}@{EMBEDDING_DIMENSOES}" if EMBEDDING_DIMENSOES else identificador
+
+def sufixo_indice() -> str:
+    """Sufixo do diretório do índice das CLIs LangChain: vazio com o modelo padrão da OpenAI."""
+    identificador = identificador_embeddings()
+    if identificador == MODELOS_PADRAO["embeddings"]["openai"]:
+        return ""
+    return "_" + "".join(c if c.isalnum() else "_" for c in identificador)
+
+# =========================
+# 5. LANGCHAIN
+# =========================
+
+def embeddings_langchain():
+    """Embeddings do provedor configurado no formato do LangChain (importado só aqui)."""
+    if PROVEDOR_EMBEDDINGS == "local":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={"normalize_embeddings": True, "batch_size": LOCAL_TAMANHO_LOTE}
+        )
+
+    from langchain_openai import OpenAIEmbeddings
+    base_url, api_key = _conexao("embeddings")
+    extras = {"dimensions": EMBEDDING_DIMENSOES} if EMBEDDING_DIMENSOES else {}
+    if base_url:
+        # Sem tiktoken: servidores locais esperam texto, não ids de tokens da OpenAI
+        extras.update(base_url=base_url, api_key=api_key, check_embedding_ctx_length=False)
+    return OpenAIEmbeddings(model=modelo("embeddings"), **clientes_openai.parametros_langchain("embeddings"), **extras)
+
+def llm_langchain(papel: str = "geracao"):
+    """ChatOpenAI do provedor do papel ("geracao" ou "rerank"), sobre o pool compartilhado."""
+    from langchain_openai import ChatOpenAI
+    base_url, api_key = _conexao(papel)
+    extras = {"base_url": base_url, "api_key": api_key} if base_url else {}
+    return ChatOpenAI(model=modelo(papel), temperature=0, **clientes_openai.parametros_langchain(papel), **extras)
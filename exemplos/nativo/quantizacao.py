@@ -0,0 +1,191 @@
+# ============================================
+# QUANTIZAÇÃO DE VETORES
+# Códigos compactos para o primeiro estágio da busca: int8 por dimensão
+# ou quantização por produto (PQ), com truncamento Matryoshka opcional
+# ============================================
+
+from typing import Dict, Optional
+
+import numpy as np
+
+MODOS_QUANTIZACAO = ("float32", "int8", "pq")
+
+# Centróides por subespaço no PQ: cada subvetor vira um código uint8
+CENTROIDES_PQ = 256
+
+# Dimensões por subvetor no PQ quando o número de subvetores não é informado
+DIMENSOES_POR_SUBVETOR = 8
+
+# Amostra e iterações do k-means de treino do PQ
+AMOSTRA_TREINO = 8192
+ITERACOES_KMEANS = 10
+
+# Linhas convertidas para float32 por vez durante a pontuação (limita a memória temporária)
+BLOCO_LINHAS = 4096
+
+def truncar(vetores: np.ndarray, dimensoes: int) -> np.ndarray:
+    """
+    Primeiras `dimensoes` coordenadas de cada vetor, renormalizadas. Nos modelos
+    treinados com Matryoshka (text-embedding-3-*) o prefixo é um embedding válido
+    de menor dimensão; 0 mantém o vetor inteiro.
+    """
+    vetores = np.asarray(vetores, dtype=np.float32)
+    if not dimensoes or dimensoes >= vetores.shape[1]:
+        return vetores
+    prefixo = vetores[:, :dimensoes]
+    normas = np.linalg.norm(prefixo, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return prefixo / normas
+
+def _kmeans(pontos: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    # Lloyd simples por produto interno com as normas (distância euclidiana ao quadrado)
+    centroides = pontos[rng.choice(len(pontos), k, replace=False)].copy()
+    for _ in range(ITERACOES_KMEANS):
+        distancias = (centroides ** 2).sum(axis=1) - 2 * pontos @ centroides.T
+        rotulos = distancias.argmin(axis=1)
+        # bincount por dimensão: bem mais rápido que np.add.at com poucas dimensões por subvetor
+        somas = np.stack([np.bincount(rotulos, weights=pontos[:, d], minlength=k) for d in range(pontos.shape[1])], axis=1)
+        contagem = np.bincount(rotulos, minlength=k)
+        ocupados = contagem > 0
+        centroides[ocupados] = somas[ocupados] / contagem[ocupados, None]
+        # Centróide sem pontos recomeça em um ponto qualquer da amostra
+        vazios = np.flatnonzero(~ocupados)
+        if len(vazios):
+            centroides[vazios] = pontos[rng.choice(len(pontos), len(vazios))]
+    return centroides
+
+class Quantizador:
+    """
+    Compressão dos vetores normalizados para a busca aproximada:
+    - "float32": sem quantização (útil com truncamento);
+    - "int8": um byte por dimensão, com mínimo e escala próprios de cada dimensão;
+    - "pq": o vetor é dividido em `subvetores` partes e cada parte vira o índice
+      (um byte) do centróide mais próximo entre CENTROIDES_PQ aprendidos por k-means.
+    Com `dimensoes`, os vetores são antes truncados (Matryoshka) e renormalizados.
+    As notas de pontuar() aproximam o produto interno; a ordem final fica com o
+    re-score em precisão total, feito pela coleção.
+    """
+
+    def __init__(self, modo: str = "int8", dimensoes: int = 0, subvetores: int = 0):
+        if modo not in MODOS_QUANTIZACAO:
+            raise ValueError(f"Quantização desconhecida: {modo}")
+        self.modo = modo
+        self.dimensoes = dimensoes
+        self.subvetores = subvetores
+        # Configuração pedida (subvetores=0: padrão), para saber se códigos salvos ainda servem
+        self._parametros = {"modo": modo, "dimensoes": dimensoes, "subvetores": subvetores}
+        self.treinado = False
+        self.minimo: Optional[np.ndarray] = None
+        self.escala: Optional[np.ndarray] = None
+        self.centroides: Optional[np.ndarray] = None
+
+    def parametros(self) -> Dict:
+        return dict(self._parametros)
+
+    def bytes_por_vetor(self, dimensoes_originais: int) -> int:
+        dimensoes = min(self.dimensoes or dimensoes_originais, dimensoes_originais)
+        if self.modo == "float32":
+            return 4 * dimensoes
+        if self.modo == "int8":
+            return dimensoes
+        return self.subvetores or self._subvetores_padrao(dimensoes)
+
+    @staticmethod
+    def _subvetores_padrao(dimensoes: int) -> int:
+        subvetores = max(1, dimensoes // DIMENSOES_POR_SUBVETOR)
+        while dimensoes % subvetores:
+            subvetores -= 1
+        return subvetores
+
+    # ---------- treino e codificação ----------
+
+    def treinar(self, vetores: np.ndarray) -> None:
+        vetores = truncar(vetores, self.dimensoes)
+        if self.modo == "int8":
+            self.minimo = vetores.min(axis=0)
+            self.escala = (vetores.max(axis=0) - self.minimo) / 255
+            self.escala[self.escala == 0] = 1.0
+        elif self.modo == "pq":
+            if not self.subvetores:
+                self.subvetores = self._subvetores_padrao(vetores.shape[1])
+            if vetores.shape[1] % self.subvetores:
+                raise ValueError(f"{vetores.shape[1]} dimensões não se dividem em {self.subvetores} subvetores")
+
+            rng = np.random.default_rng(0)
+            amostra = vetores[rng.choice(len(vetores), min(len(vetores), AMOSTRA_TREINO), replace=False)]
+            k = min(CENTROIDES_PQ, len(amostra))
+            largura = vetores.shape[1] // self.subvetores
+            self.centroides = np.stack([
+                _kmeans(np.ascontiguousarray(amostra[:, j * largura:(j + 1) * largura]), k, rng)
+                for j in range(self.subvetores)
+            ])
+        self.treinado = True
+
+    def codificar(self, vetores: np.ndarray) -> np.ndarray:
+        """Códigos das linhas de `vetores` (não vazio): float32, int8 ou uint8 (um por subvetor)."""
+        codigos = []
+        for inicio in range(0, len(vetores), BLOCO_LINHAS):
+            bloco = truncar(vetores[inicio:inicio + BLOCO_LINHAS], self.dimensoes)
+            if self.modo == "float32":
+                codigos.append(bloco)
+            elif self.modo == "int8":
+                # Valores fora da faixa do treino (vetores inseridos depois) ficam nos extremos
+                niveis = np.rint((bloco - self.minimo) / self.escala) - 128
+                codigos.append(np.clip(niveis, -128, 127).astype(np.int8))
+            else:
+                largura = bloco.shape[1] // self.subvetores
+                partes = bloco.reshape(len(bloco), self.subvetores, largura)
+                codigos.append(np.stack([
+                    ((self.centroides[j] ** 2).sum(axis=1) - 2 * partes[:, j] @ self.centroides[j].T).argmin(axis=1)
+                    for j in range(self.subvetores)
+                ], axis=1).astype(np.uint8))
+        return np.concatenate(codigos)
+
+    # ---------- pontuação ----------
+
+    def preparar_consultas(self, consultas: np.ndarray) -> np.ndarray:
+        return truncar(consultas, self.dimensoes)
+
+    def pontuar(self, consultas: np.ndarray, codigos: np.ndarray) -> np.ndarray:
+        """Produto interno aproximado (consultas x linhas) entre consultas já preparadas e os códigos."""
+        if self.modo == "pq":
+            largura = consultas.shape[1] // self.subvetores
+            # Tabela por consulta: produto de cada subvetor da consulta com cada centróide
+            tabelas = np.einsum("qjd,jkd->qjk", consultas.reshape(len(consultas), self.subvetores, largura), self.centroides)
+            deslocamentos = np.arange(self.subvetores) * tabelas.shape[2]
+            planas = tabelas.reshape(len(consultas), -1)
+        elif self.modo == "int8":
+            # q·x ≈ (q * escala)·(código + 128) + q·mínimo
+            pesos = (consultas * self.escala).T
+            constante = consultas @ self.minimo + 128 * (consultas * self.escala).sum(axis=1)
+
+        notas = np.empty((len(consultas), len(codigos)), dtype=np.float32)
+        for inicio in range(0, len(codigos), BLOCO_LINHAS):
+            bloco = codigos[inicio:inicio + BLOCO_LINHAS]
+            fim = inicio + len(bloco)
+            if self.modo == "float32":
+                notas[:, inicio:fim] = consultas @ bloco.T
+            elif self.modo == "int8":
+                notas[:, inicio:fim] = (bloco.astype(np.float32) @ pesos).T + constante[:, None]
+            else:
+                posicoes = bloco.astype(np.intp) + deslocamentos
+                for q, plana in enumerate(planas):
+                    notas[q, inicio:fim] = plana[posicoes].sum(axis=1)
+        return notas
+
+    # ---------- persistência ----------
+
+    def exportar(self) -> Dict[str, np.ndarray]:
+        if self.modo == "int8":
+            return {"minimo": self.minimo, "escala": self.escala}
+        if self.modo == "pq":
+            return {"centroides": self.centroides}
+        return {}
+
+    def importar(self, dados: Dict[str, np.ndarray]) -> None:
+        if self.modo == "int8":
+            self.minimo, self.escala = dados["minimo"], dados["escala"]
+        elif self.modo == "pq":
+            self.centroides = dados["centroides"]
+            self.subvetores = self.centroides.shape[0]
+        self.treinado = True
@@ -0,0 +1,290 @@
+# ============================================
+# RERANKING
+# LLM concorrente (pool de threads), LLM listwise (prompt único)
+# e léxico local (BM25, sem chamada ao LLM)
+# ============================================
+
+import re
+import asyncio
+import json
+import time
+import statistics
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Callable, Optional
+
+import telemetria
+from lexico import pontuar_bm25
+
+MODOS_RERANK = ("concorrente", "listwise", "lexico")
+
+# Nota dos documentos cujo reranking foi cancelado pela parada antecipada: ficam
+# depois de todos os avaliados, na ordem da recuperação
+NOTA_NAO_AVALIADO = -1.0
+
+# Janela das últimas medições de latência por modo, para p50/p95
+LATENCIAS: Dict[str, deque] = {modo: deque(maxlen=500) for modo in MODOS_RERANK}
+
+# =========================
+# 1. PROMPTS
+# =========================
+
+def montar_prompt_pontual(pergunta: str, texto: str) -> str:
+    return f"""
+Você é um especialista em políticas internas de RH.
+
+Pergunta do usuário:
+{pergunta}
+
+Trecho do documento:
+{texto[:500]}
+
+Avalie a relevância desse trecho para responder a pergunta.
+Responda apenas com um número de 0 a 10.
+"""
+
+def montar_prompt_listwise(pergunta: str, textos: List[str]) -> str:
+    trechos = "\n\n".join(
+        f"[{i}]\n{texto[:500]}" for i, texto in enumerate(textos, start=1)
+    )
+    return f"""
+Você é um especialista em políticas internas de RH.
+
+Pergunta do usuário:
+{pergunta}
+
+Trechos dos documentos:
+{trechos}
+
+Avalie a relevância de cada trecho para responder a pergunta, com uma nota de 0 a 10.
+Responda apenas com uma lista JSON contendo exatamente {len(textos)} notas, na mesma ordem dos trechos.
+Exemplo: [7, 0, 10]
+"""
+
+# =========================
+# 2. PARSE DAS NOTAS
+# =========================
+
+def extrair_score(texto: str) -> float:
+    try:
+        return float(texto.strip())
+    except (TypeError, ValueError):
+        return 0
+
+def extrair_scores_listwise(texto: str, quantidade: int) -> List[float]:
+    """
+    Lê a lista JSON de notas devolvida pelo LLM.
+    Notas ausentes ou inválidas valem 0, como no modo pontual.
+    """
+    encontrado = re.search(r"\[.*?\]", texto or "", re.DOTALL)
+    try:
+        valores = json.loads(encontrado.group(0)) if encontrado else []
+    except ValueError:
+        valores = []
+
+    scores = []
+    for i in range(quantidade):
+        try:
+            scores.append(float(valores[i]))
+        except (IndexError, TypeError, ValueError):
+            scores.append(0)
+    return scores
+
+# =========================
+# 3. CHAMADAS AO LLM
+# =========================
+
+def pontuar_documento(pergunta: str, doc: Dict, client, modelo: str) -> float:
+    response = client.chat.completions.create(
+        model=modelo,
+        messages=[{"role": "user", "content": montar_prompt_pontual(pergunta, doc["page_content"])}],
+        temperature=0,
+        max_tokens=5
+    )
+    telemetria.registrar_uso("rerank", modelo, response.usage)
+    return extrair_score(response.choices[0].message.content)
+
+def pontuar_concorrente(
+    pergunta: str,
+    documentos: List[Dict],
+    client,
+    modelo: str,
+    max_concorrencia: int = 8,
+    ao_concluir: Optional[Callable[[int, float, Optional[Exception]], None]] = None,
+    parar_quando: Optional[Callable[[List[Optional[float]]], bool]] = None,
+    **_
+) -> List[float]:
+    """
+    Dispara uma chamada de avaliação por documento em um pool de threads
+    limitado a max_concorrencia requisições simultâneas.
+    Falhas individuais valem 0 e são repassadas a ao_concluir.
+    parar_quando recebe as notas parciais (None = pendente) a cada resposta;
+    se devolver True, as chamadas restantes são abandonadas e os documentos
+    correspondentes recebem NOTA_NAO_AVALIADO.
+    """
+    scores: List[Optional[float]] = [None] * len(documentos)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_concorrencia, len(documentos))))
+    try:
+        futuros = {
+            executor.submit(pontuar_documento, pergunta, doc, client, modelo): i
+            for i, doc in enumerate(documentos)
+        }
+        for futuro in as_completed(futuros):
+            i = futuros[futuro]
+            erro = futuro.exception()
+            scores[i] = futuro.result() if erro is None else 0.0
+            if ao_concluir:
+                ao_concluir(i, scores[i], erro)
+            if parar_quando and parar_quando(scores):
+                break
+    finally:
+        # Na parada antecipada, chamadas ainda na fila são canceladas e as que já estão
+        # em voo terminam em segundo plano, sem que a resposta espere por elas
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [NOTA_NAO_AVALIADO if score is None else score for score in scores]
+
+def pontuar_listwise(pergunta: str, documentos: List[Dict], client, modelo: str, **_) -> List[float]:
+    textos = [doc["page_content"] for doc in documentos]
+    response = client.chat.completions.create(
+        model=modelo,
+        messages=[{"role": "user", "content": montar_prompt_listwise(pergunta, textos)}],
+        temperature=0,
+        max_tokens=6 * len(textos) + 10
+    )
+    telemetria.registrar_uso("rerank", modelo, response.usage)
+    return extrair_scores_listwise(response.choices[0].message.content, len(textos))
+
+# =========================
+# 4. BACKEND LÉXICO LOCAL
+# =========================
+
+def pontuar_lexico(pergunta: str, documentos: List[Dict], client=None, modelo: str = None, **_) -> List[float]:
+    return pontuar_bm25(pergunta, [doc["page_content"] for doc in documentos]).tolist()
+
+# =========================
+# 5. INTERFACE PLUGÁVEL
+# =========================
+
+# Todo backend recebe (pergunta, documentos, client, modelo, **opcoes) e devolve
+# uma nota por documento, na mesma ordem; notas maiores significam mais relevância
+RERANKERS: Dict[str, Callable[..., List[float]]] = {
+    "concorrente": pontuar_concorrente,
+    "listwise": pontuar_listwise,
+    "lexico": pontuar_lexico
+}
+
+def pontuar(modo: str, pergunta: str, documentos: List[Dict], client=None, modelo: str = None, **opcoes) -> List[float]:
+    if modo not in RERANKERS:
+        raise ValueError(f"Modo de reranking desconhecido: {modo} (opções: {', '.join(RERANKERS)})")
+    return RERANKERS[modo](pergunta, documentos, client, modelo, **opcoes)
+
+# =========================
+# 6. ORDENAÇÃO E LATÊNCIA
+# =========================
+
+def topo_definido(quantidade: int, nota_suficiente: float) -> Callable[[List[Optional[float]]], bool]:
+    """
+    Critério de parada antecipada do modo concorrente: `quantidade` documentos
+    já têm nota >= nota_suficiente. Com a nota máxima (10), o topo é o mesmo do
+    reranking completo, a menos de empates com documentos ainda pendentes.
+    """
+    def definido(scores: List[Optional[float]]) -> bool:
+        return sum(1 for score in scores if score is not None and score >= nota_suficiente) >= quantidade
+    return definido
+
+def ordenar_por_score(documentos: List[Dict], scores: List[float]) -> List[Dict]:
+    # sorted é estável: empates mantêm a ordem da recuperação vetorial
+    documentos_ordenados = sorted(
+        zip(scores, documentos),
+        key=lambda x: x[0],
+        reverse=True
+    )
+    return [doc for _, doc in documentos_ordenados]
+
+def registrar_latencia(modo: str, inicio: float) -> float:
+    duracao = time.perf_counter() - inicio
+    LATENCIAS[modo].append(duracao)
+    return duracao
+
+def percentis(valores, pontos=(50, 95)) -> Dict[str, float]:
+    valores = list(valores)
+    if not valores:
+        return {}
+    if len(valores) == 1:
+        return {f"p{p}": valores[0] for p in pontos}
+    cortes = statistics.quantiles(valores, n=100, method="inclusive")
+    return {f"p{p}": cortes[p - 1] for p in pontos}
+
+def resumo_latencias() -> Dict[str, Dict[str, float]]:
+    return {modo: percentis(LATENCIAS[modo]) for modo in MODOS_RERANK if LATENCIAS[modo]}
+
+# =========================
+# 7. VERSÃO ASSÍNCRONA (SERVIÇO HTTP)
+# =========================
+
+async def pontuar_documento_async(pergunta: str, doc: Dict, client_async, modelo: str) -> float:
+    response = await client_async.chat.completions.create(
+        model=modelo,
+        messages=[{"role": "user", "content": montar_prompt_pontual(pergunta, doc["page_content"])}],
+        temperature=0,
+        max_tokens=5
+    )
+    telemetria.registrar_uso("rerank", modelo, response.usage)
+    return extrair_score(response.choices[0].message.content)
+
+async def pontuar_async(
+    modo: str,
+    pergunta: str,
+    documentos: List[Dict],
+    client_async=None,
+    modelo: str = None,
+    max_concorrencia: int = 8,
+    parar_quando: Optional[Callable[[List[Optional[float]]], bool]] = None
+) -> List[float]:
+    """
+    Mesmos modos de pontuar(), com um AsyncOpenAI: no modo concorrente as
+    chamadas rodam como corrotinas, limitadas por um semáforo, sem threads.
+    Com parar_quando (como em pontuar_concorrente), as corrotinas restantes
+    são canceladas assim que o critério for atendido.
+    """
+    if modo == "lexico":
+        return pontuar_lexico(pergunta, documentos)
+
+    if modo == "listwise":
+        textos = [doc["page_content"] for doc in documentos]
+        response = await client_async.chat.completions.create(
+            model=modelo,
+            messages=[{"role": "user", "content": montar_prompt_listwise(pergunta, textos)}],
+            temperature=0,
+            max_tokens=6 * len(textos) + 10
+        )
+        telemetria.registrar_uso("rerank", modelo, response.usage)
+        return extrair_scores_listwise(response.choices[0].message.content, len(textos))
+
+    if modo != "concorrente":
+        raise ValueError(f"Modo de reranking desconhecido: {modo} (opções: {', '.join(RERANKERS)})")
+
+    semaforo = asyncio.Semaphore(max(1, max_concorrencia))
+
+    async def pontuar_limitado(doc: Dict) -> float:
+        async with semaforo:
+            return await pontuar_documento_async(pergunta, doc, client_async, modelo)
+
+    tarefas = {asyncio.ensure_future(pontuar_limitado(doc)): i for i, doc in enumerate(documentos)}
+    scores: List[Optional[float]] = [None] * len(documentos)
+    pendentes = set(tarefas)
+    try:
+        while pendentes:
+            prontas, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+            for tarefa in prontas:
+                # Falhas individuais valem 0, como na versão com threads
+                scores[tarefas[tarefa]] = 0.0 if tarefa.cancelled() or tarefa.exception() else tarefa.result()
+            if parar_quando and parar_quando(scores):
+                break
+    finally:
+        for tarefa in pendentes:
+            tarefa.cancel()
+
+    return [NOTA_NAO_AVALIADO if score is None else score for score in scores]
@@ -0,0 +1,49 @@
+# ============================================
+# ROTEAMENTO POR CATEGORIA
+# Mesmas regras de palavras-chave na indexação (categoria do chunk)
+# e na consulta (filtro where da busca vetorial)
+# ============================================
+
+from typing import Dict, Optional, Tuple
+
+# Ordem importa: na indexação vale a primeira categoria cujas palavras aparecem no texto
+REGRAS_CATEGORIAS = (
+    ("ferias", ("férias", "ferias")),
+    ("home_office", ("home office", "remoto", "teletrabalho")),
+    ("conduta", ("conduta", "ética", "etica"))
+)
+
+CATEGORIA_PADRAO = "geral"
+
+def categorizar_texto(texto: str) -> str:
+    texto = texto.lower()
+    for categoria, palavras in REGRAS_CATEGORIAS:
+        if any(palavra in texto for palavra in palavras):
+            return categoria
+    return CATEGORIA_PADRAO
+
+def pontuar_categorias(texto: str) -> Dict[str, int]:
+    """Quantas vezes as palavras de cada categoria aparecem no texto."""
+    texto = texto.lower()
+    return {
+        categoria: sum(texto.count(palavra) for palavra in palavras)
+        for categoria, palavras in REGRAS_CATEGORIAS
+    }
+
+def rotear_pergunta(pergunta: str, limiar_confianca: float = 0.6) -> Tuple[Optional[str], float]:
+    """
+    Escolhe a categoria da pergunta e a confiança (fração das palavras-chave
+    encontradas que pertencem a ela). Sem palavras-chave, com empate ou abaixo
+    do limiar, retorna (None, confiança): a busca deve cobrir o corpus inteiro.
+    """
+    pontos = pontuar_categorias(pergunta)
+    total = sum(pontos.values())
+    if not total:
+        return None, 0.0
+
+    ordenadas = sorted(pontos.items(), key=lambda item: -item[1])
+    categoria, melhor = ordenadas[0]
+    confianca = melhor / total
+    if confianca < limiar_confianca or (len(ordenadas) > 1 and ordenadas[1][1] == melhor):
+        return None, confianca
+    return categoria, confianca
@@ -0,0 +1,291 @@
+# ============================================
+# AGENTE DE RH COM RAG + RERANKING (SERVIÇO HTTP)
+# FastAPI + AsyncOpenAI sobre o mesmo pipeline da CLI nativa
+# ============================================
+
+# Uso (a partir da raiz do projeto):
+#   uv run exemplos/nativo/servico_http.py
+#   curl -s localhost:8000/perguntar -H 'Content-Type: application/json' -d '{"pergunta": "Quantos dias de férias?"}'
+#   curl -N localhost:8000/perguntar -H 'Content-Type: application/json' -d '{"pergunta": "...", "stream": true}'
+
+# =========================
+# 1. IMPORTAÇÕES
+# =========================
+
+import os
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+# Índice, caches e configurações são os da CLI: o serviço é outra interface para o mesmo pipeline
+import main_cli2_nativo as rag
+import telemetria
+import provedores
+from rerank import pontuar_async, ordenar_por_score, registrar_latencia
+
+# =========================
+# 2. CONFIGURAÇÕES
+# =========================
+
+SERVICO_HOST = os.getenv("SERVICO_HOST", "127.0.0.1")
+SERVICO_PORTA = int(os.getenv("SERVICO_PORTA", "8000"))
+
+# Perguntas em processamento ao mesmo tempo; as demais esperam até SERVICO_ESPERA_MAXIMA
+# segundos por uma vaga e então recebem 503
+SERVICO_MAX_REQUISICOES = int(os.getenv("SERVICO_MAX_REQUISICOES", "32"))
+SERVICO_ESPERA_MAXIMA = float(os.getenv("SERVICO_ESPERA_MAXIMA", "10"))
+
+# Conexões HTTP mantidas com a API da OpenAI, compartilhadas por todas as requisições
+SERVICO_MAX_CONEXOES = int(os.getenv("SERVICO_MAX_CONEXOES", "64"))
+
+SERVICO_DOCUMENTOS = os.getenv(
+    "SERVICO_DOCUMENTOS",
+    "documentos/politica_ferias.pdf,documentos/politica_home_office.pdf,documentos/codigo_conduta.pdf"
+).split(",")
+
+# Mantém as mensagens de depuração do pipeline no terminal (silenciadas por padrão após a indexação)
+SERVICO_DEBUG = os.getenv("SERVICO_DEBUG", "0") == "1"
+
+# Recursos criados uma vez por processo no lifespan
+estado: Dict = {}
+
+# =========================
+# 3. CICLO DE VIDA
+# =========================
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # Indexação síncrona da CLI, fora do event loop
+    estado["collection"] = await asyncio.to_thread(rag.inicializar_vectorstore, SERVICO_DOCUMENTOS)
+    rag.console.quiet = not SERVICO_DEBUG
+    # Modelos negociados (servidor compatível, via /models) aqui, não na primeira pergunta
+    for papel in ("rerank", "geracao"):
+        await asyncio.to_thread(provedores.modelo, papel)
+
+    # Um cliente por etapa, no servidor do provedor de cada uma (pool, timeouts, retentativas e
+    # disjuntor de clientes_openai); embeddings locais não têm cliente
+    estado["clientes"] = provedores.criar_clientes_async(SERVICO_MAX_CONEXOES)
+    estado["vagas"] = asyncio.Semaphore(SERVICO_MAX_REQUISICOES)
+    try:
+        yield
+    finally:
+        for client in estado["clientes"].values():
+            await client.close()
+        estado.clear()
+
+app = FastAPI(title="Agente de RH", lifespan=ciclo_de_vida)
+
+class Pergunta(BaseModel):
+    pergunta: str
+    stream: bool = False
+
+# =========================
+# 4. PIPELINE ASSÍNCRONO
+# =========================
+
+async def gerar_embedding_async(texto: str) -> List[float]:
+    embeddador = rag.agendador_embeddings
+    if "embeddings" not in estado["clientes"]:
+        # Modelo local: computação em CPU, numa thread
+        return await asyncio.to_thread(rag.gerar_embedding_unico, texto)
+
+    # Mesmo cache da CLI; só a chamada à API é assíncrona
+    embedding = (await asyncio.to_thread(rag.cache_embeddings.obter_varios, embeddador.identificador, [texto]))[0]
+    if embedding is not None:
+        return embedding
+
+    with telemetria.trecho("embedding_pergunta"):
+        response = await estado["clientes"]["embeddings"].embeddings.create(
+            model=embeddador.modelo,
+            input=[texto],
+            **({"dimensions": embeddador.dimensoes} if embeddador.dimensoes else {})
+        )
+        telemetria.registrar_uso("embeddings", embeddador.modelo, response.usage)
+    embedding = response.data[0].embedding
+    await asyncio.to_thread(rag.cache_embeddings.guardar_varios, embeddador.identificador, [texto], [embedding])
+    return embedding
+
+async def recuperar_contexto_async(pergunta: str) -> tuple[Optional[str], List[Dict], Optional[List[float]]]:
+    """Equivalente assíncrono de rag.recuperar_contexto, com o mesmo retorno."""
+    em_cache = rag.cache_respostas.buscar(pergunta)
+    if em_cache:
+        return em_cache[0], em_cache[1], None
+
+    collection = estado["collection"]
+
+    # BM25 roda numa thread enquanto o embedding da pergunta é gerado
+    tarefa_lexica = (
+        asyncio.create_task(asyncio.to_thread(rag.busca_lexica, pergunta))
+        if rag.BUSCA_HIBRIDA else None
+    )
+    try:
+        pergunta_embedding = await gerar_embedding_async(pergunta)
+    except BaseException:
+        if tarefa_lexica:
+            tarefa_lexica.cancel()
+        raise
+
+    # A busca semântica percorre todas as respostas guardadas: fora do event loop
+    em_cache = await asyncio.to_thread(rag.cache_respostas.buscar, pergunta, pergunta_embedding)
+    if em_cache:
+        if tarefa_lexica:
+            tarefa_lexica.cancel()
+        return em_cache[0], em_cache[1], pergunta_embedding
+
+    resultados = await asyncio.to_thread(rag.busca_vetorial, pergunta, pergunta_embedding, collection)
+    resultados_lexicos = await tarefa_lexica if tarefa_lexica else []
+    documentos = await asyncio.to_thread(rag.combinar_candidatos, resultados, resultados_lexicos, collection)
+
+    if not documentos:
+        return rag.RESPOSTA_SEM_CONTEXTO, [], pergunta_embedding
+
+    inicio = time.perf_counter()
+    with telemetria.trecho("rerank", modo=rag.RERANK_MODE):
+        try:
+            scores = await pontuar_async(
+                rag.RERANK_MODE,
+                pergunta,
+                documentos,
+                estado["clientes"]["rerank"],
+                rag.provedores.modelo("rerank"),
+                max_concorrencia=rag.RERANK_MAX_CONCORRENCIA,
+                parar_quando=rag.criterio_parada_rerank()
+            )
+        except Exception as e:
+            rag.console.print(f"[yellow]⚠️[/yellow] Erro no reranking: {e}")
+            scores = [0] * len(documentos)
+    registrar_latencia(rag.RERANK_MODE, inicio)
+
+    return None, rag.selecionar_contexto(ordenar_por_score(documentos, scores)), pergunta_embedding
+
+def evento_sse(tipo: str, dados) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+# =========================
+# 5. ENDPOINTS
+# =========================
+
+async def ocupar_vaga() -> None:
+    try:
+        await asyncio.wait_for(estado["vagas"].acquire(), timeout=SERVICO_ESPERA_MAXIMA)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Serviço ocupado, tente novamente", headers={"Retry-After": "1"})
+
+class StreamingComVaga(StreamingResponse):
+    """
+    StreamingResponse que libera a vaga ao terminar o envio, com ou sem erro.
+    O finally de um gerador só roda se ele chegar a ser iniciado: se o cliente
+    desconectar antes do primeiro evento, a vaga ficaria ocupada para sempre.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            estado["vagas"].release()
+
+@app.get("/saude")
+async def saude():
+    return {
+        "status": "ok",
+        "chunks": estado["collection"].count(),
+        "vector_store": rag.VECTOR_STORE,
+        "provedores": provedores.PROVEDORES
+    }
+
+@app.get("/metricas")
+async def metricas():
+    # Formato de texto do Prometheus; só existe com TELEMETRIA ligada
+    if not telemetria.ativa():
+        raise HTTPException(status_code=404, detail="Telemetria desligada (defina TELEMETRIA=metricas ou otel)")
+    return PlainTextResponse(telemetria.exportar_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/perguntar")
+async def perguntar(corpo: Pergunta):
+    pergunta = corpo.pergunta.strip()
+    if not pergunta:
+        raise HTTPException(status_code=422, detail="Pergunta vazia")
+
+    await ocupar_vaga()
+    if corpo.stream:
+        # A vaga é liberada pela resposta, quando o envio termina ou o cliente desconecta
+        try:
+            return StreamingComVaga(responder_stream(pergunta), media_type="text/event-stream")
+        except BaseException:
+            estado["vagas"].release()
+            raise
+
+    try:
+        inicio = time.perf_counter()
+        resposta, contexto, pergunta_embedding = await recuperar_contexto_async(pergunta)
+        em_cache = resposta is not None
+
+        if resposta is None:
+            with telemetria.trecho("geracao"):
+                response = await estado["clientes"]["geracao"].chat.completions.create(
+                    model=rag.provedores.modelo("geracao"),
+                    messages=[{"role": "user", "content": rag.montar_prompt_final(pergunta, contexto)}],
+                    temperature=0
+                )
+                telemetria.registrar_uso("geracao", rag.provedores.modelo("geracao"), response.usage)
+            resposta = response.choices[0].message.content
+            rag.cache_respostas.guardar(pergunta, pergunta_embedding, resposta, contexto)
+
+        telemetria.registrar_duracao("perguntar", time.perf_counter() - inicio)
+        return {
+            "resposta": resposta,
+            "fontes": rag.serializar_fontes(contexto),
+            "cache": em_cache,
+            "tempo_ms": round((time.perf_counter() - inicio) * 1000, 1)
+        }
+    finally:
+        estado["vagas"].release()
+
+async def responder_stream(pergunta: str) -> AsyncIterator[str]:
+    """Eventos SSE: "token" (texto parcial), "fontes", "fim" ou "erro"."""
+    try:
+        inicio = time.perf_counter()
+        resposta, contexto, pergunta_embedding = await recuperar_contexto_async(pergunta)
+
+        if resposta is not None:
+            yield evento_sse("token", resposta)
+        else:
+            inicio_geracao = time.perf_counter()
+            stream = await estado["clientes"]["geracao"].chat.completions.create(
+                model=rag.provedores.modelo("geracao"),
+                messages=[{"role": "user", "content": rag.montar_prompt_final(pergunta, contexto)}],
+                temperature=0,
+                stream=True,
+                **({"stream_options": {"include_usage": True}} if telemetria.ativa() else {})
+            )
+            partes = []
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    partes.append(chunk.choices[0].delta.content)
+                    yield evento_sse("token", chunk.choices[0].delta.content)
+                if getattr(chunk, "usage", None):
+                    telemetria.registrar_uso("geracao", rag.provedores.modelo("geracao"), chunk.usage)
+            telemetria.registrar_duracao("geracao", time.perf_counter() - inicio_geracao)
+            rag.cache_respostas.guardar(pergunta, pergunta_embedding, "".join(partes), contexto)
+
+        yield evento_sse("fontes", rag.serializar_fontes(contexto))
+        yield evento_sse("fim", {"tempo_ms": round((time.perf_counter() - inicio) * 1000, 1)})
+    except Exception as e:
+        yield evento_sse("erro", {"mensagem": str(e)})
+
+# =========================
+# 6. EXECUÇÃO
+# =========================
+
+def main():
+    uvicorn.run(app, host=SERVICO_HOST, port=SERVICO_PORTA)
+
+if __name__ == "__main__":
+    main()
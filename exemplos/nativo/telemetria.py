@@ -0,0 +1,224 @@
+# ============================================
+# TELEMETRIA DO PIPELINE
+# Duração por etapa, tokens e custo por chamada à OpenAI e taxas de acerto dos caches,
+# exportados como spans OpenTelemetry e/ou texto no formato do Prometheus
+# ============================================
+
+# Modos (variável TELEMETRIA, aplicada por configurar na CLI nativa):
+#   ""/"0"   desligada (padrão): trecho() devolve um contexto vazio e nada é registrado
+#   "metricas" agrega histogramas e contadores em memória (texto Prometheus em exportar_prometheus)
+#   "otel"   métricas + um span OpenTelemetry por etapa (requer opentelemetry-api; com
+#            opentelemetry-sdk e o exportador OTLP instalados, os spans vão para
+#            OTEL_EXPORTER_OTLP_ENDPOINT)
+
+import time
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Tuple
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+MODOS_TELEMETRIA = ("", "0", "metricas", "otel")
+
+# Limites (em segundos) dos buckets do histograma de duração das etapas
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# US$ por milhão de tokens (entrada, saída); modelos ausentes contam tokens sem custo
+PRECOS_POR_MILHAO: Dict[str, Tuple[float, float]] = {
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00)
+}
+
+_CONTEXTO_VAZIO = nullcontext()
+
+# =========================
+# 1. ESTADO
+# =========================
+
+class _Registro:
+    """Métricas agregadas do processo (todas as threads)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # etapa -> [contagem por bucket..., soma, total]
+        self.etapas: Dict[str, list] = {}
+        # (operacao, modelo) -> {"chamadas", "tokens_entrada", "tokens_saida", "custo_usd"}
+        self.chamadas: Dict[Tuple[str, str], Dict[str, float]] = {}
+        # nome -> função que devolve um dicionário de valores numéricos (lida só na exportação)
+        self.fontes: Dict[str, Callable[[], dict]] = {}
+
+_registro = _Registro()
+_modo = ""
+_tracer = None
+
+def configurar(modo: str) -> str:
+    """
+    Liga ou desliga a telemetria. Retorna o modo efetivo; sem o pacote
+    opentelemetry, "otel" cai para "metricas".
+    """
+    global _modo, _tracer
+
+    modo = modo.strip().lower()
+    if modo not in MODOS_TELEMETRIA:
+        raise ValueError(f"TELEMETRIA desconhecida: {modo} (opções: metricas, otel)")
+    _modo = "" if modo == "0" else modo
+    _tracer = None
+
+    if _modo == "otel":
+        if trace is None:
+            _modo = "metricas"
+        else:
+            _configurar_exportador_otlp()
+            _tracer = trace.get_tracer("rag-rh")
+    return _modo
+
+def _configurar_exportador_otlp() -> None:
+    # Só instala um provider se a aplicação ainda não configurou um (ex.: opentelemetry-instrument)
+    try:
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        return
+    if isinstance(trace.get_tracer_provider(), TracerProvider):
+        return
+    provider = TracerProvider()
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+def ativa() -> bool:
+    return bool(_modo)
+
+# =========================
+# 2. REGISTRO
+# =========================
+
+def trecho(etapa: str, **atributos):
+    """
+    Context manager que mede uma etapa do pipeline. Desligada, a telemetria
+    devolve sempre o mesmo contexto vazio: nenhum relógio, lock ou span.
+    """
+    if not _modo:
+        return _CONTEXTO_VAZIO
+    return _medir(etapa, atributos)
+
+def medido(etapa: str):
+    """Decorador equivalente a envolver a função inteira em trecho(etapa)."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if not _modo:
+                return funcao(*args, **kwargs)
+            with _medir(etapa, {}):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+@contextmanager
+def _medir(etapa: str, atributos: dict):
+    span = _tracer.start_as_current_span(etapa, attributes=atributos) if _tracer else _CONTEXTO_VAZIO
+    inicio = time.perf_counter()
+    try:
+        with span:
+            yield
+    finally:
+        registrar_duracao(etapa, time.perf_counter() - inicio)
+
+def registrar_duracao(etapa: str, segundos: float) -> None:
+    if not _modo:
+        return
+    with _registro.lock:
+        contagens = _registro.etapas.setdefault(etapa, [0] * (len(BUCKETS_SEGUNDOS) + 2))
+        for i, limite in enumerate(BUCKETS_SEGUNDOS):
+            if segundos <= limite:
+                contagens[i] += 1
+        contagens[-2] += segundos
+        contagens[-1] += 1
+
+def registrar_uso(operacao: str, modelo: str, usage) -> None:
+    """
+    Tokens e custo de uma chamada à OpenAI (usage do SDK; None quando a
+    resposta não informa, como em streams sem include_usage).
+    """
+    if not _modo:
+        return
+    entrada = getattr(usage, "prompt_tokens", 0) or 0
+    saida = getattr(usage, "completion_tokens", 0) or 0
+    preco_entrada, preco_saida = PRECOS_POR_MILHAO.get(modelo, (0.0, 0.0))
+    custo = (entrada * preco_entrada + saida * preco_saida) / 1_000_000
+
+    with _registro.lock:
+        totais = _registro.chamadas.setdefault(
+            (operacao, modelo),
+            {"chamadas": 0, "tokens_entrada": 0, "tokens_saida": 0, "custo_usd": 0.0}
+        )
+        totais["chamadas"] += 1
+        totais["tokens_entrada"] += entrada
+        totais["tokens_saida"] += saida
+        totais["custo_usd"] += custo
+
+    if _tracer:
+        span = trace.get_current_span()
+        span.set_attribute(f"openai.{operacao}.tokens_entrada", entrada)
+        span.set_attribute(f"openai.{operacao}.tokens_saida", saida)
+        span.set_attribute(f"openai.{operacao}.custo_usd", custo)
+
+def registrar_fonte(nome: str, funcao: Callable[[], dict]) -> None:
+    """Estatísticas lidas só na exportação (ex.: cache.estatisticas): custo zero no caminho da pergunta."""
+    _registro.fontes[nome] = funcao
+
+# =========================
+# 3. EXPORTAÇÃO
+# =========================
+
+def resumo() -> dict:
+    """Totais de chamadas, tokens e custo estimado, para exibição na CLI."""
+    with _registro.lock:
+        valores = list(_registro.chamadas.values())
+    return {
+        "chamadas": sum(v["chamadas"] for v in valores),
+        "tokens": sum(v["tokens_entrada"] + v["tokens_saida"] for v in valores),
+        "custo_usd": sum(v["custo_usd"] for v in valores)
+    }
+
+def exportar_prometheus() -> str:
+    """Métricas no formato de texto do Prometheus (exposition format 0.0.4)."""
+    linhas = [
+        "# HELP rag_etapa_segundos Duração das etapas do pipeline",
+        "# TYPE rag_etapa_segundos histogram"
+    ]
+    with _registro.lock:
+        etapas = {etapa: list(contagens) for etapa, contagens in _registro.etapas.items()}
+        chamadas = {chave: dict(totais) for chave, totais in _registro.chamadas.items()}
+
+    for etapa, contagens in sorted(etapas.items()):
+        for limite, quantidade in zip(BUCKETS_SEGUNDOS, contagens):
+            linhas.append(f'rag_etapa_segundos_bucket{{etapa="{etapa}",le="{limite}"}} {quantidade}')
+        linhas.append(f'rag_etapa_segundos_bucket{{etapa="{etapa}",le="+Inf"}} {contagens[-1]}')
+        linhas.append(f'rag_etapa_segundos_sum{{etapa="{etapa}"}} {contagens[-2]:.6f}')
+        linhas.append(f'rag_etapa_segundos_count{{etapa="{etapa}"}} {contagens[-1]}')
+
+    for metrica, descricao in (
+        ("chamadas", "Chamadas à API da OpenAI"),
+        ("tokens_entrada", "Tokens de entrada enviados à API"),
+        ("tokens_saida", "Tokens gerados pela API"),
+        ("custo_usd", "Custo estimado em dólares")
+    ):
+        linhas.append(f"# HELP rag_openai_{metrica}_total {descricao}")
+        linhas.append(f"# TYPE rag_openai_{metrica}_total counter")
+        for (operacao, modelo), totais in sorted(chamadas.items()):
+            linhas.append(f'rag_openai_{metrica}_total{{operacao="{operacao}",modelo="{modelo}"}} {totais[metrica]:g}')
+
+    for nome, funcao in sorted(_registro.fontes.items()):
+        for chave, valor in funcao().items():
+            if isinstance(valor, (int, float)):
+                linhas.append(f"# TYPE rag_{nome}_{chave} gauge")
+                linhas.append(f"rag_{nome}_{chave} {valor:g}")
+
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,55 @@
+# ============================================
+# RESPOSTA NO TERMINAL
+# Painel da resposta e exibição em streaming, comuns às CLIs
+# nativa e LangChain
+# ============================================
+
+import time
+import itertools
+from typing import Any, Iterator, Tuple
+
+# Live e Markdown no primeiro uso (ver benchmarks/bench_inicializacao.py)
+from rich.console import Console
+from rich.panel import Panel
+
+def painel_resposta(resposta: str) -> Panel:
+    from rich.markdown import Markdown
+
+    return Panel(
+        Markdown(resposta, code_theme="monokai"),
+        title="[bold blue]🤖 Agente[/bold blue]",
+        border_style="blue",
+        padding=(1, 2)
+    )
+
+def exibir_resposta_stream(console: Console, eventos: Iterator[Tuple[str, Any]]) -> Any:
+    """
+    Exibe os eventos ("token", texto) de um responder_pergunta_stream num painel
+    atualizado a cada token e devolve o valor do evento final ("fontes", ...).
+    """
+    from rich.live import Live
+
+    inicio = time.perf_counter()
+
+    # Cache, busca e reranking acontecem até o primeiro token chegar
+    with console.status("[bold green]Consultando políticas internas...", spinner="dots"):
+        primeiro_evento = next(eventos)
+    tempo_primeiro_token = time.perf_counter() - inicio
+
+    partes = []
+    fontes = []
+
+    console.print()
+    with Live(painel_resposta(""), console=console, refresh_per_second=12, vertical_overflow="visible") as live:
+        for tipo, valor in itertools.chain([primeiro_evento], eventos):
+            if tipo == "token":
+                partes.append(valor)
+                live.update(painel_resposta("".join(partes)))
+            else:
+                fontes = valor
+
+    console.print(
+        f"[dim]⏱️  Primeiro token em {tempo_primeiro_token:.2f}s · "
+        f"resposta completa em {time.perf_counter() - inicio:.2f}s[/dim]"
+    )
+    return fontes
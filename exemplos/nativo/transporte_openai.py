@@ -0,0 +1,242 @@
+# ============================================
+# TRANSPORTE HTTP DOS CLIENTES DA API
+# Disjuntor por servidor e retentativas com jitter, sobre o transporte do
+# httpx; importado por clientes_openai só ao criar o primeiro pool
+# ============================================
+
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from clientes_openai import (
+    CABECALHO_SEM_RETENTATIVA,
+    OPENAI_DISJUNTOR_FALHAS,
+    OPENAI_DISJUNTOR_PAUSA,
+    OPENAI_ESPERA_BASE,
+    OPENAI_ESPERA_MAXIMA,
+    OPENAI_MAX_TENTATIVAS,
+    OPENAI_PRAZO_RETENTATIVAS,
+    STATUS_RETENTAVEIS
+)
+
+# =========================
+# 1. DISJUNTOR
+# =========================
+
+class CircuitoAberto(httpx.TransportError):
+    """Chamada recusada sem ir à rede: a API falhou seguidamente há pouco."""
+
+class Disjuntor:
+    """
+    Circuit breaker de um servidor (host:porta), compartilhado pelos clientes do processo:
+    - fechado: as chamadas passam; falhas seguidas são contadas;
+    - aberto: com max_falhas falhas seguidas, as chamadas levantam CircuitoAberto
+      durante `pausa` segundos, em vez de esperar timeouts de uma API fora do ar;
+    - meio aberto: passada a pausa, uma única chamada de teste vai à rede;
+      sucesso fecha o disjuntor, falha reabre por mais `pausa` segundos.
+    max_falhas=0 desliga o disjuntor.
+    """
+
+    def __init__(self, max_falhas: int = 5, pausa: float = 30.0):
+        self.max_falhas = max_falhas
+        self.pausa = pausa
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0
+        self.aberturas = 0
+        self.recusadas = 0
+        self._lock = threading.Lock()
+
+    def estado(self) -> str:
+        with self._lock:
+            if not self.max_falhas or self.falhas_seguidas < self.max_falhas:
+                return "fechado"
+            return "aberto" if time.monotonic() < self.aberto_ate else "meio_aberto"
+
+    def verificar(self) -> None:
+        with self._lock:
+            if not self.max_falhas or self.falhas_seguidas < self.max_falhas:
+                return
+            restante = self.aberto_ate - time.monotonic()
+            if restante > 0:
+                self.recusadas += 1
+                raise CircuitoAberto(
+                    f"API da OpenAI indisponível ({self.falhas_seguidas} falhas seguidas); "
+                    f"nova tentativa em {restante:.0f}s"
+                )
+            # Chamada de teste: as demais continuam recusadas enquanto ela não termina
+            # (se ela sumir, por cancelamento, outra é liberada após a pausa)
+            self.aberto_ate = time.monotonic() + self.pausa
+
+    def registrar_sucesso(self) -> None:
+        with self._lock:
+            self.falhas_seguidas = 0
+
+    def registrar_falha(self) -> None:
+        with self._lock:
+            self.falhas_seguidas += 1
+            if self.max_falhas and self.falhas_seguidas == self.max_falhas:
+                self.aberturas += 1
+            if self.max_falhas and self.falhas_seguidas >= self.max_falhas:
+                self.aberto_ate = time.monotonic() + self.pausa
+
+# Um disjuntor por servidor: um servidor local fora do ar não bloqueia as chamadas à OpenAI
+_disjuntores: Dict[str, Disjuntor] = {}
+_lock_disjuntores = threading.Lock()
+
+def disjuntor_para(url: httpx.URL) -> Disjuntor:
+    chave = f"{url.host}:{url.port or (443 if url.scheme == 'https' else 80)}"
+    with _lock_disjuntores:
+        if chave not in _disjuntores:
+            _disjuntores[chave] = Disjuntor(OPENAI_DISJUNTOR_FALHAS, OPENAI_DISJUNTOR_PAUSA)
+        return _disjuntores[chave]
+
+# =========================
+# 2. TRANSPORTE COM RETENTATIVAS
+# =========================
+
+_contadores = {"requisicoes": 0, "retentativas": 0, "falhas": 0}
+_lock_contadores = threading.Lock()
+
+def _contar(nome: str) -> None:
+    with _lock_contadores:
+        _contadores[nome] += 1
+
+def _espera(tentativa: int, resposta: Optional[httpx.Response]) -> float:
+    if resposta is not None:
+        # Retry-After da API tem prioridade sobre o backoff
+        try:
+            milissegundos = resposta.headers.get("retry-after-ms")
+            if milissegundos is not None:
+                return min(OPENAI_ESPERA_MAXIMA, float(milissegundos) / 1000)
+            segundos = resposta.headers.get("retry-after")
+            if segundos is not None:
+                return min(OPENAI_ESPERA_MAXIMA, float(segundos))
+        except ValueError:
+            pass
+    # Full jitter: clientes que falharam juntos não voltam todos no mesmo instante
+    return random.uniform(0, min(OPENAI_ESPERA_MAXIMA, OPENAI_ESPERA_BASE * (2 ** tentativa)))
+
+def _preparar(request: httpx.Request, max_tentativas: int) -> int:
+    _contar("requisicoes")
+    if request.headers.pop(CABECALHO_SEM_RETENTATIVA, None) is not None:
+        return 1
+    return max(1, max_tentativas)
+
+def _retentavel(erro: httpx.TransportError) -> bool:
+    # Só erros em que a requisição não chegou ao servidor: repetir um POST de chat que
+    # expirou na leitura poderia executá-lo (e cobrá-lo) de novo
+    return isinstance(erro, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+def _falhou(resposta: httpx.Response) -> bool:
+    # 429 é limite de uso, não falha da API: não conta para o disjuntor
+    return resposta.status_code == 408 or resposta.status_code >= 500
+
+class TransporteResiliente(httpx.BaseTransport):
+    """Envolve o transporte do httpx com o disjuntor e as retentativas com jitter."""
+
+    def __init__(self, transporte: httpx.BaseTransport, max_tentativas: int = OPENAI_MAX_TENTATIVAS):
+        self.transporte = transporte
+        self.max_tentativas = max_tentativas
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tentativas = _preparar(request, self.max_tentativas)
+        disjuntor = disjuntor_para(request.url)
+        prazo = time.monotonic() + OPENAI_PRAZO_RETENTATIVAS
+        for tentativa in range(tentativas):
+            disjuntor.verificar()
+            try:
+                resposta = self.transporte.handle_request(request)
+            except httpx.TransportError as erro:
+                disjuntor.registrar_falha()
+                _contar("falhas")
+                espera = _espera(tentativa, None)
+                if not _retentavel(erro) or tentativa == tentativas - 1 or time.monotonic() + espera > prazo:
+                    raise
+                _contar("retentativas")
+                time.sleep(espera)
+                continue
+
+            if _falhou(resposta):
+                disjuntor.registrar_falha()
+                _contar("falhas")
+            else:
+                disjuntor.registrar_sucesso()
+            if resposta.status_code not in STATUS_RETENTAVEIS or tentativa == tentativas - 1:
+                return resposta
+            espera = _espera(tentativa, resposta)
+            if time.monotonic() + espera > prazo:
+                return resposta
+
+            # Lê o corpo para devolver a conexão ao pool antes de esperar
+            resposta.read()
+            resposta.close()
+            _contar("retentativas")
+            time.sleep(espera)
+
+    def close(self) -> None:
+        self.transporte.close()
+
+class TransporteResilienteAsync(httpx.AsyncBaseTransport):
+    """Versão assíncrona de TransporteResiliente, com o mesmo disjuntor."""
+
+    def __init__(self, transporte: httpx.AsyncBaseTransport, max_tentativas: int = OPENAI_MAX_TENTATIVAS):
+        self.transporte = transporte
+        self.max_tentativas = max_tentativas
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tentativas = _preparar(request, self.max_tentativas)
+        disjuntor = disjuntor_para(request.url)
+        prazo = time.monotonic() + OPENAI_PRAZO_RETENTATIVAS
+        for tentativa in range(tentativas):
+            disjuntor.verificar()
+            try:
+                resposta = await self.transporte.handle_async_request(request)
+            except httpx.TransportError as erro:
+                disjuntor.registrar_falha()
+                _contar("falhas")
+                espera = _espera(tentativa, None)
+                if not _retentavel(erro) or tentativa == tentativas - 1 or time.monotonic() + espera > prazo:
+                    raise
+                _contar("retentativas")
+                await asyncio.sleep(espera)
+                continue
+
+            if _falhou(resposta):
+                disjuntor.registrar_falha()
+                _contar("falhas")
+            else:
+                disjuntor.registrar_sucesso()
+            if resposta.status_code not in STATUS_RETENTAVEIS or tentativa == tentativas - 1:
+                return resposta
+            espera = _espera(tentativa, resposta)
+            if time.monotonic() + espera > prazo:
+                return resposta
+
+            await resposta.aread()
+            await resposta.aclose()
+            _contar("retentativas")
+            await asyncio.sleep(espera)
+
+    async def aclose(self) -> None:
+        await self.transporte.aclose()
+
+# =========================
+# 3. ESTATÍSTICAS
+# =========================
+
+def contadores() -> Dict[str, int]:
+    with _lock_contadores:
+        return dict(_contadores)
+
+def estado_disjuntores() -> Dict[str, int]:
+    with _lock_disjuntores:
+        disjuntores = list(_disjuntores.values())
+    return {
+        "disjuntores_abertos": sum(1 for disjuntor in disjuntores if disjuntor.estado() != "fechado"),
+        "disjuntor_aberturas": sum(disjuntor.aberturas for disjuntor in disjuntores),
+        "disjuntor_recusadas": sum(disjuntor.recusadas for disjuntor in disjuntores)
+    }
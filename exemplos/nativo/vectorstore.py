@@ -0,0 +1,616 @@
+# ============================================
+# VECTOR STORES LOCAIS
+# Alternativas em processo ao ChromaDB: matriz NumPy mapeada em memória
+# ou índice FAISS, com metadados em uma tabela colunar compacta
+# ============================================
+
+import os
+import json
+import shutil
+import hashlib
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+from quantizacao import MODOS_QUANTIZACAO, Quantizador
+
+BACKENDS_VECTOR_STORE = ("chroma", "numpy", "faiss")
+
+ARQUIVO_VETORES = "vetores.npy"
+ARQUIVO_TABELA = "tabela.json"
+ARQUIVO_CODIGOS = "colunas.npz"
+ARQUIVO_FAISS = "indice.faiss"
+ARQUIVO_QUANTIZADO = "quantizado.npz"
+
+INCLUDE_PADRAO = ("documents", "metadatas")
+
+# =========================
+# 1. TABELA COLUNAR DE METADADOS
+# =========================
+
+def _chave_valor(valor: Any) -> tuple:
+    # True == 1 em um dict; o tipo entra na chave para não misturar os dois
+    return type(valor).__name__, valor
+
+class TabelaMetadados:
+    """
+    Metadados em colunas com codificação por dicionário: cada coluna guarda
+    um código int32 por linha (-1 = ausente) e a lista de valores distintos.
+    Campos como documento, categoria e página têm poucos valores distintos,
+    então cada linha custa 4 bytes por coluna.
+    """
+
+    def __init__(self):
+        self.codigos: Dict[str, array] = {}
+        self.valores: Dict[str, List[Any]] = {}
+        self._indices: Dict[str, Dict[tuple, int]] = {}
+        self.linhas = 0
+
+    def _codigo(self, campo: str, valor: Any) -> int:
+        if campo not in self.codigos:
+            self.codigos[campo] = array("i", [-1] * self.linhas)
+            self.valores[campo] = []
+            self._indices[campo] = {}
+
+        chave = _chave_valor(valor)
+        codigo = self._indices[campo].get(chave)
+        if codigo is None:
+            codigo = len(self.valores[campo])
+            self.valores[campo].append(valor)
+            self._indices[campo][chave] = codigo
+        return codigo
+
+    def adicionar(self, metadata: Optional[Dict]) -> None:
+        self.linhas += 1
+        for coluna in self.codigos.values():
+            coluna.append(-1)
+        self.atualizar(self.linhas - 1, metadata or {}, substituir=True)
+
+    def atualizar(self, linha: int, metadata: Dict, substituir: bool = True) -> None:
+        if substituir:
+            for coluna in self.codigos.values():
+                coluna[linha] = -1
+        for campo, valor in metadata.items():
+            if valor is None:
+                # Como no ChromaDB, None remove o campo
+                if campo in self.codigos:
+                    self.codigos[campo][linha] = -1
+                continue
+            codigo = self._codigo(campo, valor)
+            self.codigos[campo][linha] = codigo
+
+    def linha(self, i: int) -> Dict:
+        return {
+            campo: self.valores[campo][coluna[i]]
+            for campo, coluna in self.codigos.items()
+            if coluna[i] >= 0
+        }
+
+    def manter(self, mascara: np.ndarray) -> None:
+        for campo, coluna in self.codigos.items():
+            self.codigos[campo] = array("i", np.frombuffer(coluna, dtype=np.int32)[mascara].tobytes())
+        self.linhas = int(mascara.sum())
+
+    # ---------- filtros ----------
+
+    def _igual(self, campo: str, valores: Iterable[Any]) -> np.ndarray:
+        if campo not in self.codigos:
+            return np.zeros(self.linhas, dtype=bool)
+        codigos = [self._indices[campo][_chave_valor(v)] for v in valores if _chave_valor(v) in self._indices[campo]]
+        return np.isin(np.frombuffer(self.codigos[campo], dtype=np.int32), codigos)
+
+    def filtrar(self, where: Dict) -> np.ndarray:
+        """
+        Máscara booleana das linhas que atendem ao filtro, no subconjunto da
+        sintaxe do ChromaDB usado pelo projeto: {"campo": valor},
+        {"campo": {"$eq" | "$ne" | "$in" | "$nin": ...}}, {"$and": [...]}, {"$or": [...]}.
+        """
+        mascara = np.ones(self.linhas, dtype=bool)
+        for campo, condicao in where.items():
+            if campo == "$and":
+                for parte in condicao:
+                    mascara &= self.filtrar(parte)
+            elif campo == "$or":
+                alguma = np.zeros(self.linhas, dtype=bool)
+                for parte in condicao:
+                    alguma |= self.filtrar(parte)
+                mascara &= alguma
+            elif isinstance(condicao, dict):
+                for operador, valor in condicao.items():
+                    if operador == "$eq":
+                        mascara &= self._igual(campo, [valor])
+                    elif operador == "$ne":
+                        mascara &= ~self._igual(campo, [valor])
+                    elif operador == "$in":
+                        mascara &= self._igual(campo, valor)
+                    elif operador == "$nin":
+                        mascara &= ~self._igual(campo, valor)
+                    else:
+                        raise ValueError(f"Operador de filtro não suportado: {operador}")
+            else:
+                mascara &= self._igual(campo, [condicao])
+        return mascara
+
+    # ---------- persistência ----------
+
+    def exportar(self) -> tuple:
+        colunas = {campo: np.frombuffer(coluna, dtype=np.int32) for campo, coluna in self.codigos.items()}
+        return colunas, self.valores
+
+    @classmethod
+    def importar(cls, colunas: Dict[str, np.ndarray], valores: Dict[str, List[Any]], linhas: int) -> "TabelaMetadados":
+        tabela = cls()
+        tabela.linhas = linhas
+        for campo, codigos in colunas.items():
+            tabela.codigos[campo] = array("i", codigos.astype(np.int32).tobytes())
+            tabela.valores[campo] = valores[campo]
+            tabela._indices[campo] = {_chave_valor(v): i for i, v in enumerate(valores[campo])}
+        return tabela
+
+# =========================
+# 2. COLEÇÃO NUMPY
+# =========================
+
+class ColecaoNumpy:
+    """
+    Coleção em processo com a mesma interface usada do ChromaDB
+    (count, upsert, update, delete, get, query), distância de cosseno.
+    - Vetores: matriz float32 contígua e normalizada; ao abrir, o arquivo .npy
+      é mapeado em memória (mmap) e só é copiado para a RAM na primeira escrita.
+    - Metadados: TabelaMetadados; textos e ids em listas.
+    Alterações ficam em memória até salvar(): ao contrário do ChromaDB, a
+    gravação é feita em lote, não a cada operação.
+    """
+
+    def __init__(self, diretorio: str):
+        self.diretorio = diretorio
+        self.ids: List[str] = []
+        self.documentos: List[str] = []
+        self.tabela = TabelaMetadados()
+        self.linha_por_id: Dict[str, int] = {}
+        self._vetores: Optional[np.ndarray] = None
+        self._em_memoria = False
+        self.alterada = False
+        self._carregar()
+
+    # ---------- armazenamento dos vetores ----------
+
+    @property
+    def vetores(self) -> np.ndarray:
+        if self._vetores is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._vetores[:len(self.ids)]
+
+    def _reservar(self, linhas: int, dimensoes: int) -> None:
+        # Buffer com capacidade dobrada: inserções em lote não copiam a matriz inteira a cada vez
+        if self._vetores is None:
+            self._vetores = np.zeros((max(linhas, 1024), dimensoes), dtype=np.float32)
+            self._em_memoria = True
+            return
+
+        if self._vetores.shape[1] != dimensoes:
+            raise ValueError(f"Dimensão {dimensoes} diferente da coleção ({self._vetores.shape[1]})")
+
+        if not self._em_memoria or linhas > self._vetores.shape[0]:
+            capacidade = max(linhas, 2 * self._vetores.shape[0], 1024)
+            novo = np.zeros((capacidade, dimensoes), dtype=np.float32)
+            novo[:len(self.ids)] = self._vetores[:len(self.ids)]
+            self._vetores = novo
+            self._em_memoria = True
+
+    @staticmethod
+    def _normalizar(embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+        matriz = np.asarray(embeddings, dtype=np.float32)
+        if matriz.ndim == 1:
+            matriz = matriz[None, :]
+        normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+        normas[normas == 0] = 1.0
+        return matriz / normas
+
+    def _vetores_alterados(self) -> None:
+        self.alterada = True
+
+    # ---------- escrita ----------
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def upsert(self, ids: List[str], embeddings, documents: List[str] = None, metadatas: List[Dict] = None) -> None:
+        vetores = self._normalizar(embeddings)
+        if len(vetores) != len(ids):
+            raise ValueError(f"{len(ids)} ids para {len(vetores)} embeddings")
+
+        novos = sum(1 for i in dict.fromkeys(ids) if i not in self.linha_por_id)
+        self._reservar(len(self.ids) + novos, vetores.shape[1])
+
+        for posicao, id_chunk in enumerate(ids):
+            documento = documents[posicao] if documents else ""
+            metadata = metadatas[posicao] if metadatas else {}
+            linha = self.linha_por_id.get(id_chunk)
+            if linha is None:
+                linha = len(self.ids)
+                self.linha_por_id[id_chunk] = linha
+                self.ids.append(id_chunk)
+                self.documentos.append(documento)
+                self.tabela.adicionar(metadata)
+            else:
+                self.documentos[linha] = documento
+                self.tabela.atualizar(linha, metadata)
+            self._vetores[linha] = vetores[posicao]
+
+        self._vetores_alterados()
+
+    def update(self, ids: List[str], embeddings=None, documents: List[str] = None, metadatas: List[Dict] = None) -> None:
+        vetores = self._normalizar(embeddings) if embeddings is not None else None
+        if vetores is not None:
+            self._reservar(len(self.ids), vetores.shape[1])
+
+        for posicao, id_chunk in enumerate(ids):
+            linha = self.linha_por_id.get(id_chunk)
+            if linha is None:
+                continue
+            if documents:
+                self.documentos[linha] = documents[posicao]
+            if metadatas:
+                self.tabela.atualizar(linha, metadatas[posicao], substituir=False)
+            if vetores is not None:
+                self._vetores[linha] = vetores[posicao]
+
+        if vetores is not None:
+            self._vetores_alterados()
+        self.alterada = True
+
+    def delete(self, ids: List[str] = None, where: Dict = None) -> None:
+        remover = np.zeros(len(self.ids), dtype=bool)
+        for id_chunk in ids or []:
+            linha = self.linha_por_id.get(id_chunk)
+            if linha is not None:
+                remover[linha] = True
+        if where:
+            remover |= self.tabela.filtrar(where)
+        if not remover.any():
+            return
+
+        manter = ~remover
+        linhas = np.flatnonzero(manter)
+        self._reservar(len(self.ids), self._vetores.shape[1])
+        self._vetores[:len(linhas)] = self._vetores[linhas]
+        self.ids = [self.ids[i] for i in linhas]
+        self.documentos = [self.documentos[i] for i in linhas]
+        self.tabela.manter(manter)
+        self.linha_por_id = {id_chunk: i for i, id_chunk in enumerate(self.ids)}
+        self._vetores_alterados()
+
+    # ---------- leitura ----------
+
+    def _montar(self, linhas: Iterable[int], include: Sequence[str]) -> Dict:
+        linhas = list(linhas)
+        resultado = {"ids": [self.ids[i] for i in linhas]}
+        if "documents" in include:
+            resultado["documents"] = [self.documentos[i] for i in linhas]
+        if "metadatas" in include:
+            resultado["metadatas"] = [self.tabela.linha(i) for i in linhas]
+        if "embeddings" in include:
+            resultado["embeddings"] = [self.vetores[i].tolist() for i in linhas]
+        return resultado
+
+    def get(self, ids: List[str] = None, where: Dict = None, limit: int = None, offset: int = 0,
+            include: Sequence[str] = INCLUDE_PADRAO) -> Dict:
+        if ids is not None:
+            linhas = [self.linha_por_id[i] for i in ids if i in self.linha_por_id]
+        else:
+            linhas = range(len(self.ids))
+        if where:
+            mascara = self.tabela.filtrar(where)
+            linhas = [i for i in linhas if mascara[i]]
+        linhas = list(linhas)[offset:offset + limit if limit is not None else None]
+        return self._montar(linhas, include)
+
+    def _buscar(self, consultas: np.ndarray, k: int, mascara: Optional[np.ndarray]) -> List[tuple]:
+        """Retorna, por consulta, (linhas, similaridades) em ordem decrescente."""
+        if mascara is not None:
+            candidatas = np.flatnonzero(mascara)
+            matriz = self.vetores[candidatas]
+        else:
+            candidatas = None
+            matriz = self.vetores
+
+        similaridades = consultas @ matriz.T
+        k = min(k, matriz.shape[0])
+        resultados = []
+        for linha_sim in similaridades:
+            melhores = np.argpartition(-linha_sim, k - 1)[:k] if k < len(linha_sim) else np.arange(len(linha_sim))
+            melhores = melhores[np.argsort(-linha_sim[melhores], kind="stable")]
+            linhas = candidatas[melhores] if candidatas is not None else melhores
+            resultados.append((linhas, linha_sim[melhores]))
+        return resultados
+
+    def query(self, query_embeddings, n_results: int = 10, where: Dict = None,
+              include: Sequence[str] = ("documents", "metadatas", "distances")) -> Dict:
+        consultas = self._normalizar(query_embeddings)
+        chaves = ["ids"] + [c for c in ("documents", "metadatas", "embeddings", "distances") if c in include]
+        resultado = {chave: [] for chave in chaves}
+
+        mascara = self.tabela.filtrar(where) if where else None
+        if not self.ids or (mascara is not None and not mascara.any()):
+            for chave in chaves:
+                resultado[chave] = [[] for _ in consultas]
+            return resultado
+
+        for linhas, similaridades in self._buscar(consultas, n_results, mascara):
+            parcial = self._montar(linhas, include)
+            for chave in chaves:
+                if chave == "distances":
+                    resultado[chave].append((1.0 - similaridades).astype(float).tolist())
+                else:
+                    resultado[chave].append(parcial[chave])
+        return resultado
+
+    # ---------- persistência ----------
+
+    def _carregar(self) -> None:
+        caminho_tabela = os.path.join(self.diretorio, ARQUIVO_TABELA)
+        if not os.path.exists(caminho_tabela):
+            return
+
+        with open(caminho_tabela, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+        ids = dados["ids"]
+        with np.load(os.path.join(self.diretorio, ARQUIVO_CODIGOS)) as arquivo:
+            colunas = dict(arquivo)
+        # Leitura sob demanda: o SO carrega apenas as páginas da matriz que forem tocadas
+        vetores = np.load(os.path.join(self.diretorio, ARQUIVO_VETORES), mmap_mode="r") if ids else None
+
+        # Arquivos de gravações diferentes (queda entre dois os.replace): a coleção abre vazia e é
+        # reconstruída, em vez de associar vetores e metadados aos ids errados
+        if len(dados["documentos"]) != len(ids) or any(len(codigos) != len(ids) for codigos in colunas.values()):
+            return
+        if vetores is not None and vetores.shape[0] != len(ids):
+            return
+
+        self.ids = ids
+        self.documentos = dados["documentos"]
+        self.linha_por_id = {id_chunk: i for i, id_chunk in enumerate(self.ids)}
+        self.tabela = TabelaMetadados.importar(colunas, dados["valores"], len(self.ids))
+        self._vetores = vetores
+        self._em_memoria = False
+
+    def _gravar_dados(self) -> List[tuple]:
+        """
+        Grava os arquivos de dados com nomes temporários e devolve os pares
+        (temporário, definitivo); subclasses acrescentam os seus.
+        """
+        temporario_vetores = os.path.join(self.diretorio, "vetores.tmp.npy")
+        np.save(temporario_vetores, np.ascontiguousarray(self.vetores))
+
+        colunas, _ = self.tabela.exportar()
+        temporario_colunas = os.path.join(self.diretorio, "colunas.tmp.npz")
+        np.savez(temporario_colunas, **colunas)
+        return [
+            (temporario_vetores, os.path.join(self.diretorio, ARQUIVO_VETORES)),
+            (temporario_colunas, os.path.join(self.diretorio, ARQUIVO_CODIGOS))
+        ]
+
+    def salvar(self) -> None:
+        if not self.alterada:
+            return
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        # Tudo gravado com nomes temporários antes da primeira troca; a tabela entra por
+        # último: ela é o marcador de coleção completa
+        arquivos = self._gravar_dados()
+        temporario = os.path.join(self.diretorio, ARQUIVO_TABELA + ".tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "documentos": self.documentos, "valores": self.tabela.valores}, f, ensure_ascii=False)
+        arquivos.append((temporario, os.path.join(self.diretorio, ARQUIVO_TABELA)))
+
+        for temporario, definitivo in arquivos:
+            os.replace(temporario, definitivo)
+        self.alterada = False
+
+# =========================
+# 3. COLEÇÃO FAISS
+# =========================
+
+class ColecaoFaiss(ColecaoNumpy):
+    """
+    Mesmo armazenamento da ColecaoNumpy, com a busca feita por um índice FAISS
+    de produto interno (vetores normalizados = cosseno). fabrica segue a
+    sintaxe de faiss.index_factory: "Flat" (exato), "HNSW32" (aproximado) ou
+    fábricas com treino ("SQ8", "PQ96", "IVF256,Flat"), treinadas com os
+    próprios vetores da coleção. Enquanto a coleção tem poucos vetores para o
+    treino (ex.: menos que as 256 centróides de um PQ), a busca é exata.
+    O índice é reconstruído sob demanda após escritas e salvo com a coleção.
+    Buscas com filtro (where) percorrem apenas as linhas filtradas, de forma exata.
+    """
+
+    def __init__(self, diretorio: str, fabrica: str = "Flat"):
+        if faiss is None:
+            raise ImportError("O backend 'faiss' requer o pacote faiss-cpu (pip install faiss-cpu)")
+        self.fabrica = fabrica
+        self._indice = None
+        self._treino_insuficiente = False
+        super().__init__(diretorio)
+
+        caminho = os.path.join(diretorio, ARQUIVO_FAISS)
+        if self.ids and os.path.exists(caminho):
+            indice = faiss.read_index(caminho)
+            if indice.ntotal == len(self.ids):
+                self._indice = indice
+
+    def _vetores_alterados(self) -> None:
+        super()._vetores_alterados()
+        self._indice = None
+        self._treino_insuficiente = False
+
+    def _indice_atual(self):
+        """Índice FAISS dos vetores atuais, ou None se a fábrica não pôde ser treinada com eles."""
+        if self._indice is None and not self._treino_insuficiente:
+            vetores = np.ascontiguousarray(self.vetores)
+            indice = faiss.index_factory(vetores.shape[1], self.fabrica, faiss.METRIC_INNER_PRODUCT)
+            if not indice.is_trained:
+                try:
+                    indice.train(vetores)
+                except RuntimeError:
+                    # Menos vetores que centróides (IVF, PQ): tenta de novo após a próxima escrita
+                    self._treino_insuficiente = True
+                    return None
+            indice.add(vetores)
+            self._indice = indice
+        return self._indice
+
+    def _buscar(self, consultas: np.ndarray, k: int, mascara: Optional[np.ndarray]) -> List[tuple]:
+        if mascara is not None or self._indice_atual() is None:
+            return super()._buscar(consultas, k, mascara)
+
+        similaridades, linhas = self._indice_atual().search(np.ascontiguousarray(consultas), min(k, len(self.ids)))
+        resultados = []
+        for linhas_consulta, sims in zip(linhas, similaridades):
+            validas = linhas_consulta >= 0
+            resultados.append((linhas_consulta[validas], sims[validas]))
+        return resultados
+
+    def _gravar_dados(self) -> List[tuple]:
+        arquivos = super()._gravar_dados()
+        caminho = os.path.join(self.diretorio, ARQUIVO_FAISS)
+        indice = self._indice_atual() if self.ids else None
+        if indice is None:
+            # Sem índice treinado: um arquivo antigo não pode ser lido como se valesse
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            return arquivos
+        temporario = caminho + ".tmp"
+        faiss.write_index(indice, temporario)
+        arquivos.append((temporario, caminho))
+        return arquivos
+
+# =========================
+# 4. COLEÇÃO QUANTIZADA
+# =========================
+
+def _impressao_ids(ids: List[str]) -> str:
+    return hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()
+
+class ColecaoQuantizada(ColecaoNumpy):
+    """
+    Mesmo armazenamento da ColecaoNumpy, com a busca em dois estágios:
+    1. notas aproximadas sobre códigos compactos em RAM (Quantizador: "int8",
+       "pq" ou "float32", opcionalmente truncados a `dimensoes`);
+    2. re-score exato, em float32 com todas as dimensões, das k * fator_rescore
+       melhores linhas, lidas sob demanda do vetores.npy mapeado em memória.
+    Depois de aberta do disco, a coleção só mantém na RAM os códigos; a matriz
+    completa é lida apenas nas linhas candidatas. Os códigos são treinados
+    sob demanda após escritas e salvos em quantizado.npz com a coleção.
+    """
+
+    def __init__(self, diretorio: str, quantizacao: str = "int8", dimensoes: int = 0, fator_rescore: int = 4):
+        self.quantizador = Quantizador(quantizacao, dimensoes)
+        self.fator_rescore = max(1, fator_rescore)
+        self._codigos: Optional[np.ndarray] = None
+        self._codigos_salvos = False
+        super().__init__(diretorio)
+
+        caminho = os.path.join(diretorio, ARQUIVO_QUANTIZADO)
+        if self.ids and os.path.exists(caminho):
+            with np.load(caminho) as dados:
+                # Códigos de outra configuração ou de outro conteúdo são refeitos na primeira busca
+                parametros = json.loads(str(dados["parametros"]))
+                if parametros == {**self.quantizador.parametros(), "ids": _impressao_ids(self.ids)}:
+                    self.quantizador.importar({nome: dados[nome] for nome in dados.files})
+                    self._codigos = dados["codigos"]
+                    self._codigos_salvos = True
+
+    def _vetores_alterados(self) -> None:
+        super()._vetores_alterados()
+        self._codigos = None
+        self._codigos_salvos = False
+
+    def _codigos_atuais(self) -> np.ndarray:
+        if self._codigos is None:
+            self.quantizador.treinar(self.vetores)
+            self._codigos = self.quantizador.codificar(self.vetores)
+        return self._codigos
+
+    def memoria_busca(self) -> int:
+        """Bytes mantidos em RAM para o primeiro estágio (códigos e tabelas do quantizador)."""
+        return self._codigos_atuais().nbytes + sum(dados.nbytes for dados in self.quantizador.exportar().values())
+
+    def _buscar(self, consultas: np.ndarray, k: int, mascara: Optional[np.ndarray]) -> List[tuple]:
+        codigos = self._codigos_atuais()
+        candidatas = np.flatnonzero(mascara) if mascara is not None else None
+        if candidatas is not None:
+            codigos = codigos[candidatas]
+
+        notas = self.quantizador.pontuar(self.quantizador.preparar_consultas(consultas), codigos)
+        pre_k = min(k * self.fator_rescore, len(codigos))
+        k = min(k, len(codigos))
+        resultados = []
+        for consulta, notas_consulta in zip(consultas, notas):
+            melhores = np.argpartition(-notas_consulta, pre_k - 1)[:pre_k] if pre_k < len(notas_consulta) else np.arange(len(notas_consulta))
+            linhas = np.sort(candidatas[melhores] if candidatas is not None else melhores)
+            # Linhas em ordem crescente: a leitura do mmap segue a ordem do arquivo
+            similaridades = self.vetores[linhas] @ consulta
+            ordem = np.argsort(-similaridades, kind="stable")[:k]
+            resultados.append((linhas[ordem], similaridades[ordem]))
+        return resultados
+
+    def _gravar_codigos(self) -> tuple:
+        parametros = {**self.quantizador.parametros(), "ids": _impressao_ids(self.ids)}
+        temporario = os.path.join(self.diretorio, "quantizado.tmp.npz")
+        np.savez(
+            temporario,
+            codigos=self._codigos_atuais(),
+            parametros=np.array(json.dumps(parametros)),
+            **self.quantizador.exportar()
+        )
+        return temporario, os.path.join(self.diretorio, ARQUIVO_QUANTIZADO)
+
+    def _gravar_dados(self) -> List[tuple]:
+        arquivos = super()._gravar_dados()
+        if self.ids:
+            arquivos.append(self._gravar_codigos())
+        return arquivos
+
+    def salvar(self) -> None:
+        if self.alterada:
+            super().salvar()
+        elif self.ids and not self._codigos_salvos:
+            # Coleção inalterada, códigos treinados depois de aberta: só eles são gravados
+            os.replace(*self._gravar_codigos())
+        self._codigos_salvos = bool(self.ids)
+
+# =========================
+# 5. ABERTURA
+# =========================
+
+def abrir_colecao_local(
+    backend: str,
+    diretorio: str,
+    recriar: bool = False,
+    fabrica_faiss: str = "Flat",
+    quantizacao: str = "",
+    dimensoes: int = 0,
+    fator_rescore: int = 4
+) -> ColecaoNumpy:
+    """
+    quantizacao ("int8", "pq" ou "float32") e dimensoes (truncamento Matryoshka)
+    valem para o backend numpy: a coleção passa a ser uma ColecaoQuantizada,
+    com os mesmos arquivos e mais quantizado.npz. Vazias, a busca é a exata.
+    """
+    if backend not in ("numpy", "faiss"):
+        raise ValueError(f"Backend local desconhecido: {backend}")
+    if quantizacao and quantizacao not in MODOS_QUANTIZACAO:
+        raise ValueError(f"Quantização desconhecida: {quantizacao}")
+    if recriar and os.path.isdir(diretorio):
+        shutil.rmtree(diretorio)
+    if backend == "faiss":
+        return ColecaoFaiss(diretorio, fabrica=fabrica_faiss)
+    if quantizacao or dimensoes:
+        return ColecaoQuantizada(diretorio, quantizacao or "float32", dimensoes, fator_rescore)
+    return ColecaoNumpy(diretorio)
@@ -0,0 +1,88 @@
+# ============================================
+# ROTEAMENTO DA BUSCA VETORIAL
+# Quantas consultas busca_vetorial_lote faz conforme a confiança do
+# roteamento e o tamanho da partição
+# ============================================
+
+import os
+import sys
+import importlib
+
+import pytest
+
+NATIVO = os.path.join(os.path.dirname(__file__), "..", "exemplos", "nativo")
+
+class ColecaoContada:
+    """Coleção falsa: registra cada query e devolve até n_results trechos da partição pedida."""
+
+    def __init__(self, categorias):
+        self.categorias = categorias
+        self.consultas = []
+
+    def query(self, query_embeddings, n_results, where=None, include=None):
+        self.consultas.append(where)
+        permitidas = where["categoria"]["$in"] if where else None
+        linhas = [
+            (f"c{i}", categoria) for i, categoria in enumerate(self.categorias)
+            if permitidas is None or categoria in permitidas
+        ][:n_results]
+        por_consulta = len(query_embeddings)
+        return {
+            "ids": [[id_chunk for id_chunk, _ in linhas]] * por_consulta,
+            "documents": [[f"texto {id_chunk}" for id_chunk, _ in linhas]] * por_consulta,
+            "metadatas": [[{"categoria": categoria} for _, categoria in linhas]] * por_consulta,
+            "distances": [[0.1 * posicao for posicao in range(len(linhas))]] * por_consulta
+        }
+
+@pytest.fixture(scope="module")
+def rag(tmp_path_factory):
+    # A importação cria o cache de embeddings no diretório atual e exige uma chave
+    diretorio = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("rag"))
+    os.environ.setdefault("OPENAI_API_KEY", "teste")
+    sys.path.insert(0, os.path.abspath(NATIVO))
+    try:
+        modulo = importlib.import_module("main_cli2_nativo")
+    finally:
+        os.chdir(diretorio)
+    return modulo
+
+@pytest.fixture
+def configurar(rag, monkeypatch):
+    monkeypatch.setattr(rag, "ROTEAMENTO", True)
+    monkeypatch.setattr(rag, "BUSCA_HIBRIDA", False)
+    monkeypatch.setattr(rag, "RERANK_CANDIDATOS", 4)
+    monkeypatch.setattr(rag, "ROTEAMENTO_CONFIANCA", 0.6)
+    monkeypatch.setattr(rag, "ROTEAMENTO_CONFIANCA_EXCLUSIVA", 0.8)
+    return rag
+
+def test_pergunta_roteada_com_confianca_faz_uma_consulta(configurar):
+    collection = ColecaoContada(["ferias"] * 6 + ["conduta"] * 6)
+    resultado = configurar.busca_vetorial("Como peço férias?", [0.0], collection)
+
+    assert collection.consultas == [{"categoria": {"$in": ["ferias", "geral"]}}]
+    assert len(resultado["ids"][0]) == 4
+
+def test_particao_incompleta_completa_com_a_global(configurar):
+    collection = ColecaoContada(["ferias"] * 2 + ["conduta"] * 6)
+    resultado = configurar.busca_vetorial("Como peço férias?", [0.0], collection)
+
+    assert collection.consultas == [{"categoria": {"$in": ["ferias", "geral"]}}, None]
+    assert len(resultado["ids"][0]) == 4
+
+def test_confianca_baixa_mescla_com_a_global(configurar):
+    collection = ColecaoContada(["ferias"] * 6 + ["home_office"] * 6)
+    # Duas palavras de férias e uma de home office: roteada, confiança 67%
+    configurar.busca_vetorial("Férias no remoto: posso tirar férias?", [0.0], collection)
+
+    assert collection.consultas == [{"categoria": {"$in": ["ferias", "geral"]}}, None]
+
+def test_lote_so_consulta_o_corpus_inteiro_pelas_que_precisam(configurar):
+    collection = ColecaoContada(["ferias"] * 6 + ["conduta"] * 6)
+    perguntas = ["Como peço férias?", "Qual o código de conduta?", "Qual o horário?"]
+    resultados = configurar.busca_vetorial_lote(perguntas, [[0.0]] * 3, collection)
+
+    # Uma por categoria roteada e uma global, só para a pergunta sem categoria
+    assert collection.consultas.count(None) == 1
+    assert len(collection.consultas) == 3
+    assert all(len(resultado["ids"][0]) == 4 for resultado in resultados)